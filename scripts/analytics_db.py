@@ -0,0 +1,274 @@
+import os
+import sqlite3
+import argparse
+import pandas as pd
+
+from cleaned_store import load_cleaned
+from rollup import rollup_sources
+from transactions import TRANSACTION_COLUMNS
+from ledger import LEDGER_FILE
+from debts import DEBTS_FILE
+from bombom_weekly import FACTS_FILE
+from cachorro_quente import SALES_FILE, EVENTS_FILE
+from budget import BUDGET_FILE
+from reconciliation import EXTRATO_FILE, extrato_movements
+
+# Banco analítico (SQLite, da biblioteca padrão) com as tabelas já normalizadas
+# pela limpeza. Os CSVs limpos continuam sendo a fonte; o banco é recarregado
+# tabela a tabela quando os arquivos de origem mudam.
+DB_FILE = 'financeiro.sqlite'
+
+# Versões do esquema, aplicadas em ordem; PRAGMA user_version guarda a última
+# aplicada. Para mudar o esquema, acrescente uma versão (nunca edite uma já
+# publicada): tabelas alteradas por ela são recarregadas na próxima carga.
+MIGRATIONS = [
+    (1, """
+    CREATE TABLE cargas (
+        tabela TEXT PRIMARY KEY, origem TEXT NOT NULL, versao INTEGER NOT NULL, linhas INTEGER NOT NULL
+    );
+    CREATE TABLE vendas (
+        evento TEXT, bloco INTEGER, linha INTEGER, cliente TEXT, categoria TEXT, produto TEXT,
+        quantidade REAL, preco_unitario REAL, valor REAL, valor_registrado REAL, pago INTEGER,
+        forma_pagamento TEXT
+    );
+    CREATE INDEX vendas_evento ON vendas (evento);
+    CREATE INDEX vendas_cliente ON vendas (cliente);
+    CREATE TABLE eventos (
+        evento TEXT PRIMARY KEY, vendas INTEGER, itens REAL, receita REAL, valor_registrado REAL,
+        receita_paga REAL
+    );
+    CREATE TABLE razao (
+        data TEXT, conta TEXT, arquivo TEXT, tipo TEXT, forma_pagamento TEXT, historico TEXT,
+        descricao TEXT, valor REAL, valor_assinado REAL, saldo REAL
+    );
+    CREATE INDEX razao_data ON razao (data);
+    CREATE INDEX razao_origem ON razao (conta, arquivo);
+    CREATE TABLE dividas (
+        data TEXT, data_estimada INTEGER, pessoa TEXT, arquivo TEXT, categoria TEXT, tipo TEXT,
+        valor REAL, saldo REAL
+    );
+    CREATE INDEX dividas_pessoa ON dividas (pessoa, data);
+    CREATE INDEX dividas_data ON dividas (data);
+    CREATE INDEX dividas_arquivo ON dividas (arquivo);
+    CREATE TABLE bombom (
+        ano INTEGER, mes TEXT, semana INTEGER, data_inicio TEXT, data_fim TEXT, trio TEXT,
+        bloco TEXT, item TEXT, quantidade REAL, valor REAL
+    );
+    CREATE INDEX bombom_data ON bombom (data_inicio);
+    CREATE INDEX bombom_trio ON bombom (trio);
+    CREATE TABLE extrato (
+        linha INTEGER, data TEXT, origem TEXT, valor_assinado REAL, local TEXT
+    );
+    CREATE INDEX extrato_data ON extrato (data);
+    CREATE INDEX extrato_origem ON extrato (origem);
+    CREATE TABLE lancamentos (
+        data TEXT, fonte TEXT, forma_pagamento TEXT, tipo TEXT, valor REAL, descricao TEXT
+    );
+    CREATE INDEX lancamentos_data ON lancamentos (data);
+    CREATE INDEX lancamentos_fonte ON lancamentos (fonte, tipo, data);
+    CREATE INDEX lancamentos_pessoa ON lancamentos (descricao);
+    CREATE TABLE orcamento (
+        projeto TEXT, ano INTEGER, arquivo TEXT, categoria TEXT, linha INTEGER, item TEXT,
+        quantidade REAL, fornecedor TEXT, custo_unitario REAL, valor_total REAL
+    );
+    CREATE INDEX orcamento_projeto ON orcamento (projeto, linha);
+    """),
+    (2, """
+    -- Consultas usadas pelos painéis, guardadas como visões
+    CREATE VIEW pagamentos AS
+        SELECT fonte, forma_pagamento, SUM(valor) AS valor_total, COUNT(*) AS quantidade
+        FROM lancamentos WHERE tipo = 'entrada' AND forma_pagamento IS NOT NULL
+        GROUP BY fonte, forma_pagamento;
+    CREATE VIEW entradas_mensais AS
+        SELECT fonte, substr(data, 1, 7) AS mes, SUM(valor) AS valor, COUNT(*) AS lancamentos
+        FROM lancamentos WHERE tipo = 'entrada' AND data IS NOT NULL
+        GROUP BY fonte, mes;
+    CREATE VIEW dividas_em_aberto AS
+        SELECT pessoa,
+               SUM(CASE WHEN tipo = 'divida' THEN valor ELSE -valor END) AS saldo,
+               MAX(data) AS ultimo_evento
+        FROM dividas GROUP BY pessoa
+        HAVING saldo > 0.005;
+    CREATE VIEW orcado_por_linha AS
+        SELECT projeto, linha, item, MIN(valor_total) AS orcado
+        FROM orcamento GROUP BY projeto, linha;
+    """),
+    (3, """
+    -- HAVING saldo > ... usava a coluna saldo da tabela (de uma linha qualquer
+    -- do grupo), não a soma: o filtro passa a ser sobre a própria expressão
+    DROP VIEW dividas_em_aberto;
+    CREATE VIEW dividas_em_aberto AS
+        SELECT pessoa,
+               SUM(CASE WHEN tipo = 'divida' THEN valor ELSE -valor END) AS saldo,
+               MAX(data) AS ultimo_evento
+        FROM dividas GROUP BY pessoa
+        HAVING SUM(CASE WHEN tipo = 'divida' THEN valor ELSE -valor END) > 0.005;
+    """),
+]
+
+
+def _cleaned(filename):
+    return lambda cleaned_dir: load_cleaned(filename, cleaned_dir)
+
+
+def _extrato(cleaned_dir):
+    return extrato_movements(load_cleaned(EXTRATO_FILE, cleaned_dir))
+
+
+def _lancamentos(cleaned_dir):
+    parts = [extract(load_cleaned(filename, cleaned_dir)) for filename, extract in rollup_sources().items()
+             if os.path.exists(os.path.join(cleaned_dir, filename))]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=TRANSACTION_COLUMNS)
+
+
+# Tabela do banco -> (arquivos limpos de origem, função que monta o DataFrame,
+# versão do esquema em que a tabela mudou pela última vez)
+TABLES = {
+    'vendas': ([SALES_FILE], _cleaned(SALES_FILE), 1),
+    'eventos': ([EVENTS_FILE], _cleaned(EVENTS_FILE), 1),
+    'razao': ([LEDGER_FILE], _cleaned(LEDGER_FILE), 1),
+    'dividas': ([DEBTS_FILE], _cleaned(DEBTS_FILE), 1),
+    'bombom': ([FACTS_FILE], _cleaned(FACTS_FILE), 1),
+    'extrato': ([EXTRATO_FILE], _extrato, 1),
+    'lancamentos': (list(rollup_sources()), _lancamentos, 2),
+    'orcamento': ([BUDGET_FILE], _cleaned(BUDGET_FILE), 1),
+}
+
+# Perguntas frequentes, com parâmetros nomeados (:fonte, :pessoa...)
+QUERIES = {
+    'pagamentos': "SELECT forma_pagamento, valor_total, quantidade FROM pagamentos "
+                  "WHERE fonte = :fonte ORDER BY valor_total DESC",
+    'entradas_mensais': "SELECT mes, valor FROM entradas_mensais WHERE fonte = :fonte ORDER BY mes",
+    'saldo_mensal': "SELECT substr(data, 1, 7) AS mes, "
+                    "SUM(CASE WHEN tipo = 'entrada' THEN valor ELSE 0 END) AS entradas, "
+                    "SUM(CASE WHEN tipo = 'saida' THEN valor ELSE 0 END) AS saidas "
+                    "FROM razao WHERE data IS NOT NULL GROUP BY mes ORDER BY mes",
+    'receita_eventos': "SELECT evento, vendas, receita, valor_registrado, receita_paga FROM eventos ORDER BY evento",
+    'dividas_em_aberto': "SELECT pessoa, saldo, ultimo_evento FROM dividas_em_aberto ORDER BY saldo DESC",
+    'dividas_pessoa': "SELECT data, arquivo, categoria, tipo, valor FROM dividas WHERE pessoa = :pessoa "
+                      "ORDER BY data",
+    'orcado_projetos': "SELECT projeto, SUM(orcado) AS orcado, COUNT(*) AS linhas FROM orcado_por_linha "
+                       "GROUP BY projeto ORDER BY projeto",
+}
+
+
+def db_path(cleaned_dir):
+    return os.path.join(cleaned_dir, DB_FILE)
+
+
+def migrate(conn):
+    """Aplicar as versões do esquema ainda não aplicadas; retorna a versão final"""
+    current = conn.execute('PRAGMA user_version').fetchone()[0]
+    for version, script in MIGRATIONS:
+        if version > current:
+            # executescript faz COMMIT antes; a versão só é gravada se o script passar
+            conn.executescript(f"BEGIN; {script} PRAGMA user_version = {version}; COMMIT;")
+            current = version
+    return current
+
+
+def _origin(cleaned_dir, files):
+    """Assinatura (tamanho, mtime) dos arquivos de origem de uma tabela"""
+    parts = []
+    for name in files:
+        path = os.path.join(cleaned_dir, name)
+        stat = os.stat(path) if os.path.exists(path) else None
+        parts.append(f"{name}:{stat.st_size}:{stat.st_mtime_ns}" if stat else f"{name}:-")
+    return '|'.join(parts)
+
+
+def _rows(frame, columns):
+    """Linhas prontas para o SQLite: datas em texto ISO, NaN/NaT como NULL"""
+    frame = frame.reindex(columns=columns).copy()
+    for col in columns:
+        values = frame[col]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            frame[col] = values.dt.strftime('%Y-%m-%d')
+        elif pd.api.types.is_bool_dtype(values):
+            frame[col] = values.astype(int)
+    # Cópia própria: sob Copy-on-Write to_numpy() pode devolver uma visão só de leitura
+    data = frame.to_numpy(dtype=object, copy=True)
+    data[pd.isna(data)] = None
+    return [tuple(row) for row in data]
+
+
+def update_database(cleaned_dir, force=False):
+    """Recarregar no banco as tabelas cujos arquivos de origem mudaram.
+
+    Cada tabela é trocada inteira numa transação; as demais não são lidas.
+    Retorna {tabela: linhas} das tabelas recarregadas.
+    """
+    conn = sqlite3.connect(db_path(cleaned_dir))
+    try:
+        migrate(conn)
+        loaded = dict(conn.execute("SELECT tabela, origem || ':' || versao FROM cargas"))
+        reloaded = {}
+        for table, (files, build, version) in TABLES.items():
+            origin = _origin(cleaned_dir, files)
+            if not force and loaded.get(table) == f"{origin}:{version}":
+                continue
+            if not any(os.path.exists(os.path.join(cleaned_dir, name)) for name in files):
+                frame = None
+            else:
+                try:
+                    frame = build(cleaned_dir)
+                except (FileNotFoundError, ValueError) as e:
+                    print(f"Tabela {table} não carregada: {e}")
+                    continue
+            columns = [row[1] for row in conn.execute(f'PRAGMA table_info({table})')]
+            # Tabela sem linhas (ex.: razão vazia): só é esvaziada no banco
+            rows = _rows(frame, columns) if frame is not None and not frame.empty else []
+            with conn:
+                conn.execute(f'DELETE FROM {table}')
+                conn.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+                conn.execute('INSERT OR REPLACE INTO cargas VALUES (?, ?, ?, ?)', (table, origin, version, len(rows)))
+            reloaded[table] = len(rows)
+        if reloaded:
+            conn.execute('ANALYZE')
+    finally:
+        conn.close()
+    return reloaded
+
+
+def connect(cleaned_dir):
+    """Conexão só de leitura ao banco (uma por consulta: abrir custa microssegundos)"""
+    path = db_path(cleaned_dir)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    return sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+
+
+def query(sql, cleaned_dir='/home/ubuntu/cleaned_data', params=None):
+    """Resultado de uma consulta SQL como DataFrame"""
+    conn = connect(cleaned_dir)
+    try:
+        return pd.read_sql_query(sql, conn, params=params or {})
+    finally:
+        conn.close()
+
+
+def named_query(name, cleaned_dir='/home/ubuntu/cleaned_data', **params):
+    """Uma das consultas de QUERIES, com os parâmetros nomeados"""
+    return query(QUERIES[name], cleaned_dir, params)
+
+
+def db_version(cleaned_dir):
+    """mtime do banco (chave de cache dos painéis); None se ainda não existe"""
+    path = db_path(cleaned_dir)
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Consultas SQL no banco analítico gerado pela limpeza")
+    parser.add_argument('consulta', nargs='?', help=f"SQL ou nome de consulta ({', '.join(QUERIES)})")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--param', action='append', default=[], metavar='NOME=VALOR',
+                        help="parâmetro das consultas nomeadas (ex.: --param fonte=portaria)")
+    parser.add_argument('--recarregar', action='store_true', help="recarregar todas as tabelas antes")
+    args = parser.parse_args()
+    if args.recarregar or not os.path.exists(db_path(args.cleaned)):
+        print(f"Tabelas recarregadas: {update_database(args.cleaned, force=args.recarregar)}")
+    if args.consulta:
+        params = dict(param.split('=', 1) for param in args.param)
+        sql = QUERIES.get(args.consulta, args.consulta)
+        print(query(sql, args.cleaned, params).to_string(index=False))
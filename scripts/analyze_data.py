@@ -1,306 +1,40 @@
-import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import seaborn as sns
 import os
-from datetime import datetime
 
-def analyze_financial_data():
+from metrics_engine import compute_metrics, print_financial_report, write_summary_txt
+from summary_store import write_summary, load_summary_values
+from rollup import load_saldo, month_label
+from profiling import span
+
+def analyze_financial_data(cleaned_data_path='/home/ubuntu/cleaned_data', output_dir='/home/ubuntu'):
     """
     Análise financeira completa dos dados de arrecadação
     """
-    cleaned_data_path = '/home/ubuntu/cleaned_data'
-    
-    # Dicionário para armazenar resultados
-    financial_summary = {}
-    
-    print("=== ANÁLISE FINANCEIRA E CONTROLE DE CAIXA ===\n")
-    
-    # 1. ANÁLISE CACHORRO QUENTE
-    print("1. ANÁLISE CACHORRO QUENTE")
-    print("-" * 40)
-    
-    # Vendas Portaria
-    try:
-        df_portaria = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcachorroquente-Vendaportaria_cleaned.csv"))
-        # Find the 'Valor' column dynamically
-        valor_col_portaria = next((col for col in df_portaria.columns if 'valor' in str(col).lower()), None)
-        if valor_col_portaria:
-            df_portaria[valor_col_portaria] = pd.to_numeric(df_portaria[valor_col_portaria], errors='coerce')
-            total_portaria = df_portaria[valor_col_portaria].sum()
-            print(f"Total Vendas Portaria: R$ {total_portaria:.2f}")
-            financial_summary['cachorro_quente_portaria'] = total_portaria
-            
-            # Análise por forma de pagamento
-            forma_pagamento_col_portaria = next((col for col in df_portaria.columns if 'forma de pagamento' in str(col).lower()), None)
-            if forma_pagamento_col_portaria:
-                pagamento_portaria = df_portaria.groupby(forma_pagamento_col_portaria)[valor_col_portaria].sum()
-                print("Vendas por Forma de Pagamento (Portaria):")
-                for forma, valor in pagamento_portaria.items():
-                    print(f"  {forma}: R$ {valor:.2f}")
-        else:
-            print("Coluna 'Valor' não encontrada em Vendas Portaria.")
-    except Exception as e:
-        print(f"Erro ao analisar vendas portaria: {e}")
-        financial_summary['cachorro_quente_portaria'] = 0
-    
-    # Vendas Campus
-    try:
-        df_campus = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcachorroquente-vendacampus_cleaned.csv"))
-        # Tentar extrair valores das colunas
-        valor_col_campus = next((col for col in df_campus.columns if 'valor' in str(col).lower()), None)
-        total_campus = 0
-        if valor_col_campus:
-            df_campus[valor_col_campus] = pd.to_numeric(df_campus[valor_col_campus], errors='coerce')
-            total_campus = df_campus[valor_col_campus].sum()
-        else:
-            # Fallback for generic columns that might contain values
-            for col in df_campus.columns:
-                if 'unnamed' in str(col).lower() and df_campus[col].dtype == 'float64': # Assuming numeric values are already converted
-                    total_campus += df_campus[col].sum()
-        
-        print(f"Total Vendas Campus: R$ {total_campus:.2f}")
-        financial_summary['cachorro_quente_campus'] = total_campus
-    except Exception as e:
-        print(f"Erro ao analisar vendas campus: {e}")
-        financial_summary['cachorro_quente_campus'] = 0
-    
-    # Orçamento 2025
-    try:
-        df_orcamento = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcachorroquente-orçamento2025_cleaned.csv"))
-        # Find relevant columns dynamically
-        valor_sugerido_col = next((col for col in df_orcamento.columns if 'valor sugerido' in str(col).lower()), None)
-        lucro_liquido_col = next((col for col in df_orcamento.columns if 'lucro líquido' in str(col).lower()), None)
-
-        total_valor_sugerido = 0
-        total_lucro_liquido = 0
-
-        if valor_sugerido_col:
-            df_orcamento[valor_sugerido_col] = pd.to_numeric(df_orcamento[valor_sugerido_col], errors='coerce')
-            total_valor_sugerido = df_orcamento[valor_sugerido_col].sum()
-        
-        if lucro_liquido_col:
-            df_orcamento[lucro_liquido_col] = pd.to_numeric(df_orcamento[lucro_liquido_col], errors='coerce')
-            total_lucro_liquido = df_orcamento[lucro_liquido_col].sum()
-
-        print(f"Total Valor Sugerido (Orçamento): R$ {total_valor_sugerido:.2f}")
-        print(f"Total Lucro Líquido Estimado (Orçamento): R$ {total_lucro_liquido:.2f}")
-        financial_summary['cachorro_quente_orcamento_sugerido'] = total_valor_sugerido
-        financial_summary['cachorro_quente_orcamento_lucro'] = total_lucro_liquido
-
-    except Exception as e:
-        print(f"Erro ao analisar orçamento cachorro quente: {e}")
-        financial_summary['cachorro_quente_orcamento_sugerido'] = 0
-        financial_summary['cachorro_quente_orcamento_lucro'] = 0
-
-    # Total Cachorro Quente
-    total_cachorro_quente = financial_summary.get('cachorro_quente_portaria', 0) + financial_summary.get('cachorro_quente_campus', 0)
-    print(f"TOTAL CACHORRO QUENTE: R$ {total_cachorro_quente:.2f}")
-    financial_summary['total_cachorro_quente'] = total_cachorro_quente
-    
-    print("\n" + "="*50 + "\n")
-    
-    # 2. ANÁLISE CONTA DA CASA
-    print("2. ANÁLISE CONTA DA CASA")
-    print("-" * 40)
-    
-    # Entradas e Saídas 2025
-    try:
-        df_conta = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcontadacasa-Entrada_saída2025-CONTANOVA(lofi)_cleaned.csv"))
-        
-        # Procurar colunas de entrada e saída
-        entrada_col = next((col for col in df_conta.columns if 'entrada' in str(col).lower()), None)
-        saida_col = next((col for col in df_conta.columns if 'saída' in str(col).lower() or 'saida' in str(col).lower()), None)
-        
-        total_entradas = 0
-        total_saidas = 0
-        
-        if entrada_col:
-            df_conta[entrada_col] = pd.to_numeric(df_conta[entrada_col], errors='coerce')
-            total_entradas = df_conta[entrada_col].sum()
-            
-        if saida_col:
-            df_conta[saida_col] = pd.to_numeric(df_conta[saida_col], errors='coerce')
-            total_saidas = df_conta[saida_col].sum()
-        
-        saldo_liquido = total_entradas - total_saidas
-        
-        print(f"Total Entradas 2025: R$ {total_entradas:.2f}")
-        print(f"Total Saídas 2025: R$ {total_saidas:.2f}")
-        print(f"Saldo Líquido 2025: R$ {saldo_liquido:.2f}")
-        
-        financial_summary['conta_casa_entradas'] = total_entradas
-        financial_summary['conta_casa_saidas'] = total_saidas
-        financial_summary['conta_casa_saldo'] = saldo_liquido
-        
-    except Exception as e:
-        print(f"Erro ao analisar conta da casa: {e}")
-        financial_summary['conta_casa_entradas'] = 0
-        financial_summary['conta_casa_saidas'] = 0
-        financial_summary['conta_casa_saldo'] = 0
-    
-    # Dívidas
-    try:
-        df_dividas_2025 = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcontadacasa-Dívida2025_cleaned.csv"))
-        df_dividas_2024 = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcontadacasa-Dívida2024_cleaned.csv"))
-        
-        # Extrair valores de dívidas
-        dividas_2025 = 0
-        dividas_2024 = 0
-        
-        # Para 2025
-        for col in df_dividas_2025.columns:
-            if 'R$' in str(col) or any(keyword in str(col).lower() for keyword in ['valor', 'divida', 'dívida']):
-                df_dividas_2025[col] = pd.to_numeric(df_dividas_2025[col], errors='coerce')
-                dividas_2025 += df_dividas_2025[col].sum()
-        
-        # Para 2024
-        for col in df_dividas_2024.columns:
-            if 'R$' in str(col) or any(keyword in str(col).lower() for keyword in ['valor', 'divida', 'dívida']):
-                df_dividas_2024[col] = pd.to_numeric(df_dividas_2024[col], errors='coerce')
-                dividas_2024 += df_dividas_2024[col].sum()
-        
-        total_dividas = dividas_2025 + dividas_2024
-        
-        print(f"Dívidas 2024: R$ {dividas_2024:.2f}")
-        print(f"Dívidas 2025: R$ {dividas_2025:.2f}")
-        print(f"TOTAL DÍVIDAS: R$ {total_dividas:.2f}")
-        
-        financial_summary['dividas_2024'] = dividas_2024
-        financial_summary['dividas_2025'] = dividas_2025
-        financial_summary['total_dividas'] = total_dividas
-        
-    except Exception as e:
-        print(f"Erro ao analisar dívidas: {e}")
-        financial_summary['dividas_2024'] = 0
-        financial_summary['dividas_2025'] = 0
-        financial_summary['total_dividas'] = 0
     
-    print("\n" + "="*50 + "\n")
+    # Todos os indicadores vêm do motor compartilhado (cada planilha é lida uma vez)
+    with span('compute_metrics'):
+        financial_summary = compute_metrics(cleaned_data_path)
+    print_financial_report(financial_summary)
     
-    # 3. ANÁLISE OBRA BANHEIRO
-    print("3. ANÁLISE OBRA BANHEIRO")
-    print("-" * 40)
-    
-    # Arrecadações
-    try:
-        df_arrecadacoes = pd.read_csv(os.path.join(cleaned_data_path, "CopyofOBRABANHEIROSETEMBRO25-Arrecadações_cleaned.csv"))
-        
-        # Procurar colunas de valor
-        valor_col_arrecadacoes = next((col for col in df_arrecadacoes.columns if 'valor' in str(col).lower()), None)
-        total_arrecadado = 0
-        
-        if valor_col_arrecadacoes:
-            df_arrecadacoes[valor_col_arrecadacoes] = pd.to_numeric(df_arrecadacoes[valor_col_arrecadacoes], errors='coerce')
-            total_arrecadado = df_arrecadacoes[valor_col_arrecadacoes].sum()
-        
-        print(f"Total Arrecadado Obra Banheiro: R$ {total_arrecadado:.2f}")
-        financial_summary['obra_banheiro_arrecadado'] = total_arrecadado
-        
-        # Análise por método de pagamento
-        metodo_pagamento_col = next((col for col in df_arrecadacoes.columns if 'método de pagamento' in str(col).lower()), None)
-        if metodo_pagamento_col and valor_col_arrecadacoes:
-            pagamento_obra = df_arrecadacoes.groupby(metodo_pagamento_col)[valor_col_arrecadacoes].sum()
-            print("Arrecadações por Método de Pagamento:")
-            for metodo, valor in pagamento_obra.items():
-                print(f"  {metodo}: R$ {valor:.2f}")
-        
-    except Exception as e:
-        print(f"Erro ao analisar arrecadações obra: {e}")
-        financial_summary['obra_banheiro_arrecadado'] = 0
-    
-    # Orçamentos
-    try:
-        df_orcamentos = pd.read_csv(os.path.join(cleaned_data_path, "CopyofOBRABANHEIROSETEMBRO25-Orçamentos_cleaned.csv"))
-        
-        # Procurar colunas de valor total
-        valor_total_orcamento_col = next((col for col in df_orcamentos.columns if 'valor total' in str(col).lower()), None)
-        total_orcado = 0
-        
-        if valor_total_orcamento_col:
-            df_orcamentos[valor_total_orcamento_col] = pd.to_numeric(df_orcamentos[valor_total_orcamento_col], errors='coerce')
-            total_orcado = df_orcamentos[valor_total_orcamento_col].sum()
-        else:
-            # Fallback for generic columns that might contain values
-            for col in df_orcamentos.columns:
-                if 'unnamed' in str(col).lower() and df_orcamentos[col].dtype == 'float64':
-                    total_orcado += df_orcamentos[col].sum()
-
-        print(f"Total Orçado Obra Banheiro: R$ {total_orcado:.2f}")
-        financial_summary['obra_banheiro_orcado'] = total_orcado
-        
-        # Déficit/Superávit
-        deficit_obra = financial_summary.get('obra_banheiro_arrecadado', 0) - total_orcado
-        print(f"Déficit/Superávit Obra: R$ {deficit_obra:.2f}")
-        financial_summary['obra_banheiro_deficit'] = deficit_obra
-        
-    except Exception as e:
-        print(f"Erro ao analisar orçamentos obra: {e}")
-        financial_summary['obra_banheiro_orcado'] = 0
-        financial_summary['obra_banheiro_deficit'] = financial_summary.get('obra_banheiro_arrecadado', 0)
-    
-    print("\n" + "="*50 + "\n")
-    
-    # 4. RESUMO GERAL
-    print("4. RESUMO FINANCEIRO GERAL")
-    print("-" * 40)
-    
-    total_receitas = (
-        financial_summary.get('total_cachorro_quente', 0) +
-        financial_summary.get('conta_casa_entradas', 0) +
-        financial_summary.get('obra_banheiro_arrecadado', 0)
-    )
-    
-    total_despesas = (
-        financial_summary.get('conta_casa_saidas', 0) +
-        financial_summary.get('obra_banheiro_orcado', 0)
-    )
-    
-    saldo_geral = total_receitas - total_despesas - financial_summary.get('total_dividas', 0)
-    
-    print(f"TOTAL RECEITAS: R$ {total_receitas:.2f}")
-    print(f"TOTAL DESPESAS: R$ {total_despesas:.2f}")
-    print(f"TOTAL DÍVIDAS: R$ {financial_summary.get('total_dividas', 0):.2f}")
-    print(f"SALDO GERAL: R$ {saldo_geral:.2f}")
-    
-    financial_summary['total_receitas'] = total_receitas
-    financial_summary['total_despesas'] = total_despesas
-    financial_summary['saldo_geral'] = saldo_geral
-    
-    # 5. INDICADORES DE PERFORMANCE
-    print("\n" + "="*50 + "\n")
-    print("5. INDICADORES DE PERFORMANCE")
-    print("-" * 40)
-    
-    if total_receitas > 0:
-        margem_liquida = (saldo_geral / total_receitas) * 100
-        print(f"Margem Líquida: {margem_liquida:.2f}%")
-        
-        participacao_cachorro_quente = (financial_summary.get('total_cachorro_quente', 0) / total_receitas) * 100
-        print(f"Participação Cachorro Quente nas Receitas: {participacao_cachorro_quente:.2f}%")
-        
-        participacao_obra = (financial_summary.get('obra_banheiro_arrecadado', 0) / total_receitas) * 100
-        print(f"Participação Obra Banheiro nas Receitas: {participacao_obra:.2f}%")
-    
-    # Salvar resumo em arquivo
-    with open('/home/ubuntu/financial_summary.txt', 'w') as f:
-        f.write("RESUMO FINANCEIRO\n")
-        f.write("="*50 + "\n\n")
-        for key, value in financial_summary.items():
-            f.write(f"{key}: R$ {value:.2f}\n")
-    
-    print(f"\nResumo salvo em: /home/ubuntu/financial_summary.txt")
+    # Salvar resumo em arquivo (texto para leitura e JSON tipado para os dashboards)
+    write_summary_txt(financial_summary, os.path.join(output_dir, 'financial_summary.txt'))
+    write_summary(financial_summary, cleaned_data_path, os.path.join(output_dir, 'financial_summary.json'))
     
     return financial_summary
 
-def create_financial_dashboard():
+def create_financial_dashboard(summary=None, cleaned_data_path='/home/ubuntu/cleaned_data', output_dir='/home/ubuntu'):
     """
     Criar dashboard visual dos dados financeiros
+
+    Usa o resumo recebido ou, sem ele, o financial_summary.json já gravado em
+    output_dir, sem refazer a análise. A evolução do saldo vem do cubo mensal gravado
+    na limpeza (rollup_saldo_mensal.csv).
     """
     print("\n=== CRIANDO DASHBOARD FINANCEIRO ===")
     
-    # Executar análise primeiro
-    summary = analyze_financial_data()
+    if summary is None:
+        summary = load_summary_values(os.path.join(output_dir, 'financial_summary.json'))
     
     # Configurar matplotlib para português
     plt.rcParams['font.size'] = 10
@@ -340,11 +74,16 @@ def create_financial_dashboard():
                 f'R$ {valor:.0f}', ha='center', va='bottom')
     
     # 3. Gráfico de Linha - Evolução do Saldo
-    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun']
-    # Simulação de evolução (seria melhor com dados reais mensais)
-    saldo_acumulado = [0, 50, 120, 200, 250, summary.get('saldo_geral', 0)]
-    
-    ax3.plot(meses, saldo_acumulado, marker='o', linewidth=2, markersize=6)
+    try:
+        saldo = load_saldo(cleaned_data_path)
+    except FileNotFoundError:
+        saldo = None
+    if saldo is not None and len(saldo):
+        ax3.plot([month_label(mes) for mes in saldo['mes']], saldo['saldo_acumulado'],
+                 marker='o', linewidth=2, markersize=6)
+    else:
+        ax3.text(0.5, 0.5, 'Sem saldo mensal (rode a limpeza)', ha='center', va='center',
+                 transform=ax3.transAxes)
     ax3.set_title('Evolução do Saldo Acumulado')
     ax3.set_ylabel('Saldo (R$)')
     ax3.grid(True, alpha=0.3)
@@ -372,8 +111,10 @@ def create_financial_dashboard():
     ax4.legend()
     
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/financial_dashboard.png', dpi=300, bbox_inches='tight')
-    print("Dashboard salvo em: /home/ubuntu/financial_dashboard.png")
+    png_path = os.path.join(output_dir, 'financial_dashboard.png')
+    with span('savefig', output=png_path):
+        plt.savefig(png_path, dpi=300, bbox_inches='tight')
+    print(f"Dashboard salvo em: {png_path}")
     
     return fig
 
@@ -381,11 +122,12 @@ if __name__ == '__main__':
     # Executar análise financeira
     summary = analyze_financial_data()
     
-    # Criar dashboard
-    dashboard = create_financial_dashboard()
+    # Criar dashboard com o resumo já calculado
+    dashboard = create_financial_dashboard(summary)
     
     print("\n=== ANÁLISE CONCLUÍDA ===")
     print("Arquivos gerados:")
     print("- /home/ubuntu/financial_summary.txt")
+    print("- /home/ubuntu/financial_summary.json")
     print("- /home/ubuntu/financial_dashboard.png")
 
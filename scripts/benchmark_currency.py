@@ -0,0 +1,72 @@
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_series, coerce_numeric_columns
+
+
+def legacy_chain(series):
+    """Cadeia de .str.replace usada pelo limpador antes do brl_currency"""
+    temp_series = series.astype(str).str.replace('R$', '').str.replace('%', '').str.replace(',', '.').str.strip()
+    return pd.to_numeric(temp_series, errors='coerce')
+
+
+def synthetic_sheet(n_rows, n_columns=4, distinct=20_000, seed=42):
+    """Planilha sintética com os formatos encontrados nas exportações reais.
+
+    `distinct` controla quantos valores diferentes aparecem por coluna; as
+    planilhas reais repetem muito os mesmos preços e contribuições.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for c in range(n_columns):
+        grid = rng.integers(0, 2_000_000, size=distinct)
+        cents = grid[rng.integers(0, distinct, size=n_rows)]
+        reais = [f"{v // 100:,}".replace(',', '.') + f",{v % 100:02d}" for v in cents]
+        kind = rng.integers(0, 10, size=n_rows)
+        values = np.array([f"R$ {r}" for r in reais], dtype=object)
+        values[kind == 0] = np.array([f"-R$ {r}" for r in reais], dtype=object)[kind == 0]
+        values[kind == 1] = "R$ -"
+        values[kind == 2] = np.array([f"{v % 10000 / 100:.2f}%".replace('.', ',') for v in cents], dtype=object)[kind == 2]
+        values[kind == 3] = None
+        values[kind == 4] = "pix "
+        columns[f"col_{c}"] = values
+    return pd.DataFrame(columns)
+
+
+def timed(label, func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed:8.3f} s")
+    return result, elapsed
+
+
+def run_benchmark(n_rows=1_000_000, distinct=20_000):
+    print(f"Gerando planilha sintética com {n_rows:,} linhas e {distinct:,} valores distintos por coluna...")
+    df = synthetic_sheet(n_rows, distinct=distinct)
+    column = df['col_0']
+
+    print("\n=== Uma coluna ===")
+    legacy, t_legacy = timed("cadeia .str.replace + to_numeric", legacy_chain, column)
+    (parsed, coerced), t_new = timed("parse_brl_series", parse_brl_series, column)
+    print(f"Speedup: {t_legacy / t_new:.1f}x")
+    print(f"Valores numéricos: legado={legacy.notna().sum():,} novo={parsed.notna().sum():,} "
+          f"(células não convertidas: {coerced:,})")
+
+    print("\n=== Todas as colunas de texto ===")
+    _, t_legacy_all = timed("cadeia por coluna", lambda d: {c: legacy_chain(d[c]) for c in d.columns}, df)
+    (_, report), t_new_all = timed("coerce_numeric_columns", coerce_numeric_columns, df)
+    print(f"Speedup: {t_legacy_all / t_new_all:.1f}x")
+    for col, info in report.items():
+        print(f"  {col}: {info['parsed']:,} convertidas, {info['coerced']:,} viraram NaN")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do parser de moeda (BRL)")
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--distinct', type=int, default=20_000,
+                        help="valores distintos por coluna (use --distinct igual a --rows para o pior caso)")
+    args = parser.parse_args()
+    run_benchmark(args.rows, args.distinct)
@@ -0,0 +1,58 @@
+import os
+import time
+import argparse
+import tempfile
+import numpy as np
+import pandas as pd
+from openpyxl import Workbook
+
+from create_excel_dashboards import write_sheet_cells, write_sheet_rows
+
+
+def synthetic_ledger(n_rows, seed=42):
+    """Razão sintético no formato das abas Entrada_saída limpas"""
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 365, size=n_rows), unit='D')
+    entrada = np.round(rng.uniform(0, 500, size=n_rows), 2)
+    saida = np.round(rng.uniform(0, 300, size=n_rows), 2)
+    entrada[rng.random(n_rows) < 0.5] = np.nan
+    saida[~np.isnan(entrada)] = np.nan
+    return pd.DataFrame({
+        'Data': dates.strftime('%d/%m/%Y'),
+        'Descrição': rng.choice(['Dízimo', 'Oferta', 'Cantina', 'Luz', 'Água', 'Material'], size=n_rows),
+        'Entrada': entrada,
+        'Saída': saida,
+        'Forma de pagamento': rng.choice(['Pix', 'Dinheiro', 'Cartão'], size=n_rows),
+        'Observação': np.where(rng.random(n_rows) < 0.1, 'conferido', None),
+    })
+
+
+def export(df, fast, path):
+    start = time.perf_counter()
+    wb = Workbook(write_only=fast)
+    if "Sheet" in wb.sheetnames:
+        wb.remove(wb["Sheet"])
+    (write_sheet_rows if fast else write_sheet_cells)(wb, "Entrada_saida", df)
+    wb.save(path)
+    return time.perf_counter() - start
+
+
+def run_benchmark(n_rows=200_000):
+    df = synthetic_ledger(n_rows)
+    print(f"Aba sintética: {n_rows:,} linhas x {df.shape[1]} colunas\n")
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, fast in (("célula a célula (ws.cell)", False), ("write-only (ws.append)", True)):
+            path = os.path.join(tmp, f"bench_{int(fast)}.xlsx")
+            elapsed = export(df, fast, path)
+            results[fast] = elapsed
+            print(f"{label:<28} {elapsed:8.2f} s  {n_rows / elapsed:>10,.0f} linhas/s  "
+                  f"{os.path.getsize(path) / 1e6:6.1f} MB")
+    print(f"\nSpeedup: {results[False] / results[True]:.1f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark da exportação para Excel")
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+    run_benchmark(args.rows)
@@ -0,0 +1,177 @@
+import os
+import time
+import argparse
+import contextlib
+import io
+import pandas as pd
+
+from metrics_engine import DATASETS, MESES_BOMBOM, bombom_filename, compute_metrics
+
+# Planilhas Dívida originais, lidas pelos caminhos antigos (o motor usa dividas_pessoas)
+DIVIDAS_FILES = {
+    'dividas_2024': "Copyofcontadacasa-Dívida2024_cleaned.csv",
+    'dividas_2025': "Copyofcontadacasa-Dívida2025_cleaned.csv",
+}
+
+
+# Reproduções dos três caminhos de cálculo anteriores ao motor compartilhado:
+# cada um lê os CSVs de novo e procura as colunas por conta própria.
+
+def _read(cleaned_dir, key):
+    return pd.read_csv(os.path.join(cleaned_dir, {**DATASETS, **DIVIDAS_FILES}[key]))
+
+
+def _first(df, *keywords):
+    return next((col for col in df.columns if any(k in str(col).lower() for k in keywords)), None)
+
+
+def legacy_analyze_data(cleaned_dir):
+    """Caminho do analyze_data.py (primeira coluna encontrada + fallbacks)"""
+    s = {}
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'portaria')
+        col = _first(df, 'valor')
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+        s['cachorro_quente_portaria'] = df[col].sum()
+        forma = _first(df, 'forma de pagamento')
+        if forma:
+            df.groupby(forma)[col].sum()
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'campus')
+        col = _first(df, 'valor')
+        s['cachorro_quente_campus'] = pd.to_numeric(df[col], errors='coerce').sum() if col else sum(
+            df[c].sum() for c in df.columns if 'unnamed' in str(c).lower() and df[c].dtype == 'float64')
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'orcamento_cq')
+        for kw in ('valor sugerido', 'lucro líquido'):
+            col = _first(df, kw)
+            if col:
+                pd.to_numeric(df[col], errors='coerce').sum()
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'conta_casa')
+        for kw in (('entrada',), ('saída', 'saida')):
+            col = _first(df, *kw)
+            if col:
+                pd.to_numeric(df[col], errors='coerce').sum()
+    with contextlib.suppress(Exception):
+        for key in ('dividas_2025', 'dividas_2024'):
+            df = _read(cleaned_dir, key)
+            for col in df.columns:
+                if 'R$' in str(col) or any(k in str(col).lower() for k in ['valor', 'divida', 'dívida']):
+                    pd.to_numeric(df[col], errors='coerce').sum()
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'obra_arrecadacoes')
+        col = _first(df, 'valor')
+        s['obra_banheiro_arrecadado'] = pd.to_numeric(df[col], errors='coerce').sum()
+        metodo = _first(df, 'método de pagamento')
+        if metodo:
+            df.groupby(metodo)[col].sum()
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'obra_orcamentos')
+        col = _first(df, 'valor total')
+        if col:
+            pd.to_numeric(df[col], errors='coerce').sum()
+    return s
+
+
+def legacy_financial_analysis(cleaned_dir):
+    """Caminho do financial_analysis.py (soma de todas as colunas encontradas)"""
+    s = {}
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'portaria')
+        s['cachorro_quente_portaria'] = pd.to_numeric(df['Valor'], errors='coerce').sum()
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'campus')
+        cols = [c for c in df.columns if 'R$' in str(c) or 'valor' in str(c).lower()]
+        s['cachorro_quente_campus'] = sum(pd.to_numeric(df[c], errors='coerce').sum() for c in cols)
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'conta_casa')
+        for c in df.columns:
+            if 'entrada' in str(c).lower() or 'saída' in str(c).lower() or 'saida' in str(c).lower():
+                pd.to_numeric(df[c], errors='coerce').sum()
+    with contextlib.suppress(Exception):
+        for key in ('dividas_2025', 'dividas_2024'):
+            df = _read(cleaned_dir, key)
+            for col in df.columns:
+                if 'R$' in str(col) or any(k in str(col).lower() for k in ['valor', 'divida', 'dívida']):
+                    pd.to_numeric(df[col], errors='coerce').sum()
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'obra_arrecadacoes')
+        cols = [c for c in df.columns if 'valor' in str(c).lower()]
+        s['obra_banheiro_arrecadado'] = sum(pd.to_numeric(df[c], errors='coerce').sum() for c in cols)
+    with contextlib.suppress(Exception):
+        df = _read(cleaned_dir, 'obra_orcamentos')
+        for c in df.columns:
+            if 'total' in str(c).lower() or 'R$' in str(c):
+                pd.to_numeric(df[c], errors='coerce').sum()
+    return s
+
+
+def legacy_streamlit(cleaned_dir):
+    """Caminho do streamlit_dashboard (load_data + process_financial_data)"""
+    s = {}
+    datasets = {}
+    for key in ('portaria', 'obra_arrecadacoes', 'conta_casa'):
+        with contextlib.suppress(Exception):
+            datasets[key] = _read(cleaned_dir, key)
+    monthly = {}
+    for mes in MESES_BOMBOM:
+        with contextlib.suppress(Exception):
+            monthly[mes] = pd.read_csv(os.path.join(cleaned_dir, bombom_filename(mes)))
+    if 'portaria' in datasets and 'Valor' in datasets['portaria'].columns:
+        s['cachorro_quente_portaria'] = pd.to_numeric(datasets['portaria']['Valor'], errors='coerce').sum()
+    if 'obra_arrecadacoes' in datasets:
+        df = datasets['obra_arrecadacoes']
+        cols = [c for c in df.columns if 'valor' in c.lower()]
+        if cols:
+            s['obra_banheiro_arrecadado'] = pd.to_numeric(df[cols[0]], errors='coerce').sum()
+    if 'conta_casa' in datasets:
+        df = datasets['conta_casa']
+        for c in df.columns:
+            if 'entrada' in c.lower() or 'saída' in c.lower() or 'saida' in c.lower():
+                pd.to_numeric(df[c], errors='coerce').sum()
+    for mes, df in monthly.items():
+        for c in df.columns:
+            if 'valor' in c.lower() and 'obtido' in c.lower():
+                pd.to_numeric(df[c], errors='coerce').sum()
+    return s
+
+
+def timed(func, cleaned_dir, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func(cleaned_dir)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run_benchmark(cleaned_dir, repeat=20):
+    legacy = [
+        ('analyze_data.analyze_financial_data', legacy_analyze_data),
+        ('financial_analysis.analyze_financial_data', legacy_financial_analysis),
+        ('streamlit load_data + process_financial_data', legacy_streamlit),
+    ]
+    print(f"Diretório: {cleaned_dir} ({repeat} repetições)\n")
+    total_legacy = 0
+    for label, func in legacy:
+        elapsed, _ = timed(func, cleaned_dir, repeat)
+        total_legacy += elapsed
+        print(f"{label:<48} {elapsed * 1000:8.1f} ms")
+    print(f"{'soma dos três caminhos':<48} {total_legacy * 1000:8.1f} ms")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        elapsed, metrics = timed(compute_metrics, cleaned_dir, repeat)
+    print(f"{'metrics_engine.compute_metrics':<48} {elapsed * 1000:8.1f} ms")
+    print(f"\nSpeedup (contra os três caminhos): {total_legacy / elapsed:.1f}x")
+
+    reference = legacy_analyze_data(cleaned_dir)
+    for key, value in reference.items():
+        if abs(metrics.get(key, 0) - value) > 1e-6:
+            print(f"Aviso: {key} difere do analyze_data ({metrics.get(key)} != {value})")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do motor de métricas contra os cálculos anteriores")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+    run_benchmark(args.cleaned, args.repeat)
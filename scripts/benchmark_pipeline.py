@@ -0,0 +1,169 @@
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import contextlib
+import tracemalloc
+from datetime import datetime
+
+# As etapas só gravam figuras em disco
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+import pandas as pd
+
+import analyze_data
+from data_cleaning_simple import clean_and_save_individual_sheets
+from create_excel_dashboards import create_excel_dashboards
+from create_advanced_dashboard import create_advanced_dashboard
+from metrics_engine import SECTIONS, load_datasets, typed_frame, compute_section, combine_sections
+from analytics_db import named_query
+from synthetic_data import TEMPLATE_DIR, SCALES, generate
+
+# Tempo e pico de memória de cada etapa do pipeline sobre planilhas sintéticas
+# (synthetic_data.py) em 10x, 100x e 1000x o volume real. O resultado vai para
+# um JSON por execução; com --comparar, cada etapa é comparada com um JSON
+# anterior para que regressões apareçam.
+OUTPUT_DIR = '/home/ubuntu/benchmarks'
+RESULTS_VERSION = 1
+
+
+def dashboard_load(cleaned_dir):
+    """Carga do dashboard Streamlit com os caches vazios (process_financial_data
+    e os painéis em SQL), sem o servidor do Streamlit"""
+    datasets, errors = load_datasets(cleaned_dir)
+    typed = {key: typed_frame(df) for key, df in datasets.items()}
+    metrics = combine_sections({name: compute_section(name, typed, errors) for name in SECTIONS})
+    panels = [named_query('pagamentos', cleaned_dir, fonte='portaria'),
+              named_query('entradas_mensais', cleaned_dir, fonte='bombom'),
+              named_query('receita_eventos', cleaned_dir),
+              named_query('dividas_em_aberto', cleaned_dir)]
+    return metrics, panels
+
+
+def pipeline_stages(input_dir, cleaned_dir, output_dir):
+    """Etapas na ordem do pipeline: nome -> (função, argumentos).
+
+    financial_analysis.py reexporta analyze_data.analyze_financial_data: a
+    análise é uma etapa só.
+    """
+    return {
+        'limpeza': (clean_and_save_individual_sheets, (input_dir, cleaned_dir, True, 1)),
+        'analise (analyze_data)': (analyze_data.analyze_financial_data, (cleaned_dir, output_dir)),
+        'excel': (create_excel_dashboards, (True, cleaned_dir, os.path.join(output_dir, 'financial_dashboard.xlsx'))),
+        'html (plotly)': (create_advanced_dashboard, (False, cleaned_dir, output_dir)),
+        'dashboard (carga)': (dashboard_load, (cleaned_dir,)),
+    }
+
+
+def _call(func, args):
+    with contextlib.redirect_stdout(io.StringIO()):
+        func(*args)
+
+
+def measure(func, args, memory=True):
+    """(segundos, pico de memória em MB ou None) de uma etapa, sem a saída dela no terminal.
+
+    O tempo vem de uma execução sem tracemalloc (que deixa tudo bem mais
+    lento); o pico, de uma segunda execução rastreada (heap Python/NumPy).
+    O tracemalloc só vê o processo atual: numa etapa com workers > 1 (limpeza
+    em paralelo), a memória dos processos filhos fica de fora e o pico sai
+    subestimado; por isso a limpeza é medida com um worker só.
+    """
+    start = time.perf_counter()
+    _call(func, args)
+    elapsed = time.perf_counter() - start
+    if not memory:
+        return elapsed, None
+    tracemalloc.start()
+    try:
+        _call(func, args)
+        return elapsed, tracemalloc.get_traced_memory()[1] / 1e6
+    finally:
+        tracemalloc.stop()
+
+
+def run_scale(scale, template_dir, work_dir, memory=True):
+    """Gerar as planilhas de uma escala e medir cada etapa sobre elas"""
+    input_dir = os.path.join(work_dir, f'x{scale}', 'upload')
+    cleaned_dir = os.path.join(work_dir, f'x{scale}', 'cleaned_data')
+    output_dir = os.path.join(work_dir, f'x{scale}')
+    start = time.perf_counter()
+    written = generate(scale, template_dir, input_dir)
+    result = {'planilhas': len(written), 'linhas': sum(written.values()),
+              'geracao_s': round(time.perf_counter() - start, 3), 'etapas': {}}
+    print(f"\nx{scale}: {result['planilhas']} planilhas, {result['linhas']:,} linhas "
+          f"(geradas em {result['geracao_s']:.2f} s)")
+    for name, (func, args) in pipeline_stages(input_dir, cleaned_dir, output_dir).items():
+        try:
+            elapsed, peak = measure(func, args, memory)
+        except Exception as e:
+            result['etapas'][name] = {'erro': f"{type(e).__name__}: {e}"}
+            print(f"  {name:<30} FALHOU: {e}")
+            continue
+        result['etapas'][name] = {'segundos': round(elapsed, 4),
+                                  'pico_mb': round(peak, 1) if peak is not None else None}
+        memoria = f"  pico {peak:8.1f} MB" if peak is not None else ''
+        print(f"  {name:<30} {elapsed:9.2f} s{memoria}")
+    return result
+
+
+def compare(results, previous):
+    """Variação de tempo de cada etapa em relação a uma execução anterior"""
+    print("\n=== COMPARAÇÃO COM A EXECUÇÃO ANTERIOR ===")
+    for scale, result in results['escalas'].items():
+        before = previous.get('escalas', {}).get(scale)
+        if not before:
+            continue
+        for name, stage in result['etapas'].items():
+            old = before['etapas'].get(name, {}).get('segundos')
+            if 'segundos' in stage and old:
+                change = (stage['segundos'] / old - 1) * 100
+                alerta = '  <-- mais lento' if change > 10 else ''
+                print(f"  x{scale:<5} {name:<30} {old:9.2f} s -> {stage['segundos']:9.2f} s ({change:+6.1f}%){alerta}")
+
+
+def run_benchmark(scales=SCALES[:2], template_dir=TEMPLATE_DIR, output_dir=OUTPUT_DIR, memory=True,
+                  previous=None, work_dir=None):
+    """Medir todas as escalas e gravar benchmark_<data>.json em output_dir"""
+    results = {
+        'versao': RESULTS_VERSION,
+        'data': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'plataforma': platform.platform(),
+        'escalas': {},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        for scale in scales:
+            results['escalas'][str(scale)] = run_scale(scale, template_dir, work_dir or tmp, memory)
+
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados salvos em {path}")
+    if previous:
+        with open(previous, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline completo com planilhas sintéticas")
+    parser.add_argument('--templates', default=TEMPLATE_DIR, help="planilhas de modelo (CSV exportado)")
+    parser.add_argument('--scale', type=int, action='append',
+                        help=f"escala (padrão: {SCALES[0]} e {SCALES[1]}; use --scale {SCALES[2]} para a maior)")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="diretório dos JSON de resultados")
+    parser.add_argument('--comparar', metavar='JSON', help="resultado anterior para comparar")
+    parser.add_argument('--manter', metavar='DIR', help="manter as planilhas geradas e as saídas neste diretório")
+    parser.add_argument('--sem-memoria', action='store_true', help="só tempos (sem a segunda execução com tracemalloc)")
+    args = parser.parse_args()
+    results = run_benchmark(args.scale or SCALES[:2], args.templates, args.output, not args.sem_memoria,
+                            args.comparar, args.manter)
+    failed = [name for result in results['escalas'].values()
+              for name, stage in result['etapas'].items() if 'erro' in stage]
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,94 @@
+import time
+import pickle
+import argparse
+import tracemalloc
+import pandas as pd
+
+from cleaned_store import cleaned_version
+from metrics_engine import (SECTIONS, NUMERIC_ROLES, dataset_files, load_datasets, compute_metrics,
+                            compute_section, combine_sections, typed_frame)
+from schema_index import columns_for
+
+# Mesmo modo do dashboard (streamlit_dashboard.py): Copy-on-Write ligado
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Mede o custo de um rerun do dashboard (ex.: marcar um checkbox) sem o
+# servidor do Streamlit. Um acerto de @st.cache_data desserializa uma cópia do
+# valor guardado (pickle), por isso os caches são simulados com pickle.loads;
+# @st.cache_resource devolve o próprio objeto.
+
+def scaled_datasets(cleaned_dir, scale):
+    """Planilhas limpas reais repetidas `scale` vezes (dados grandes sintéticos)"""
+    datasets, _ = load_datasets(cleaned_dir)
+    scaled = {}
+    for key, df in datasets.items():
+        big = pd.concat([df] * scale, ignore_index=True)
+        big.attrs = dict(df.attrs)
+        scaled[key] = big
+    return scaled
+
+
+def rerun_before(cached_blob):
+    """Antes: load_data() em @st.cache_data e métricas recalculadas a cada rerun,
+    convertendo (e reatribuindo) as colunas de valores nas planilhas"""
+    datasets = pickle.loads(cached_blob)
+    for df in datasets.values():
+        for col in {col for role in NUMERIC_ROLES for col in columns_for(df, role)}:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    return compute_metrics(datasets=datasets)
+
+
+def rerun_after_changed(typed, section_cache):
+    """Depois, com uma planilha alterada: só a seção dela é recalculada, a partir
+    das planilhas tipadas em cache (cópias rasas com Copy-on-Write)"""
+    sections = {name: pickle.loads(blob) for name, blob in section_cache.items()}
+    datasets = {key: typed[key].copy(deep=False) for key in SECTIONS['conta_casa'][0]}
+    sections['conta_casa'] = compute_section('conta_casa', datasets)
+    return combine_sections(sections)
+
+
+def rerun_after_widget(cleaned_dir, metrics_blob):
+    """Depois, interação com widgets: stat dos arquivos e acerto nos caches"""
+    files = dataset_files()
+    versions = tuple(cleaned_version(files[key], cleaned_dir) for key in files)
+    return versions, pickle.loads(metrics_blob)
+
+
+def measure(label, func, *args, repeat=5):
+    times, peaks = [], []
+    for _ in range(repeat):
+        tracemalloc.start()
+        start = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - start)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:<44} {min(times) * 1000:10.1f} ms  pico {max(peaks) / 1e6:8.1f} MB")
+    return min(times)
+
+
+def run_benchmark(cleaned_dir, scale=200, repeat=5):
+    datasets = scaled_datasets(cleaned_dir, scale)
+    rows = sum(len(df) for df in datasets.values())
+    print(f"{len(datasets)} planilhas x{scale} = {rows:,} linhas\n")
+
+    cached_blob = pickle.dumps(datasets)
+    typed = {key: typed_frame(df) for key, df in datasets.items()}
+    section_cache = {name: pickle.dumps(compute_section(name, typed)) for name in SECTIONS}
+    metrics_blob = pickle.dumps(compute_metrics(datasets=typed))
+
+    before = measure("antes: rerun (cache_data + métricas)", rerun_before, cached_blob, repeat=repeat)
+    measure("depois: rerun com uma planilha alterada", rerun_after_changed, typed, section_cache, repeat=repeat)
+    after = measure("depois: rerun por interação com widgets", rerun_after_widget, cleaned_dir, metrics_blob,
+                    repeat=repeat)
+    print(f"\nSpeedup por interação com widgets: {before / after:,.0f}x")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Latência e memória por rerun do dashboard Streamlit")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--scale', type=int, default=200, help="quantas vezes repetir cada planilha")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+    run_benchmark(args.cleaned, args.scale, args.repeat)
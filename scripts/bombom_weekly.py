@@ -0,0 +1,182 @@
+import os
+import re
+import csv
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import write_columnar_frame, columnar_path
+from transactions import MESES
+
+# Tabela de fatos das planilhas semanais de bombom/chup-chup: uma linha por
+# item comprado, sabor produzido, forma de pagamento ou linha do fechamento de
+# caixa de cada semana. Gravada como uma planilha limpa a mais, para ser lida
+# com load_cleaned() como as outras.
+FACT_COLUMNS = ['ano', 'mes', 'semana', 'data_inicio', 'data_fim', 'trio',
+                'bloco', 'item', 'quantidade', 'valor']
+FACTS_NAME = 'bombom_fatos'
+FACTS_FILE = f'{FACTS_NAME}_cleaned.csv'
+FACTS_DIR = 'bombom'
+
+SHEET_PATTERN = re.compile(r'^CopyofBombomechup-chup(\d{4})-(.+?)(?:_cleaned)?\.csv$')
+SEMANA_PATTERN = re.compile(r'^SEMANA\s*(\d+)', re.IGNORECASE)
+DATE_PATTERN = re.compile(r'(\d{1,2})/(\d{1,2})')
+
+# Títulos dos quatro blocos lado a lado de cada semana -> nome do bloco na tabela
+BLOCK_TITLES = {
+    'lista de compra': 'compra',
+    'bombom/chup chup': 'producao',
+    'controle caixa': 'venda',
+    'fechamento de caixa': 'fechamento',
+}
+# Cabeçalhos dentro dos blocos (não são itens)
+HEADER_CELLS = {'item', 'sabores', 'fechamento de caixa'}
+
+
+def bombom_sheet(filename):
+    """'CopyofBombomechup-chup2025-Março.csv' -> (2025, 'Março'); None se não for um mês"""
+    match = SHEET_PATTERN.match(os.path.basename(filename))
+    if not match or match.group(2).lower() not in MESES:
+        return None
+    return int(match.group(1)), match.group(2)
+
+
+def _week_dates(text, ano, mes):
+    """'DIA 06/02 (quinta) à DIA 12/02 (quarta)' -> (início, fim)"""
+    dates = []
+    for dia, numero in DATE_PATTERN.findall(text or ''):
+        # Semanas na virada do ano (ex.: 29/12 a 04/01)
+        diff = int(numero) - MESES[mes.lower()]
+        year = ano + 1 if diff < -6 else ano - 1 if diff > 6 else ano
+        try:
+            dates.append(pd.Timestamp(year, int(numero), int(dia)))
+        except ValueError:
+            dates.append(pd.NaT)
+    dates += [pd.NaT] * (2 - len(dates))
+    return dates[0], dates[1]
+
+
+def _label(text):
+    return ' '.join(text.split())
+
+
+def parse_bombom_sheet(path, ano, mes):
+    """Ler uma planilha mensal de bombom (CSV bruto) numa única passada.
+
+    Cada semana começa numa linha "SEMANA n", seguida de DATA, TRIO e dos
+    blocos "Lista de compra", "Bombom/Chup Chup", "Controle caixa" e
+    "Fechamento de caixa" lado a lado; as colunas de cada bloco são tiradas da
+    linha de títulos. Semanas sem nenhum valor preenchido são descartadas e o
+    "FECHAMENTO MENSAL" (soma das semanas) é ignorado.
+    """
+    records, week, week_records = [], None, []
+    blocks, open_blocks = {}, set()
+
+    def close_week():
+        filled = [r for r in week_records if r[-2] not in ('', '0') or r[-1] not in ('', 'R$ 0,00')]
+        if filled:
+            records.extend(week_records)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            cells = [cell.strip() for cell in row]
+            first = next((cell for cell in cells if cell), '')
+            semana = SEMANA_PATTERN.match(first)
+            if semana or first.upper().startswith('FECHAMENTO MENSAL'):
+                if week is not None:
+                    close_week()
+                week = None
+                if semana:
+                    week = {'semana': int(semana.group(1)), 'datas': (pd.NaT, pd.NaT), 'trio': None}
+                    week_records, blocks, open_blocks = [], {}, set()
+                continue
+            if week is None or not first:
+                continue
+            if first.upper() == 'DATA':
+                week['datas'] = _week_dates(next((c for c in cells[cells.index(first) + 1:] if c), ''), ano, mes)
+                continue
+            if first.upper() == 'TRIO':
+                week['trio'] = next((c for c in cells[cells.index(first) + 1:] if c), None)
+                continue
+            titles = {BLOCK_TITLES[cell.lower()]: i for i, cell in enumerate(cells) if cell.lower() in BLOCK_TITLES}
+            if len(titles) > 1:
+                blocks, open_blocks = titles, set(titles)
+                continue
+
+            def cell(i):
+                return cells[i] if i < len(cells) else ''
+
+            def add(bloco, item, quantidade='', valor=''):
+                week_records.append((ano, mes, week['semana'], *week['datas'], week['trio'],
+                                     bloco, _label(item), quantidade, valor))
+
+            for bloco, col in blocks.items():
+                label = cell(col)
+                if bloco not in open_blocks or not label or label.lower() in HEADER_CELLS:
+                    continue
+                if bloco == 'compra':
+                    if label.lower().startswith('total'):
+                        open_blocks.discard(bloco)
+                    else:
+                        add(bloco, label, cell(col + 1), cell(col + 2))
+                elif bloco == 'producao':
+                    if label.lower() == 'total':
+                        open_blocks.discard(bloco)
+                    else:
+                        add(bloco, label, cell(col + 1))
+                elif bloco == 'venda':
+                    add(bloco, label, cell(col + 2), cell(col + 1))
+                else:
+                    # O valor do fechamento fica na última coluna preenchida da linha
+                    value = next((c for c in reversed(cells[col + 1:]) if c), '')
+                    if 'unidades' in label.lower() or 'perdid' in label.lower():
+                        add(bloco, label, quantidade=value)
+                    else:
+                        add(bloco, label, valor=value)
+        if week is not None:
+            close_week()
+
+    facts = pd.DataFrame.from_records(records, columns=FACT_COLUMNS)
+    for col in ('quantidade', 'valor'):
+        facts[col] = parse_brl_array(facts[col].replace('', None).to_numpy(dtype=object))[0]
+    facts['data_inicio'] = pd.to_datetime(facts['data_inicio'])
+    facts['data_fim'] = pd.to_datetime(facts['data_fim'])
+    facts['ano'] = facts['ano'].astype(np.int64)
+    facts['semana'] = facts['semana'].astype(np.int64)
+    # Linhas sem quantidade nem valor (ex.: PIX não preenchido) não são fatos
+    facts = facts[facts['quantidade'].notna() | facts['valor'].notna()]
+    ordem = facts['bloco'].map({bloco: i for i, bloco in enumerate(BLOCK_TITLES.values())})
+    return facts.iloc[np.lexsort((ordem.to_numpy(), facts['semana'].to_numpy()))].reset_index(drop=True)
+
+
+def facts_partial_path(output_dir, filename):
+    return os.path.join(output_dir, FACTS_DIR, f"{os.path.basename(filename)[:-len('.csv')]}.csv")
+
+
+def write_facts_partial(source_path, output_dir):
+    """Gravar a tabela de fatos de uma planilha mensal (chamado pela limpeza)"""
+    ano, mes = bombom_sheet(source_path)
+    facts = parse_bombom_sheet(source_path, ano, mes)
+    path = facts_partial_path(output_dir, source_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    facts.to_csv(path, index=False)
+    return path, len(facts)
+
+
+def read_facts(path):
+    return pd.read_csv(path, parse_dates=['data_inicio', 'data_fim'])
+
+
+def combine_facts(output_dir, partials):
+    """Juntar as tabelas mensais em bombom_fatos_cleaned.csv (e na cópia Arrow tipada)"""
+    frames = [read_facts(path) for path in sorted(partials) if os.path.exists(path)]
+    if frames:
+        facts = pd.concat(frames, ignore_index=True)
+    else:
+        facts = pd.DataFrame(columns=FACT_COLUMNS)
+    order = facts['mes'].str.lower().map(MESES)
+    facts = (facts.assign(_ordem=order).sort_values(['ano', '_ordem', 'semana'], kind='stable')
+             .drop(columns='_ordem').reset_index(drop=True))
+    facts.to_csv(os.path.join(output_dir, FACTS_FILE), index=False)
+    write_columnar_frame(facts, columnar_path(output_dir, FACTS_FILE))
+    return facts
@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+# Um único padrão cobre "R$ 8.649,84", "-R$ 125,00", "R$ -5,00", "R$ -" (zero
+# contábil), "122,17%", "0,005" e números já convertidos como "6.0".
+BRL_PATTERN = r'-?\s*(?:R\$)?\s*-?\s*(?:\d[\d.]*(?:,\d*)?|,\d+)?\s*%?'
+
+
+def _parse_unique(texts):
+    """Converter um array de strings (sem repetição) para float"""
+    direct = np.full(len(texts), np.nan)
+    if pd.api.types.infer_dtype(texts, skipna=True) != 'string':
+        # Células que o read_csv já converteu para número não passam pelo regex
+        direct = np.array([
+            float(v) if isinstance(v, (int, float, np.number)) and not isinstance(v, bool) else np.nan
+            for v in texts
+        ])
+    is_direct = ~np.isnan(direct)
+
+    texts = pd.Series(texts, dtype=object).astype(str).str.strip()
+    valid = texts.str.fullmatch(BRL_PATTERN).fillna(False).to_numpy(dtype=bool)
+    negative = texts.str.contains('-', regex=False).to_numpy(dtype=bool)
+    has_currency = texts.str.contains('R$', regex=False)
+
+    num = texts.str.replace(r'[^\d.,]', '', regex=True)
+    has_comma = num.str.contains(',', regex=False)
+    many_dots = num.str.count(r'\.') > 1
+    # Pontos são separadores de milhar quando há vírgula decimal, prefixo R$
+    # ou mais de um ponto; sozinhos ("24.2", "6.0") continuam sendo decimais
+    thousands = has_comma | has_currency | many_dots
+    num = num.where(~thousands, num.str.replace('.', '', regex=False))
+    num = num.str.replace(',', '.', regex=False)
+
+    values = pd.to_numeric(num, errors='coerce').to_numpy(dtype=float)
+    values = np.where(negative, -values, values)
+    values[~valid] = np.nan
+
+    # "R$ -" é o zero da formatação contábil do Google Sheets
+    dash_zero = valid & negative & has_currency.to_numpy(dtype=bool) & (num == '').to_numpy(dtype=bool)
+    values[dash_zero] = 0.0
+    values[is_direct] = direct[is_direct]
+    return values
+
+
+def parse_brl_array(values):
+    """Converter um array de valores em reais/percentuais para float em uma só passada.
+
+    Os valores são fatorizados antes do parsing, então cada texto distinto é
+    processado uma única vez. Retorna o array de floats e o número de células
+    não vazias que não puderam ser convertidas (viraram NaN).
+    """
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=True)
+    if len(uniques) == 0:
+        return np.full(len(codes), np.nan), 0
+    parsed_uniques = _parse_unique(uniques)
+    result = np.where(codes >= 0, parsed_uniques[np.maximum(codes, 0)], np.nan)
+    coerced = int(((codes >= 0) & np.isnan(result)).sum())
+    return result, coerced
+
+
+def parse_brl_series(series):
+    """Versão de parse_brl_array para uma Series, preservando o índice"""
+    values, coerced = parse_brl_array(series.to_numpy(dtype=object))
+    return pd.Series(values, index=series.index, name=series.name), coerced
+
+
+def coerce_numeric_columns(df, threshold=0.3):
+    """Converter todas as colunas de texto de um DataFrame numa única passada.
+
+    Uma coluna só é substituída pela versão numérica quando mais de `threshold`
+    das linhas puderam ser convertidas. Retorna o DataFrame e um relatório
+    {coluna: {'parsed': n, 'coerced': m}} das colunas convertidas, onde
+    `coerced` conta as células não vazias que viraram NaN.
+    """
+    text_positions = [
+        i for i in range(df.shape[1])
+        if pd.api.types.is_string_dtype(df.iloc[:, i].dtype)
+    ]
+    report = {}
+    if not text_positions or len(df) == 0:
+        return df, report
+
+    n_rows = len(df)
+    block = df.iloc[:, text_positions].to_numpy(dtype=object)
+    flat, _ = parse_brl_array(block.ravel(order='F'))
+    parsed = flat.reshape((n_rows, len(text_positions)), order='F')
+    present = ~pd.isna(block)
+
+    df = df.copy()
+    for j, position in enumerate(text_positions):
+        column_values = parsed[:, j]
+        n_parsed = int((~np.isnan(column_values)).sum())
+        if n_parsed / n_rows > threshold:
+            df.isetitem(position, column_values)
+            report[df.columns[position]] = {
+                'parsed': n_parsed,
+                'coerced': int((present[:, j] & np.isnan(column_values)).sum()),
+            }
+    return df, report
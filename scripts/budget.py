@@ -0,0 +1,406 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import write_columnar_frame, columnar_path, load_cleaned
+from ledger import LEDGER_FILE
+from schema_index import fold
+
+# Orçamentos: uma linha por cotação de cada item orçado. Itens cotados em
+# várias lojas (ou em várias tabelas da mesma planilha) repetem a `linha`,
+# uma vez por fornecedor; o valor orçado do item é a cotação mais barata.
+BUDGET_COLUMNS = ['projeto', 'ano', 'arquivo', 'categoria', 'linha', 'item', 'quantidade',
+                  'fornecedor', 'custo_unitario', 'valor_total']
+BUDGET_NAME = 'orcamento_linhas'
+BUDGET_FILE = f'{BUDGET_NAME}_cleaned.csv'
+BUDGET_DIR = 'orcamento'
+OUTPUT_DIR = '/home/ubuntu/orcamento'
+
+OBRA_PATTERN = re.compile(r'^CopyofOBRA(BANHEIRO)\D*(\d{2})-Or[çc]amentos(?:_cleaned)?\.csv$')
+CQ_PATTERN = re.compile(r'^Copyofcachorroquente-(or[çc]amento(\d{4})|valores([\d_]+))(?:_cleaned)?\.csv$')
+# Palavras da descrição de um gasto que o ligam ao projeto, sem item específico
+PROJECT_KEYWORDS = {'obra_banheiro': ('banheiro', 'obra'), 'cachorro_quente': ('cachorro', 'cq')}
+# Palavras genéricas demais para ligar um gasto a um item do orçamento
+STOPWORDS = {'de', 'da', 'do', 'das', 'dos', 'com', 'para', 'e', 'kit', 'conjunto', 'suporte', 'porta',
+             'valor', 'frete', 'material', 'total', 'compra'}
+
+
+def budget_sheet(filename):
+    """'CopyofOBRABANHEIROSETEMBRO25-Orçamentos.csv' -> ('obra_banheiro', 2025);
+    'Copyofcachorroquente-valores11_11.csv' -> ('cachorro_quente_11_11', None)"""
+    name = os.path.basename(filename)
+    match = OBRA_PATTERN.match(name)
+    if match:
+        return 'obra_banheiro', 2000 + int(match.group(2))
+    match = CQ_PATTERN.match(name)
+    if match:
+        ano = int(match.group(2)) if match.group(2) else None
+        return f"cachorro_quente_{match.group(2) or match.group(3)}", ano
+    return None
+
+
+def _grid(path):
+    """Células (texto, sem espaços nas pontas), as mesmas sem acento e os valores já convertidos"""
+    with open(path, newline='', encoding='utf-8') as f:
+        raw = [[cell.strip() for cell in row] for row in csv.reader(f)]
+    width = max((len(row) for row in raw), default=0)
+    grid = np.array([row + [''] * (width - len(row)) for row in raw], dtype=object).reshape(len(raw), width)
+    folded = np.vectorize(fold, otypes=[object])(grid) if grid.size else grid
+    values = parse_brl_array(grid.ravel())[0].reshape(grid.shape)
+    return grid, folded, values
+
+
+def _label_block(grid, folded, values, row, col, categoria, lines):
+    """Quadro rótulo/valor (ex.: "Mão de Obra": Pedreiro, Diária...), até a linha TOTAL"""
+    while row < len(grid) and grid[row, col] and not folded[row, col].startswith('total'):
+        valor = values[row, col + 1] if col + 1 < grid.shape[1] else np.nan
+        if valor > 0:
+            lines.append((categoria, grid[row, col], np.nan, None, valor, valor))
+        row += 1
+    return row
+
+
+def _quotes_block(grid, folded, values, row, start, stop, categoria, lines):
+    """Quadro de cotações: a linha abaixo do título nomeia as lojas; se a seguinte
+    tem 'Valor Unitário'/'Valor Total', cada loja ocupa um par de colunas, senão
+    a coluna da loja traz o valor. Os itens ficam na segunda coluna, até TOTAL."""
+    suppliers = [c for c in range(start, stop) if grid[row, c]]
+    sub = row + 1
+    if sub < len(grid) and any(folded[sub, c] == 'valor unitario' for c in range(start, stop)):
+        pairs = []
+        for n, c in enumerate(suppliers):
+            end = suppliers[n + 1] if n + 1 < len(suppliers) else stop
+            unit = next((k for k in range(c, end) if folded[sub, k] == 'valor unitario'), None)
+            total = next((k for k in range(c, end) if folded[sub, k] == 'valor total'), None)
+            pairs.append((grid[row, c], unit, total))
+        quant = next((c for c in range(1, stop) if folded[sub, c].startswith('quant')), None)
+        first = sub + 1
+    else:
+        pairs = [(grid[row, c], None, c) for c in suppliers]
+        quant, first = None, row + 1
+
+    r = first
+    while r < len(grid) and grid[r, 1] and not folded[r, 1].startswith('total'):
+        if folded[r, 1] != 'link':
+            qtd = values[r, quant] if quant is not None else np.nan
+            for fornecedor, unit, total in pairs:
+                custo = values[r, unit] if unit is not None else np.nan
+                valor = values[r, total] if total is not None else np.nan
+                if not (custo > 0 or valor > 0):
+                    continue
+                # Sem quantidade a planilha zera o total (ex.: frete): vale o unitário
+                valor = valor if valor > 0 else custo * qtd if qtd > 0 else custo
+                custo = custo if custo > 0 else valor / qtd if qtd > 0 else valor
+                quantidade = qtd if qtd > 0 or valor == custo else round(valor / custo, 2)
+                lines.append((categoria, grid[r, 1], quantidade, fornecedor, custo, valor))
+        r += 1
+    return r
+
+
+def parse_quotes_sheet(path):
+    """Linhas de um orçamento com cotações por loja (planilha Orçamentos da obra).
+
+    Cada quadro começa numa linha de títulos ("Lojas online", "Vidraçaria",
+    "Mão de Obra"...), com a primeira coluna útil vazia; títulos lado a lado
+    dividem as colunas entre quadros que correm nas mesmas linhas.
+    """
+    grid, folded, values = _grid(path)
+    lines = []
+    row = 0
+    while row < len(grid) - 1:
+        titles = [c for c in range(2, grid.shape[1]) if grid[row, c] and np.isnan(values[row, c])]
+        if grid[row, 1] or not titles:
+            row += 1
+            continue
+        end = row + 1
+        for start, stop in zip(titles, titles[1:] + [grid.shape[1]]):
+            categoria = ' '.join(grid[row, start].split())
+            below = range(start, stop)
+            if any(values[row + 1, c] > 0 for c in below):
+                end = max(end, _label_block(grid, folded, values, row + 1, start, categoria, lines))
+            else:
+                end = max(end, _quotes_block(grid, folded, values, row + 1, start, stop, categoria, lines))
+        row = end + 1
+    return pd.DataFrame.from_records(lines, columns=['categoria', 'item', 'quantidade', 'fornecedor',
+                                                     'custo_unitario', 'valor_total'])
+
+
+def parse_ingredients_sheet(path):
+    """Linhas de uma planilha de custos do cachorro-quente (ingredientes e refri).
+
+    Cada tabela começa na linha 'ingredientes' (valor do pacote, quantidade de
+    pacotes, valor que pagamos total); o refri vem ao lado, na linha do custo
+    por cachorro-quente. Tabelas repetidas na mesma planilha são cotações
+    alternativas dos mesmos itens ('tabela 1', 'tabela 2').
+    """
+    grid, folded, values = _grid(path)
+    headers = [r for r in range(len(grid)) if folded[r, 1] == 'ingredientes']
+    lines = []
+    for n, header in enumerate(headers, start=1):
+        fornecedor = f'tabela {n}' if len(headers) > 1 else None
+        cols = {label: c for c, label in enumerate(folded[header])}
+        custo_col, qtd_col = cols.get('valor'), cols.get('quantidade')
+        total_col = cols.get('valor que pagamos total')
+        r = header + 1
+        while r < len(grid) and grid[r, 1]:
+            custo = values[r, custo_col] if custo_col is not None else np.nan
+            qtd = values[r, qtd_col] if qtd_col is not None else np.nan
+            valor = values[r, total_col] if total_col is not None else np.nan
+            valor = valor if valor > 0 else custo * qtd
+            if valor > 0:
+                lines.append(('ingredientes', grid[r, 1], qtd, fornecedor, custo, valor))
+            r += 1
+        stop = headers[n] if n < len(headers) else len(grid)
+        for rr, c in zip(*np.nonzero(folded[r:stop, :-1] == 'refri')):
+            if values[r + rr, c + 1] > 0:
+                lines.append(('bebidas', grid[r + rr, c], np.nan, fornecedor,
+                              values[r + rr, c + 1], values[r + rr, c + 1]))
+    return pd.DataFrame.from_records(lines, columns=['categoria', 'item', 'quantidade', 'fornecedor',
+                                                     'custo_unitario', 'valor_total'])
+
+
+def parse_budget_sheet(path):
+    """Orçamento de uma planilha (CSV bruto), com projeto, ano e número da linha orçada"""
+    projeto, ano = budget_sheet(path)
+    lines = parse_quotes_sheet(path) if projeto == 'obra_banheiro' else parse_ingredients_sheet(path)
+    lines['item'] = lines['item'].map(lambda text: ' '.join(text.split()))
+    # O mesmo item cotado em várias lojas ou em vários quadros ("Kit vaso
+    # convencional" em Lojas online e em Material de Construção) é uma linha só
+    # do orçamento; o frete é de cada quadro
+    item = lines['item'].map(fold)
+    chave = item.where(~item.str.startswith('frete'), lines['categoria'].map(fold) + '|' + item)
+    lines['linha'] = pd.factorize(chave)[0] + 1
+    lines['projeto'], lines['ano'] = projeto, ano
+    return lines.assign(arquivo=None)[BUDGET_COLUMNS]
+
+
+def sheet_total(path):
+    """Total declarado na planilha ("TOTAL DA OBRA"), ou None se não houver"""
+    grid, folded, values = _grid(path)
+    for r, c in zip(*np.nonzero(folded[:, :-1] == 'total da obra')):
+        if not np.isnan(values[r, c + 1]):
+            return float(values[r, c + 1])
+    return None
+
+
+def budget_partial_path(output_dir, filename):
+    return os.path.join(output_dir, BUDGET_DIR, f"{os.path.basename(filename)[:-len('.csv')]}.csv")
+
+
+def write_budget_partial(source_path, output_dir):
+    """Gravar as linhas orçadas de uma planilha de orçamento (chamado pela limpeza).
+
+    Retorna (caminho, cotações, aviso): o aviso compara o orçado (cotações mais
+    baratas) com o total declarado na planilha, quando houver um.
+    """
+    lines = parse_budget_sheet(source_path)
+    lines['arquivo'] = os.path.basename(source_path)[:-len('.csv')]
+    path = budget_partial_path(output_dir, source_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    lines.to_csv(path, index=False)
+    aviso = None
+    declarado = sheet_total(source_path)
+    orcado = project_budget(lines, lines['projeto'].iloc[0]) if len(lines) else None
+    if declarado is not None and orcado is not None and abs(orcado - declarado) > 0.005:
+        aviso = (f"orçado R$ {orcado:,.2f} (cotações mais baratas) difere do total da planilha "
+                 f"R$ {declarado:,.2f} em R$ {orcado - declarado:,.2f}")
+    return path, len(lines), aviso
+
+
+def combine_budget(output_dir, partials):
+    """Juntar as linhas de todas as planilhas em orcamento_linhas_cleaned.csv (e na cópia Arrow)"""
+    tables = [pd.read_csv(path) for path in sorted(partials) if os.path.exists(path)]
+    tables = [table for table in tables if len(table)]
+    lines = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=BUDGET_COLUMNS)
+    lines = lines.astype({'ano': 'Int64', 'linha': 'int64'})
+    lines.to_csv(os.path.join(output_dir, BUDGET_FILE), index=False)
+    write_columnar_frame(lines, columnar_path(output_dir, BUDGET_FILE))
+    return lines
+
+
+def budgeted_lines(lines):
+    """Valor orçado de cada linha: a cotação mais barata (com o fornecedor escolhido)"""
+    if not len(lines):
+        return pd.DataFrame(columns=['projeto', 'ano', 'linha', 'categoria', 'item', 'fornecedor', 'orcado'])
+    best = lines.sort_values('valor_total', kind='stable').drop_duplicates(['projeto', 'linha'])
+    best = best.rename(columns={'valor_total': 'orcado'})
+    return best.sort_values(['projeto', 'linha'])[
+        ['projeto', 'ano', 'linha', 'categoria', 'item', 'fornecedor', 'orcado']].reset_index(drop=True)
+
+
+def project_budget(lines, projeto):
+    """Total orçado de um projeto (soma das cotações mais baratas); None sem linhas do projeto"""
+    orcado = budgeted_lines(lines)
+    orcado = orcado[orcado['projeto'] == projeto]
+    return float(orcado['orcado'].sum()) if len(orcado) else None
+
+
+def category_index(orcado):
+    """Índice palavra -> (projeto, linha) para ligar gastos às linhas orçadas.
+
+    Entram o nome inteiro do item e cada palavra dele que só aparece num item
+    (sem acento, minúscula, singular); palavras de projeto ('banheiro')
+    ligam o gasto ao projeto sem linha.
+    """
+    keys = {}
+    for projeto, linha, item in zip(orcado['projeto'], orcado['linha'], orcado['item']):
+        nome = fold(item)
+        keys.setdefault(nome, set()).add((projeto, linha))
+        for word in set(re.findall(r'[a-z]+', nome)):
+            if len(word) > 2 and word not in STOPWORDS:
+                keys.setdefault(word.rstrip('s'), set()).add((projeto, linha))
+    index = {key: next(iter(targets)) for key, targets in keys.items() if len(targets) == 1}
+    for projeto in orcado['projeto'].unique():
+        for prefixo, words in PROJECT_KEYWORDS.items():
+            if projeto.startswith(prefixo):
+                for word in words:
+                    index.setdefault(word, (projeto, 0))
+    return index
+
+
+def ledger_spending(cleaned_dir):
+    """Saídas do razão da conta da casa (data, descrição, valor)"""
+    if not os.path.exists(os.path.join(cleaned_dir, LEDGER_FILE)):
+        return pd.DataFrame(columns=['data', 'descricao', 'valor'])
+    ledger = load_cleaned(LEDGER_FILE, cleaned_dir)
+    saidas = ledger[ledger['tipo'] == 'saida']
+    return pd.DataFrame({
+        'data': pd.to_datetime(saidas['data']).to_numpy(),
+        'descricao': saidas['descricao'].to_numpy(dtype=object),
+        'valor': saidas['valor'].to_numpy(dtype=float),
+    })
+
+
+def match_spending(gastos, orcado):
+    """Ligar cada gasto a uma linha orçada (ou só ao projeto, linha 0).
+
+    A descrição vira palavras e cada palavra é procurada no índice (consulta
+    por hash, sem comparar todos os gastos com todas as linhas); vale a
+    descrição inteira e, senão, a primeira palavra encontrada. Gastos fora do
+    ano de um projeto com ano não contam para ele.
+    """
+    index = category_index(orcado)
+    nome = gastos['descricao'].map(fold, na_action='ignore').fillna('')
+    palavras = nome.str.findall(r'[a-z]+').map(lambda words: [word.rstrip('s') for word in words])
+    candidatos = pd.concat([nome.rename('chave'), palavras.explode().rename('chave')]).dropna()
+    achados = candidatos.map(index).dropna()
+    alvo = achados.groupby(level=0, sort=False).first()
+    matched = gastos.loc[alvo.index].assign(
+        projeto=[target[0] for target in alvo], linha=[target[1] for target in alvo])
+    anos = orcado.drop_duplicates('projeto').set_index('projeto')['ano']
+    ano = matched['projeto'].map(anos)
+    return matched[ano.isna() | (ano == matched['data'].dt.year)].reset_index(drop=True)
+
+
+def budget_variance(lines, gastos):
+    """Orçado x realizado por linha, por projeto e por mês.
+
+    Retorna {'linhas', 'projetos', 'mensal'}. Variação = realizado - orçado;
+    gastos ligados ao projeto sem item aparecem na linha 0 ("não orçado"). No
+    mensal, o saldo é o orçado do projeto menos o realizado acumulado.
+    """
+    orcado = budgeted_lines(lines)
+    realizados = match_spending(gastos, orcado)
+    por_linha = realizados.groupby(['projeto', 'linha'])['valor'].agg(realizado='sum', gastos='count')
+    linhas = orcado.merge(por_linha.reset_index(), on=['projeto', 'linha'], how='outer')
+    linhas['item'] = linhas['item'].fillna('não orçado')
+    linhas[['orcado', 'realizado']] = linhas[['orcado', 'realizado']].fillna(0.0)
+    linhas['gastos'] = linhas['gastos'].fillna(0).astype(int)
+    linhas['variacao'] = linhas['realizado'] - linhas['orcado']
+    linhas = linhas.sort_values(['projeto', 'linha']).reset_index(drop=True)
+
+    projetos = linhas.groupby('projeto')[['orcado', 'realizado']].sum()
+    projetos['variacao'] = projetos['realizado'] - projetos['orcado']
+    projetos['execucao'] = np.where(projetos['orcado'] > 0, projetos['realizado'] / projetos['orcado'] * 100, np.nan)
+
+    mensal = (realizados.assign(mes=realizados['data'].dt.strftime('%Y-%m'))
+              .groupby(['projeto', 'mes'])['valor'].sum().rename('realizado').reset_index())
+    mensal['acumulado'] = mensal.groupby('projeto')['realizado'].cumsum()
+    mensal['orcado'] = mensal['projeto'].map(projetos['orcado'])
+    mensal['saldo'] = mensal['orcado'] - mensal['acumulado']
+    return {'linhas': linhas, 'projetos': projetos.reset_index(), 'mensal': mensal}
+
+
+class BudgetBook:
+    """Orçado e realizado por linha e por projeto, atualizados por linha.
+
+    Guarda as cotações de cada linha; mudar uma cotação (`set_quote`) ou
+    registrar um gasto (`record`) recalcula só aquela linha e ajusta o total
+    do projeto pela diferença, sem reler as outras linhas do orçamento.
+    """
+
+    def __init__(self, lines, gastos=None):
+        self.quotes = {}
+        for projeto, linha, fornecedor, valor in zip(lines['projeto'], lines['linha'],
+                                                     lines['fornecedor'], lines['valor_total']):
+            quotes = self.quotes.setdefault((projeto, int(linha)), {})
+            fornecedor = fornecedor if isinstance(fornecedor, str) else None
+            # A mesma loja pode cotar o item em dois quadros: vale a menor cotação
+            quotes[fornecedor] = min(valor, quotes.get(fornecedor, valor))
+        self.orcado = {key: min(quotes.values()) for key, quotes in self.quotes.items()}
+        self.realizado = {}
+        self.projetos = {}
+        for (projeto, _), valor in self.orcado.items():
+            total = self.projetos.setdefault(projeto, {'orcado': 0.0, 'realizado': 0.0})
+            total['orcado'] += valor
+        if gastos is not None and len(gastos):
+            matched = match_spending(gastos, budgeted_lines(lines))
+            for projeto, linha, valor in zip(matched['projeto'], matched['linha'], matched['valor']):
+                self.record(projeto, linha, valor)
+
+    def set_quote(self, projeto, linha, fornecedor, valor):
+        """Incluir, alterar (ou, com valor None, remover) a cotação de um fornecedor"""
+        key = (projeto, int(linha))
+        quotes = self.quotes.setdefault(key, {})
+        if valor is None:
+            quotes.pop(fornecedor, None)
+        else:
+            quotes[fornecedor] = float(valor)
+        antes = self.orcado.pop(key, 0.0)
+        if quotes:
+            self.orcado[key] = min(quotes.values())
+        total = self.projetos.setdefault(projeto, {'orcado': 0.0, 'realizado': 0.0})
+        total['orcado'] += self.orcado.get(key, 0.0) - antes
+
+    def record(self, projeto, linha, valor):
+        """Registrar um gasto numa linha (0: do projeto, sem item)"""
+        key = (projeto, int(linha))
+        self.realizado[key] = self.realizado.get(key, 0.0) + float(valor)
+        self.projetos.setdefault(projeto, {'orcado': 0.0, 'realizado': 0.0})['realizado'] += float(valor)
+
+    def line(self, projeto, linha):
+        key = (projeto, int(linha))
+        orcado, realizado = self.orcado.get(key, 0.0), self.realizado.get(key, 0.0)
+        return {'orcado': orcado, 'realizado': realizado, 'variacao': realizado - orcado}
+
+    def project(self, projeto):
+        total = self.projetos.get(projeto, {'orcado': 0.0, 'realizado': 0.0})
+        return {**total, 'variacao': total['realizado'] - total['orcado']}
+
+
+def run_budget(cleaned_dir='/home/ubuntu/cleaned_data', output_dir=OUTPUT_DIR):
+    """Orçado x realizado de todos os orçamentos, gravado em orcamento_<visão>.csv"""
+    print("=== ORÇADO X REALIZADO ===")
+    lines = load_cleaned(BUDGET_FILE, cleaned_dir)
+    result = budget_variance(lines, ledger_spending(cleaned_dir))
+    os.makedirs(output_dir, exist_ok=True)
+    for visao, frame in result.items():
+        path = os.path.join(output_dir, f'orcamento_{visao}.csv')
+        frame.to_csv(path, index=False)
+        print(f"{visao}: {len(frame)} registros -> {path}")
+    for row in result['projetos'].itertuples():
+        print(f"  {row.projeto}: orçado R$ {row.orcado:,.2f}, realizado R$ {row.realizado:,.2f}, "
+              f"variação R$ {row.variacao:,.2f}")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Orçado x realizado (orçamento2025, valores e Orçamentos da obra)")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    args = parser.parse_args()
+    run_budget(args.cleaned, args.output)
@@ -0,0 +1,227 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import write_columnar_frame, columnar_path, load_cleaned
+from payment_methods import canonical_methods
+from schema_index import fold
+
+# Vendas de cachorro-quente: uma linha por produto de cada venda, com
+# quantidade, preço unitário da grade do evento e valor = quantidade × preço.
+# O valor anotado na planilha (coluna Valor, com descontos e acertos) é
+# repartido entre os produtos da venda em `valor_registrado`.
+SALES_COLUMNS = ['evento', 'bloco', 'linha', 'cliente', 'categoria', 'produto', 'quantidade',
+                 'preco_unitario', 'valor', 'valor_registrado', 'pago', 'forma_pagamento']
+SALES_NAME = 'cachorro_quente_vendas'
+SALES_FILE = f'{SALES_NAME}_cleaned.csv'
+# Totais por evento, gravados junto com as vendas (os dashboards só leem esta tabela)
+EVENTS_NAME = 'cachorro_quente_eventos'
+EVENTS_FILE = f'{EVENTS_NAME}_cleaned.csv'
+EVENT_COLUMNS = ['evento', 'vendas', 'itens', 'receita', 'valor_registrado', 'receita_paga']
+SALES_DIR = 'cachorro_quente'
+
+SHEET_PATTERN = re.compile(r'^Copyofcachorroquente-(.+?)(?:_cleaned)?\.csv$')
+# Produto sem quantidade na linha, só com o valor anotado (ex.: refrigerante)
+AVULSO = 'Avulso'
+
+
+def sales_sheet(filename):
+    """'Copyofcachorroquente-Vendaportaria.csv' -> 'portaria'; None se não for do cachorro-quente"""
+    match = SHEET_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    name = match.group(1)
+    return re.sub(r'^venda', '', name, flags=re.IGNORECASE) or name
+
+
+def _is_price(cell):
+    return cell.startswith('R$') and not np.isnan(parse_brl_array(np.array([cell], dtype=object))[0][0])
+
+
+def _attribute(label):
+    if label in ('valor', 'pg'):
+        return label
+    if label.startswith(('forma de pagamento', 'metodo de pagamento')):
+        return 'forma'
+    return None
+
+
+def _product_name(text):
+    text = ' '.join(text.split())
+    return text[:1].upper() + text[1:].lower() if text else None
+
+
+def _segments(grid, folded, header, footer, price_row, groups):
+    """Grupos de colunas de produto de um bloco, com as colunas de valor, PG,
+    forma de pagamento e cliente de cada um.
+
+    Colunas com preço seguidas formam um grupo; as colunas de atributos vêm
+    logo à direita e a do cliente, à esquerda, quando tem título. Um grupo sem
+    atributos nem cliente (ex.: "premium" ao lado de "simples") é parte da
+    mesma venda do grupo anterior.
+    """
+    width = grid.shape[1]
+    prices = [c for c in range(1, width) if _is_price(grid[price_row, c])]
+    runs = []
+    for c in prices:
+        if runs and c == runs[-1][-1] + 1:
+            runs[-1].append(c)
+        else:
+            runs.append([c])
+
+    segments = []
+    for cols in runs:
+        attributes = {}
+        c = cols[-1] + 1
+        while c < width and _attribute(folded[header, c]):
+            attributes[_attribute(folded[header, c])] = c
+            c += 1
+        before = cols[0] - 1
+        cliente = before if before >= 0 and grid[header, before] and before not in prices \
+            and not _attribute(folded[header, before]) else None
+        names = [_product_name(grid[header, c] or (grid[footer, c] if footer is not None else '')) or f'Item {c}'
+                 for c in cols]
+        products = [(c, name, groups[c]) for c, name in zip(cols, names)]
+        if segments and not attributes and cliente is None:
+            segments[-1]['products'].extend(products)
+        else:
+            segments.append({'products': products, 'attributes': attributes, 'cliente': cliente})
+    return segments
+
+
+def _block_sales(grid, rows, segment, price_row):
+    """Vendas de um grupo de colunas, com quantidade × preço calculado de uma vez"""
+    cols = [c for c, _, _ in segment['products']]
+    prices = parse_brl_array(grid[price_row, cols])[0]
+    cells = grid[np.ix_(rows, cols)]
+    parsed = parse_brl_array(cells.ravel())[0].reshape(cells.shape)
+    # Células com 'R$' trazem o valor vendido, não a quantidade
+    valor_cell = np.char.startswith(cells.astype(str), 'R$')
+    quantidade = np.where(valor_cell, parsed / prices, parsed)
+    quantidade = np.where(quantidade > 0, quantidade, np.nan)
+    valor = quantidade * prices
+
+    attributes = segment['attributes']
+    registrado = (parse_brl_array(grid[rows, attributes['valor']])[0] if 'valor' in attributes
+                  else np.full(len(rows), np.nan))
+    avulso = np.isnan(quantidade).all(axis=1) & (registrado > 0)
+
+    linha, produto = np.nonzero(~np.isnan(quantidade))
+    total_linha = np.nansum(valor, axis=1)
+    facts = pd.DataFrame({
+        'linha': rows[linha],
+        'produto_col': produto,
+        'quantidade': quantidade[linha, produto],
+        'preco_unitario': prices[produto],
+        'valor': valor[linha, produto],
+        'valor_registrado': registrado[linha] * valor[linha, produto] / total_linha[linha],
+    })
+    names = np.array([name for _, name, _ in segment['products']], dtype=object)
+    groups = np.array([group for _, _, group in segment['products']], dtype=object)
+    facts['produto'], facts['categoria'] = names[produto], groups[produto]
+    extras = np.nonzero(avulso)[0]
+    facts = pd.concat([facts.drop(columns='produto_col'), pd.DataFrame({
+        'linha': rows[extras], 'quantidade': np.nan, 'preco_unitario': np.nan,
+        'valor': registrado[extras], 'valor_registrado': registrado[extras], 'produto': AVULSO, 'categoria': None,
+    })], ignore_index=True)
+
+    def by_row(col):
+        return pd.Series(grid[rows, col] if col is not None else np.full(len(rows), ''), index=rows)
+
+    facts['cliente'] = by_row(segment['cliente']).reindex(facts['linha']).replace('', None).to_numpy()
+    pg = by_row(attributes.get('pg')).reindex(facts['linha']).str.lower()
+    facts['pago'] = (pg == 'ok').to_numpy()
+    facts['forma_pagamento'] = canonical_methods(by_row(attributes.get('forma')).reindex(facts['linha']).to_numpy())
+    return facts
+
+
+def parse_sales_sheet(path, evento):
+    """Vendas de uma planilha de cachorro-quente (CSV bruto).
+
+    Cada bloco começa numa linha 'venda' (que pode nomear as categorias das
+    colunas: simples, premium); logo abaixo vêm a grade de preços ('R$ 10,00'
+    acima de "Combo", 'R$ 7,00' acima de "Dogão") e a linha de títulos. As
+    vendas seguem até a linha "Total" (cuja linha seguinte nomeia os produtos
+    que ficaram sem título) ou até o próximo bloco. Planilhas sem bloco de
+    vendas (custos, orçamento) não geram linhas.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        raw = [[cell.strip() for cell in row] for row in csv.reader(f)]
+    if not raw:
+        return pd.DataFrame(columns=SALES_COLUMNS)
+    width = max(len(row) for row in raw)
+    grid = np.array([row + [''] * (width - len(row)) for row in raw], dtype=object)
+    folded = np.vectorize(fold, otypes=[object])(grid)
+
+    starts = [i for i in range(len(grid)) if folded[i, 0] == 'venda'] + [len(grid)]
+    parts = []
+    for bloco, (start, end) in enumerate(zip(starts, starts[1:]), start=1):
+        price_row = next((r for r in range(start + 1, min(start + 4, end))
+                          if any(_is_price(cell) for cell in grid[r, 1:])), None)
+        if price_row is None or price_row + 1 >= end:
+            continue
+        header = price_row + 1
+        total = next((r for r in range(header + 1, end) if folded[r, 0] == 'total'), None)
+        footer = total + 1 if total is not None and total + 1 < end else None
+        groups, label = [], None
+        for cell in grid[start]:
+            label = cell if cell and fold(cell) != 'venda' else label
+            groups.append(label)
+        rows = np.arange(header + 1, total if total is not None else end)
+        for segment in _segments(grid, folded, header, footer, price_row, groups):
+            sales = _block_sales(grid, rows, segment, price_row)
+            parts.append(sales.assign(bloco=bloco))
+    if not parts:
+        return pd.DataFrame(columns=SALES_COLUMNS)
+    sales = pd.concat(parts, ignore_index=True).assign(evento=evento)
+    sales['linha'] += 1  # linha da planilha, contando do 1
+    return sales.sort_values(['bloco', 'linha'], kind='stable')[SALES_COLUMNS].reset_index(drop=True)
+
+
+def sales_partial_path(output_dir, filename):
+    return os.path.join(output_dir, SALES_DIR, f"{os.path.basename(filename)[:-len('.csv')]}.csv")
+
+
+def write_sales_partial(source_path, output_dir):
+    """Gravar as vendas de uma planilha de cachorro-quente (chamado pela limpeza)"""
+    sales = parse_sales_sheet(source_path, sales_sheet(source_path))
+    path = sales_partial_path(output_dir, source_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sales.to_csv(path, index=False)
+    return path, len(sales)
+
+
+def event_totals(sales):
+    """Totais por evento: vendas, itens, receita (quantidade × preço), valor
+    anotado na planilha e receita das vendas marcadas como pagas (PG 'ok')"""
+    vendas = sales.drop_duplicates(['evento', 'bloco', 'linha', 'cliente']).groupby('evento').size()
+    totals = sales.assign(receita_paga=sales['valor'].where(sales['pago'], 0.0)).groupby('evento').agg(
+        itens=('quantidade', 'sum'), receita=('valor', 'sum'),
+        valor_registrado=('valor_registrado', 'sum'), receita_paga=('receita_paga', 'sum'))
+    totals.insert(0, 'vendas', vendas)
+    return totals.reset_index()[EVENT_COLUMNS]
+
+
+def combine_sales(output_dir, partials):
+    """Juntar as vendas de cada planilha e gravar as vendas e os totais por evento (CSV e cópia Arrow)"""
+    tables = [pd.read_csv(path) for path in sorted(partials) if os.path.exists(path)]
+    tables = [table for table in tables if len(table)]
+    sales = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame(columns=SALES_COLUMNS)
+    sales['pago'] = sales['pago'].astype(bool)
+    events = event_totals(sales)
+    for frame, filename in ((sales, SALES_FILE), (events, EVENTS_FILE)):
+        frame.to_csv(os.path.join(output_dir, filename), index=False)
+        write_columnar_frame(frame, columnar_path(output_dir, filename))
+    return sales, events
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Totais por evento das vendas de cachorro-quente")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    args = parser.parse_args()
+    events = load_cleaned(EVENTS_FILE, args.cleaned)
+    print(events.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
@@ -0,0 +1,119 @@
+import os
+import pandas as pd
+
+from schema_index import load_index, attach_schema
+from payment_methods import normalize_payment_columns
+from profiling import span
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+    HAS_ARROW = True
+except ImportError:  # pyarrow is optional; everything falls back to the CSVs
+    HAS_ARROW = False
+
+STORE_DIR = 'columnar'
+STORE_SUFFIX = '.arrow'
+
+
+def sheet_key(name):
+    """Nome da planilha sem o sufixo '_cleaned.csv' / '.csv'"""
+    name = os.path.basename(name)
+    for suffix in ('_cleaned.csv', '.csv', STORE_SUFFIX):
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def columnar_path(cleaned_dir, name):
+    return os.path.join(cleaned_dir, STORE_DIR, f"{sheet_key(name)}_cleaned{STORE_SUFFIX}")
+
+
+def write_columnar(csv_path):
+    """Gravar a versão tipada (Arrow IPC) de um CSV limpo.
+
+    O CSV é lido uma única vez aqui, com a mesma inferência de tipos que os
+    scripts de análise usavam (formas de pagamento como categóricas); as
+    leituras seguintes são feitas por memory-map, sem parsing. Retorna o
+    caminho gravado ou None sem pyarrow.
+    """
+    if not HAS_ARROW:
+        return None
+    df = normalize_payment_columns(pd.read_csv(csv_path))
+    return write_columnar_frame(df, columnar_path(os.path.dirname(csv_path), csv_path))
+
+
+def write_columnar_frame(df, store_path):
+    if not HAS_ARROW:
+        return None
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    tmp_path = store_path + '.tmp'
+    # Uncompressed so reads can memory-map the file without decoding
+    feather.write_feather(df, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, store_path)
+    return store_path
+
+
+def open_columnar_writer(store_path, columns, numeric_positions, integer_positions=(), category_positions=()):
+    """Writer incremental (usado pela limpeza em blocos) com esquema fixo.
+
+    Os tipos são os que write_columnar grava para a mesma planilha: formas de
+    pagamento como dicionário (categóricas), texto como large_string.
+    """
+    os.makedirs(os.path.dirname(store_path), exist_ok=True)
+    schema = pa.schema([
+        (col, pa.dictionary(pa.int8(), pa.large_string()) if i in category_positions
+         else pa.int64() if i in integer_positions else pa.float64() if i in numeric_positions
+         else pa.large_string())
+        for i, col in enumerate(columns)
+    ])
+    sink = pa.OSFile(store_path + '.tmp', 'wb')
+    return pa.ipc.new_file(sink, schema), sink, schema
+
+
+def write_columnar_chunk(writer, schema, chunk):
+    batch = pa.RecordBatch.from_pandas(chunk.set_axis(schema.names, axis=1), schema=schema, preserve_index=False)
+    writer.write_batch(batch)
+
+
+def close_columnar_writer(writer, sink, store_path):
+    writer.close()
+    sink.close()
+    os.replace(store_path + '.tmp', store_path)
+
+
+def cleaned_version(name, cleaned_dir):
+    """Assinatura (mtime, tamanho) do CSV limpo e do arquivo Arrow de uma planilha.
+
+    Serve de chave para caches: muda sempre que a limpeza regrava a planilha.
+    """
+    version = []
+    for path in (os.path.join(cleaned_dir, f"{sheet_key(name)}_cleaned.csv"), columnar_path(cleaned_dir, name)):
+        try:
+            stat = os.stat(path)
+            version.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            version.append(None)
+    return tuple(version)
+
+
+def load_cleaned(name, cleaned_dir):
+    """Carregar uma planilha limpa, preferindo o armazenamento colunar.
+
+    `name` pode ser o nome do CSV limpo ('..._cleaned.csv') ou só o nome da
+    planilha. Usa o arquivo Arrow (memory-mapped, tipos já definidos) quando ele
+    existe e não é mais antigo que o CSV; caso contrário lê o CSV. O índice de
+    colunas gravado pela limpeza vai junto em df.attrs (ver schema_index).
+    """
+    csv_path = os.path.join(cleaned_dir, f"{sheet_key(name)}_cleaned.csv")
+    store_path = columnar_path(cleaned_dir, name)
+    if HAS_ARROW and os.path.exists(store_path) and (
+            not os.path.exists(csv_path) or os.path.getmtime(store_path) >= os.path.getmtime(csv_path)):
+        with span('load_cleaned', planilha=sheet_key(name), path=store_path) as s:
+            df = feather.read_table(store_path, memory_map=True).to_pandas()
+            s.rows_out = len(df)
+    else:
+        with span('load_cleaned', planilha=sheet_key(name), path=csv_path) as s:
+            df = pd.read_csv(csv_path)
+            s.rows_out = len(df)
+    return attach_schema(df, load_index(cleaned_dir).get(sheet_key(name)))
@@ -4,37 +4,37 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 import os
 from datetime import datetime
+
+from cleaned_store import load_cleaned
+from summary_store import load_summary_values
+from rollup import load_saldo, monthly_series, month_label
+from payment_methods import sheet_payments, payment_summary, method_totals
+from profiling import span
 import plotly.graph_objects as go
 import plotly.express as px
 from plotly.subplots import make_subplots
 import plotly.offline as pyo
 
-def create_advanced_dashboard():
+def create_advanced_dashboard(with_reports=True, cleaned_data_path='/home/ubuntu/cleaned_data',
+                              output_dir='/home/ubuntu'):
     """
     Criar dashboard avançado com análises detalhadas
+
+    Com with_reports=False gera só o HTML interativo; o run_pipeline.py roda a
+    análise de tendências e o relatório de insights como etapas separadas.
     """
-    cleaned_data_path = '/home/ubuntu/cleaned_data'
-    
     print("=== CRIANDO DASHBOARD AVANÇADO ===")
     
     # Carregar dados financeiros
-    financial_summary = {}
-    try:
-        with open("/home/ubuntu/financial_summary.txt", "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                if ": R$" in line:
-                    key, value = line.split(": R$")
-                    financial_summary[key.strip()] = float(value.strip())
-    except FileNotFoundError:
-        print("Arquivo financial_summary.txt não encontrado.")
+    financial_summary = load_summary_values(os.path.join(output_dir, 'financial_summary.json'))
+    if not financial_summary:
         return
     
     # Criar dashboard interativo com Plotly
     fig = make_subplots(
         rows=3, cols=2,
         subplot_titles=('Distribuição de Receitas', 'Receitas vs Despesas vs Dívidas', 
-                       'Análise por Projeto', 'Evolução Temporal Simulada',
+                       'Análise por Projeto', 'Evolução do Saldo Acumulado',
                        'Indicadores de Performance', 'Análise de Formas de Pagamento'),
         specs=[[{"type": "pie"}, {"type": "bar"}],
                [{"type": "bar"}, {"type": "scatter"}],
@@ -98,13 +98,15 @@ def create_advanced_dashboard():
         marker_color='lightcoral'
     ), row=2, col=1)
     
-    # 4. Evolução Temporal Simulada
-    meses = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun']
-    saldo_acumulado = [0, 150, 320, 580, 950, financial_summary.get('saldo_geral', 0)]
+    # 4. Evolução do Saldo Acumulado (cubo mensal gravado na limpeza)
+    try:
+        saldo = load_saldo(cleaned_data_path)
+    except FileNotFoundError:
+        saldo = pd.DataFrame(columns=['mes', 'saldo_acumulado'])
     
     fig.add_trace(go.Scatter(
-        x=meses,
-        y=saldo_acumulado,
+        x=[month_label(mes) for mes in saldo['mes']],
+        y=saldo['saldo_acumulado'],
         mode='lines+markers',
         name='Saldo Acumulado',
         line=dict(color='blue', width=3)
@@ -130,13 +132,11 @@ def create_advanced_dashboard():
     
     # 6. Análise de Formas de Pagamento (baseado nos dados de portaria)
     try:
-        df_portaria = pd.read_csv(os.path.join(cleaned_data_path, "Copyofcachorroquente-Vendaportaria_cleaned.csv"))
-        forma_pagamento_col = next((col for col in df_portaria.columns if 'forma de pagamento' in str(col).lower()), None)
-        valor_col = next((col for col in df_portaria.columns if 'valor' in str(col).lower()), None)
+        df_portaria = load_cleaned("Copyofcachorroquente-Vendaportaria_cleaned.csv", cleaned_data_path)
+        pagamentos = sheet_payments(df_portaria, 'portaria')
         
-        if forma_pagamento_col and valor_col:
-            df_portaria[valor_col] = pd.to_numeric(df_portaria[valor_col], errors='coerce')
-            pagamento_summary = df_portaria.groupby(forma_pagamento_col)[valor_col].sum()
+        if len(pagamentos):
+            pagamento_summary = method_totals(payment_summary([pagamentos]))['valor_total']
             
             fig.add_trace(go.Pie(
                 labels=pagamento_summary.index.tolist(),
@@ -155,48 +155,35 @@ def create_advanced_dashboard():
     )
     
     # Salvar dashboard interativo
-    pyo.plot(fig, filename='/home/ubuntu/dashboard_interativo.html', auto_open=False)
-    print("Dashboard interativo salvo em: /home/ubuntu/dashboard_interativo.html")
-    
-    # Criar análise de tendências
-    create_trend_analysis()
-    
-    # Criar relatório de insights
-    create_insights_report()
+    html_path = os.path.join(output_dir, 'dashboard_interativo.html')
+    with span('plotly.html', output=html_path):
+        pyo.plot(fig, filename=html_path, auto_open=False)
+    print(f"Dashboard interativo salvo em: {html_path}")
+    
+    if with_reports:
+        # Criar análise de tendências
+        create_trend_analysis(cleaned_data_path, output_dir)
+        
+        # Criar relatório de insights
+        create_insights_report(output_dir)
 
-def create_trend_analysis():
+def create_trend_analysis(cleaned_data_path='/home/ubuntu/cleaned_data', output_dir='/home/ubuntu'):
     """
     Criar análise de tendências baseada nos dados disponíveis
     """
     print("\n=== CRIANDO ANÁLISE DE TENDÊNCIAS ===")
     
-    cleaned_data_path = '/home/ubuntu/cleaned_data'
-    
-    # Analisar dados mensais de bombom e chup-chup
-    monthly_data = {}
-    meses = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio']
-    
-    for mes in meses:
-        try:
-            filename = f"CopyofBombomechup-chup2025-{mes}_cleaned.csv"
-            if os.path.exists(os.path.join(cleaned_data_path, filename)):
-                df = pd.read_csv(os.path.join(cleaned_data_path, filename))
-                # Procurar por colunas de controle de caixa
-                valor_obtido = 0
-                for col in df.columns:
-                    if 'valor obtido' in str(col).lower():
-                        df[col] = pd.to_numeric(df[col], errors='coerce')
-                        valor_obtido = df[col].sum()
-                        break
-                monthly_data[mes] = valor_obtido
-        except Exception as e:
-            print(f"Erro ao processar dados de {mes}: {e}")
-            monthly_data[mes] = 0
+    # Totais mensais de bombom e chup-chup, já agregados no cubo da limpeza
+    try:
+        monthly_data = monthly_series(cleaned_data_path, fonte='bombom')
+    except FileNotFoundError:
+        print("Cubo de agregados não encontrado; rode a limpeza primeiro")
+        return
     
     # Criar gráfico de tendências
     plt.figure(figsize=(12, 6))
-    meses_list = list(monthly_data.keys())
-    valores_list = list(monthly_data.values())
+    meses_list = [month_label(mes) for mes in monthly_data.index]
+    valores_list = list(monthly_data.values)
     
     plt.plot(meses_list, valores_list, marker='o', linewidth=2, markersize=8)
     plt.title('Tendência de Vendas - Bombom e Chup-chup (2025)')
@@ -205,26 +192,20 @@ def create_trend_analysis():
     plt.xticks(rotation=45)
     plt.grid(True, alpha=0.3)
     plt.tight_layout()
-    plt.savefig('/home/ubuntu/trend_analysis.png', dpi=300, bbox_inches='tight')
-    print("Análise de tendências salva em: /home/ubuntu/trend_analysis.png")
+    png_path = os.path.join(output_dir, 'trend_analysis.png')
+    with span('savefig', output=png_path):
+        plt.savefig(png_path, dpi=300, bbox_inches='tight')
+    print(f"Análise de tendências salva em: {png_path}")
 
-def create_insights_report():
+def create_insights_report(output_dir='/home/ubuntu'):
     """
     Criar relatório de insights baseado na análise dos dados
     """
     print("\n=== CRIANDO RELATÓRIO DE INSIGHTS ===")
     
     # Carregar dados financeiros
-    financial_summary = {}
-    try:
-        with open("/home/ubuntu/financial_summary.txt", "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                if ": R$" in line:
-                    key, value = line.split(": R$")
-                    financial_summary[key.strip()] = float(value.strip())
-    except FileNotFoundError:
-        print("Arquivo financial_summary.txt não encontrado.")
+    financial_summary = load_summary_values(os.path.join(output_dir, 'financial_summary.json'))
+    if not financial_summary:
         return
     
     insights = []
@@ -257,7 +238,8 @@ def create_insights_report():
     insights.append("   • Considerar campanhas de arrecadação adicionais")
     
     # Salvar relatório
-    with open('/home/ubuntu/insights_report.txt', 'w', encoding='utf-8') as f:
+    report_path = os.path.join(output_dir, 'insights_report.txt')
+    with open(report_path, 'w', encoding='utf-8') as f:
         f.write("RELATÓRIO DE INSIGHTS FINANCEIROS\n")
         f.write("="*50 + "\n\n")
         f.write(f"Data da Análise: {datetime.now().strftime('%d/%m/%Y %H:%M')}\n\n")
@@ -270,7 +252,7 @@ def create_insights_report():
         f.write(f"Saldo Geral: R$ {saldo_geral:.2f}\n")
         f.write(f"Margem Líquida: 100.00%\n")
     
-    print("Relatório de insights salvo em: /home/ubuntu/insights_report.txt")
+    print(f"Relatório de insights salvo em: {report_path}")
 
 if __name__ == '__main__':
     create_advanced_dashboard()
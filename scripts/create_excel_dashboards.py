@@ -1,49 +1,35 @@
 import pandas as pd
 import os
+import time
 from openpyxl import Workbook
 from openpyxl.utils.dataframe import dataframe_to_rows
 from openpyxl.chart import PieChart, Reference, Series
 from openpyxl.chart.label import DataLabelList
 from openpyxl.chart import BarChart
 
-def create_excel_dashboards():
-    cleaned_data_path = '/home/ubuntu/cleaned_data'
-    output_excel_path = '/home/ubuntu/financial_dashboard.xlsx'
+from cleaned_store import load_cleaned
+from summary_store import load_summary_values
+from profiling import span
 
-    wb = Workbook()
-    
-    # Remove default sheet
-    if "Sheet" in wb.sheetnames:
-        wb.remove(wb["Sheet"])
 
-    # 1. Dashboard Resumo Financeiro
+def add_dashboard_sheet(wb, financial_summary):
+    """Aba "Dashboard Financeiro": indicadores principais e gráfico de pizza das receitas.
+
+    Escrita linha a linha com ws.append, o que funciona tanto no workbook
+    normal quanto no modo write-only.
+    """
     ws_dashboard = wb.create_sheet("Dashboard Financeiro")
-    ws_dashboard["A1"] = "Resumo Financeiro Geral"
-    ws_dashboard["A2"] = "Dados baseados nas análises de Cachorro Quente, Conta da Casa e Obra Banheiro."
-
-    # Load financial summary from the generated text file
-    financial_summary = {}
-    try:
-        with open("/home/ubuntu/financial_summary.txt", "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                if ": R$" in line:
-                    key, value = line.split(": R$")
-                    financial_summary[key.strip()] = float(value.strip())
-    except FileNotFoundError:
-        print("Arquivo financial_summary.txt não encontrado. O dashboard pode estar incompleto.")
-
-    # Add key metrics to dashboard sheet
-    ws_dashboard["A4"] = "TOTAL RECEITAS:"
-    ws_dashboard["B4"] = financial_summary.get("total_receitas", 0)
-    ws_dashboard["A5"] = "TOTAL DESPESAS:"
-    ws_dashboard["B5"] = financial_summary.get("total_despesas", 0)
-    ws_dashboard["A6"] = "TOTAL DÍVIDAS:"
-    ws_dashboard["B6"] = financial_summary.get("total_dividas", 0)
-    ws_dashboard["A7"] = "SALDO GERAL:"
-    ws_dashboard["B7"] = financial_summary.get("saldo_geral", 0)
-    ws_dashboard["A8"] = "Margem Líquida (%):"
-    ws_dashboard["B8"] = 100.0  # From the analysis output
+    ws_dashboard.append(["Resumo Financeiro Geral"])
+    ws_dashboard.append(["Dados baseados nas análises de Cachorro Quente, Conta da Casa e Obra Banheiro."])
+    ws_dashboard.append([])
+
+    # Add key metrics to dashboard sheet (rows 4-8)
+    ws_dashboard.append(["TOTAL RECEITAS:", financial_summary.get("total_receitas", 0)])
+    ws_dashboard.append(["TOTAL DESPESAS:", financial_summary.get("total_despesas", 0)])
+    ws_dashboard.append(["TOTAL DÍVIDAS:", financial_summary.get("total_dividas", 0)])
+    ws_dashboard.append(["SALDO GERAL:", financial_summary.get("saldo_geral", 0)])
+    ws_dashboard.append(["Margem Líquida (%):", 100.0])  # From the analysis output
+    ws_dashboard.append([])
 
     # Create a pie chart for Revenue Distribution
     receitas_data = {
@@ -54,12 +40,10 @@ def create_excel_dashboards():
 
     # Add data to a temporary range for the chart
     row_offset = 10
-    ws_dashboard[f"A{row_offset}"] = "Distribuição de Receitas"
-    ws_dashboard[f"A{row_offset+1}"] = "Fonte"
-    ws_dashboard[f"B{row_offset+1}"] = "Valor"
-    for i, (source, value) in enumerate(receitas_data.items()):
-        ws_dashboard[f"A{row_offset+2+i}"] = source
-        ws_dashboard[f"B{row_offset+2+i}"] = value
+    ws_dashboard.append(["Distribuição de Receitas"])
+    ws_dashboard.append(["Fonte", "Valor"])
+    for source, value in receitas_data.items():
+        ws_dashboard.append([source, value])
 
     pie = PieChart()
     labels = Reference(ws_dashboard, min_col=1, min_row=row_offset+2, max_row=row_offset+1+len(receitas_data))
@@ -72,22 +56,84 @@ def create_excel_dashboards():
     pie.dLbls.showPercent = True
     ws_dashboard.add_chart(pie, "D1")
 
+
+def write_sheet_cells(wb, sheet_name, df):
+    """Caminho antigo: uma chamada ws.cell(...) por célula"""
+    ws = wb.create_sheet(sheet_name)
+    for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
+        for c_idx, value in enumerate(row, 1):
+            ws.cell(row=r_idx, column=c_idx, value=value)
+    return len(df)
+
+
+def frame_rows(df):
+    """Linhas do DataFrame como tuplas, com NaN/None como célula vazia"""
+    columns = []
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        # Cópia própria: colunas object viriam como visão só de leitura sob Copy-on-Write
+        values = series.to_numpy(dtype=object, copy=True)
+        values[series.isna().to_numpy()] = None
+        columns.append(values)
+    return zip(*columns)
+
+
+def write_sheet_rows(wb, sheet_name, df):
+    """Caminho rápido: as linhas são enviadas em sequência para a aba (write-only)"""
+    ws = wb.create_sheet(sheet_name)
+    ws.append([str(col) for col in df.columns])
+    for row in frame_rows(df):
+        ws.append(row)
+    return len(df)
+
+
+def create_excel_dashboards(fast=True,
+                            cleaned_data_path='/home/ubuntu/cleaned_data',
+                            output_excel_path='/home/ubuntu/financial_dashboard.xlsx',
+                            summary_path=None):
+    """Gerar a planilha Excel com o dashboard e uma aba por planilha limpa.
+
+    Sem `summary_path`, o resumo é o financial_summary.json do diretório da
+    planilha Excel.
+
+    Com fast=True (padrão) o workbook é aberto em modo write-only: as linhas são
+    gravadas direto no arquivo, sem manter as células em memória. fast=False
+    usa o caminho antigo, célula a célula.
+    """
+    wb = Workbook(write_only=fast)
+
+    # Remove default sheet
+    if "Sheet" in wb.sheetnames:
+        wb.remove(wb["Sheet"])
+
+    # 1. Dashboard Resumo Financeiro
+    # Load financial summary written by analyze_financial_data()
+    if summary_path is None:
+        summary_path = os.path.join(os.path.dirname(output_excel_path), 'financial_summary.json')
+    add_dashboard_sheet(wb, load_summary_values(summary_path))
+
     # 2. Adicionar dados brutos limpos em abas separadas
+    write_sheet = write_sheet_rows if fast else write_sheet_cells
+    total_rows = 0
+    start = time.perf_counter()
     for f in os.listdir(cleaned_data_path):
         if f.endswith("_cleaned.csv"):
             sheet_name = f.replace("_cleaned.csv", "").replace("Copyof", "")[:31] # Max 31 chars for sheet name
             try:
-                df = pd.read_csv(os.path.join(cleaned_data_path, f))
-                ws = wb.create_sheet(sheet_name)
-                for r_idx, row in enumerate(dataframe_to_rows(df, index=False, header=True), 1):
-                    for c_idx, value in enumerate(row, 1):
-                        ws.cell(row=r_idx, column=c_idx, value=value)
+                df = load_cleaned(f, cleaned_data_path)
+                with span('excel.aba', planilha=sheet_name) as s:
+                    s.rows_in = s.rows_out = len(df)
+                    total_rows += write_sheet(wb, sheet_name, df)
             except Exception as e:
                 print(f"Erro ao adicionar {f} à planilha Excel: {e}")
 
-    wb.save(output_excel_path)
+    with span('excel.save', output=output_excel_path) as s:
+        s.rows_in = total_rows
+        wb.save(output_excel_path)
+    elapsed = time.perf_counter() - start
     print(f"Dashboard Excel salvo em: {output_excel_path}")
+    print(f"{total_rows} linhas exportadas em {elapsed:.2f} s ({total_rows / elapsed if elapsed else 0:,.0f} linhas/s)")
+    return total_rows, elapsed
 
 if __name__ == '__main__':
     create_excel_dashboards()
-
@@ -1,92 +1,549 @@
 import pandas as pd
+import numpy as np
 import os
+import sys
+import resource
+import json
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-def clean_and_save_individual_sheets():
-    base_path = "/home/ubuntu/upload"
-    output_dir = "/home/ubuntu/cleaned_data"
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # Load all raw data first
-    all_raw_data = {}
-    for f in os.listdir(base_path):
-        if f.endswith(".csv"):
+from brl_currency import coerce_numeric_columns, parse_brl_array
+from cleaned_store import (HAS_ARROW, columnar_path, write_columnar, open_columnar_writer,
+                           write_columnar_chunk, close_columnar_writer, sheet_key)
+from schema_index import build_schema, save_index
+from payment_methods import normalize_payment_columns, normalize_methods, payment_columns
+from rollup import update_rollup
+from analytics_db import DB_FILE, update_database
+import profiling
+from profiling import span
+from bombom_weekly import FACTS_NAME, FACTS_FILE, FACT_COLUMNS, bombom_sheet, write_facts_partial, combine_facts
+from ledger import LEDGER_NAME, LEDGER_FILE, LEDGER_COLUMNS, ledger_sheet, write_ledger_partial, combine_ledger
+from debts import DEBTS_NAME, DEBTS_FILE, DEBT_COLUMNS, debt_sheet, write_debts_partial, combine_debts
+from cachorro_quente import (SALES_NAME, SALES_FILE, SALES_COLUMNS, EVENTS_NAME, EVENTS_FILE, EVENT_COLUMNS,
+                             sales_sheet, write_sales_partial, combine_sales)
+from budget import BUDGET_NAME, BUDGET_FILE, BUDGET_COLUMNS, budget_sheet, write_budget_partial, combine_budget
+
+# Bump whenever the cleaning rules change so every sheet is re-cleaned
+CLEANER_VERSION = 15
+MANIFEST_FILE = 'cleaning_manifest.json'
+
+
+def file_fingerprint(path, with_hash=True):
+    """Tamanho, mtime e (opcionalmente) sha256 do arquivo"""
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime': stat.st_mtime}
+    if with_hash:
+        sha = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                sha.update(block)
+        fingerprint['sha256'] = sha.hexdigest()
+    return fingerprint
+
+
+def load_manifest(output_dir):
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+    return manifest.get('files', {})
+
+
+def save_manifest(output_dir, entries):
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'cleaner_version': CLEANER_VERSION, 'files': entries}, f,
+                  ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+
+
+def is_up_to_date(entry, source_path, output_dir):
+    """Verifica se a planilha já foi limpa com o mesmo conteúdo e versão do limpador.
+
+    Compara tamanho/mtime primeiro; o hash só é recalculado quando o mtime mudou
+    (ex.: a planilha foi reexportada sem alterações).
+    """
+    if not entry or entry.get('cleaner_version') != CLEANER_VERSION:
+        return False
+    if not os.path.exists(os.path.join(output_dir, entry['output'])):
+        return False
+    if entry.get('columnar') and not os.path.exists(columnar_path(output_dir, entry['output'])):
+        return False
+    for derived in ('facts', 'ledger', 'debts', 'vendas', 'orcamento'):
+        if entry.get(derived) and not os.path.exists(os.path.join(output_dir, entry[derived])):
+            return False
+    current = file_fingerprint(source_path, with_hash=False)
+    if current['size'] != entry['size']:
+        return False
+    if current['mtime'] == entry['mtime']:
+        return True
+    if file_fingerprint(source_path)['sha256'] == entry['sha256']:
+        entry['mtime'] = current['mtime']
+        return True
+    return False
+
+
+def _column_labels(df):
+    # Same labels pd.read_csv would give back for the saved file
+    return [str(col) if pd.notna(col) else f"Unnamed: {i}" for i, col in enumerate(df.columns)]
+
+
+def file_stats(df):
+    return {
+        'rows': int(df.shape[0]),
+        'columns': int(df.shape[1]),
+        'column_names': _column_labels(df)[:10],  # First 10 columns
+    }
+
+
+def find_header_row(df):
+    # Try to find a reasonable header row (first row with at least 3 non-null values)
+    for i in range(min(5, len(df))):
+        if df.iloc[i].dropna().shape[0] >= 3:
+            return i
+    return 0
+
+
+def unique_columns(columns):
+    # Ensure column names are unique
+    cols = pd.Series(columns)
+    for dup in cols[cols.duplicated()].unique():
+        # For duplicate columns, append a counter to make them unique
+        count = 1
+        for i, col_name in enumerate(cols):
+            if col_name == dup:
+                cols[i] = f"{dup}_{count}"
+                count += 1
+    return cols
+
+
+def clean_sheet(df):
+    """Aplicar as regras de limpeza a uma planilha bruta"""
+    # Basic cleaning: remove completely empty rows and columns
+    df_cleaned = df.dropna(how='all').dropna(axis=1, how='all')
+
+    # Set header and clean
+    header_row = find_header_row(df_cleaned)
+    if header_row > 0:
+        df_cleaned.columns = df_cleaned.iloc[header_row]
+        df_cleaned = df_cleaned[header_row+1:].reset_index(drop=True)
+
+    df_cleaned.columns = unique_columns(df_cleaned.columns)
+
+    # Clean numeric columns (convert currency strings to numbers) in a single
+    # vectorized pass; columns stay text unless more than 30% of values parse
+    with span('moeda', colunas=df_cleaned.shape[1]) as s:
+        s.rows_in = len(df_cleaned)
+        df_cleaned, coercion_report = coerce_numeric_columns(df_cleaned, threshold=0.3)
+
+    # Payment method columns ('pix ', 'Pix', ...) become one canonical category
+    with span('pagamentos'):
+        df_cleaned = normalize_payment_columns(df_cleaned)
+
+    return df_cleaned, coercion_report
+
+
+def reset_peak_rss():
+    # Linux lets a process reset its own RSS high-water mark
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+
+def peak_rss_mb():
+    """Pico de memória residente (MB) desde o último reset_peak_rss()"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _all_numeric(series):
+    values = series.dropna()
+    return len(values) > 0 and pd.to_numeric(values, errors='coerce').notna().all()
+
+
+def clean_sheet_chunked(source_path, output_path, chunksize=50_000, sample_rows=10_000, store_path=None):
+    """Limpar uma planilha grande em blocos de tamanho fixo, com memória limitada.
+
+    Segue as mesmas regras de clean_sheet, mas sem carregar a planilha inteira:
+    uma primeira leitura em blocos só conta os valores por coluna (para remover
+    colunas vazias); a linha de cabeçalho e as colunas numéricas são definidas
+    por uma amostra inicial de `sample_rows` linhas; depois cada bloco é limpo e
+    anexado ao arquivo de saída (e ao armazenamento colunar em `store_path`,
+    quando informado). Retorna as estatísticas e o relatório de
+    conversão no mesmo formato de clean_sheet.
+    """
+    read_options = dict(dtype=str, keep_default_na=True)
+
+    # Also track which raw columns read_csv would infer as int64 for the whole
+    # file (no missing cell, every value an integer), so they are written as
+    # '1' and not '1.0', exactly like the non-chunked path
+    non_null = integral = None
+    for chunk in pd.read_csv(source_path, chunksize=chunksize, **read_options):
+        counts = chunk.notna().sum()
+        non_null = counts if non_null is None else non_null + counts
+        ints = np.array([chunk.iloc[:, i].str.fullmatch(r'\s*[+-]?\d+\s*').eq(True).all()
+                         for i in range(chunk.shape[1])])
+        integral = ints if integral is None else integral & ints
+    if non_null is None:
+        raise ValueError("planilha vazia")
+    keep_positions = [i for i, count in enumerate(non_null.to_numpy()) if count > 0]
+
+    # Sniff header and numeric columns from a leading sample
+    sample = pd.read_csv(source_path, nrows=sample_rows, **read_options)
+    sample = sample.iloc[:, keep_positions].dropna(how='all')
+    header_row = find_header_row(sample)
+    if header_row > 0:
+        columns = list(unique_columns(sample.iloc[header_row].to_numpy()))
+        skip_rows = header_row + 1
+    else:
+        columns = list(unique_columns(sample.columns))
+        skip_rows = 0
+    sample_body = sample.iloc[skip_rows:].set_axis(columns, axis=1)
+    sample_converted, _ = coerce_numeric_columns(sample_body, threshold=0.3)
+    # Positions, not labels: headers may repeat (e.g. several blank labels).
+    # Columns read_csv would infer as numbers on its own are numeric as well.
+    numeric_positions = [
+        i for i in range(len(columns))
+        if not pd.api.types.is_string_dtype(sample_converted.iloc[:, i].dtype)
+        or _all_numeric(sample.iloc[:, i])
+    ]
+    # Text columns that are all numbers come back as floats from read_csv, and
+    # so do columns left without any value once the header rows are skipped
+    body_non_null = non_null.to_numpy()[keep_positions] - sample.iloc[:skip_rows].notna().sum().to_numpy()
+    store_numeric = [i for i in range(len(columns)) if i in numeric_positions or body_non_null[i] == 0
+                     or _all_numeric(sample_body.iloc[:, i])]
+    # Payment columns are categorical in the store, as write_columnar leaves them
+    payment = set(payment_columns(columns))
+    category_positions = [i for i, col in enumerate(columns) if col in payment]
+    # With a header row inside the data the raw column holds text, so it is
+    # parsed to floats by clean_sheet; only a first-line header keeps int64
+    integer_positions = [i for i, raw in enumerate(keep_positions) if integral[raw]] if not skip_rows else []
+    del sample, sample_body, sample_converted
+
+    report = {columns[i]: {'parsed': 0, 'coerced': 0} for i in numeric_positions}
+    rows = 0
+    first = True
+    for chunk in pd.read_csv(source_path, chunksize=chunksize, **read_options):
+        chunk = chunk.iloc[:, keep_positions].dropna(how='all')
+        if skip_rows:
+            dropped = min(skip_rows, len(chunk))
+            chunk = chunk.iloc[dropped:]
+            skip_rows -= dropped
+        chunk = chunk.set_axis(columns, axis=1)
+        for i in numeric_positions:
+            values, coerced = parse_brl_array(chunk.iloc[:, i].to_numpy(dtype=object))
+            chunk.isetitem(i, values.astype(np.int64) if i in integer_positions else values)
+            report[columns[i]]['parsed'] += int((~np.isnan(values)).sum())
+            report[columns[i]]['coerced'] += coerced
+        chunk = normalize_payment_columns(chunk, categorical=False)
+        if len(chunk) or first:
+            chunk.to_csv(output_path, index=False, header=first, mode='w' if first else 'a')
+            if first and store_path:
+                # Same labels the CSV readers get back (blank/duplicate headers renamed)
+                labels = list(pd.read_csv(output_path, nrows=0).columns)
+                writer, sink, schema = open_columnar_writer(store_path, labels, store_numeric, integer_positions,
+                                                            category_positions)
+            if store_path:
+                store_chunk = chunk.copy()
+                for i in category_positions:
+                    store_chunk.isetitem(i, normalize_methods(store_chunk.iloc[:, i].astype(object)))
+                for i in store_numeric:
+                    if i not in numeric_positions and i not in category_positions:
+                        store_chunk.isetitem(i, pd.to_numeric(store_chunk.iloc[:, i], errors='coerce'))
+                write_columnar_chunk(writer, schema, store_chunk)
+            first = False
+        rows += len(chunk)
+    if store_path:
+        close_columnar_writer(writer, sink, store_path)
+
+    stats = {
+        'rows': rows,
+        'columns': len(columns),
+        'column_names': _column_labels(pd.DataFrame(columns=columns))[:10],
+    }
+    return stats, report
+
+
+def clean_file(f, base_path, output_dir, chunksize=None):
+    """Limpar uma planilha e gravar o resultado direto em output_dir.
+
+    Roda tanto no processo principal quanto nos workers do pool: lê, limpa e
+    grava a planilha, e devolve só a entrada do manifesto e as mensagens de
+    log, para que o processo principal as imprima na ordem dos arquivos.
+    """
+    messages = []
+    source_path = os.path.join(base_path, f)
+    sheet_name = f.replace(".csv", "")
+    output_name = f'{sheet_name}_cleaned.csv'
+    output_path = os.path.join(output_dir, output_name)
+    reset_peak_rss()
+    columnar = HAS_ARROW
+
+    if chunksize:
+        try:
+            store_path = columnar_path(output_dir, output_name) if HAS_ARROW else None
+            with span('limpeza.blocos', planilha=f, path=source_path, output=output_path) as s:
+                stats, coercion_report = clean_sheet_chunked(source_path, output_path, chunksize=chunksize, store_path=store_path)
+                s.rows_out = stats['rows']
+            messages.append(f"Cleaned data saved to {output_path} (em blocos de {chunksize} linhas)")
+        except Exception as e:
+            messages.append(f"Error processing {sheet_name}: {e}")
+            # Stream the raw data as fallback if cleaning fails
+            output_name = f'{sheet_name}_raw.csv'
+            output_path = os.path.join(output_dir, output_name)
             try:
-                all_raw_data[f.replace(".csv", "")] = pd.read_csv(os.path.join(base_path, f))
-                print(f"Loaded {f}")
+                rows, first, chunk = 0, True, None
+                for chunk in pd.read_csv(source_path, chunksize=chunksize):
+                    chunk.to_csv(output_path, index=False, header=first, mode='w' if first else 'a')
+                    rows, first = rows + len(chunk), False
+                if chunk is None:
+                    raise ValueError("planilha vazia")
             except Exception as e:
-                print(f"Erro ao carregar {f}: {e}")
+                messages.append(f"Erro ao carregar {f}: {e}")
+                profiling.flush(chrome=False)
+                return None, messages
+            stats = {'rows': rows, 'columns': int(chunk.shape[1]),
+                     'column_names': _column_labels(chunk)[:10]}
+            coercion_report = {}
+            messages.append(f"Raw data saved to {output_path}")
+    else:
+        try:
+            with span('read_csv', planilha=f, path=source_path) as s:
+                df = pd.read_csv(source_path)
+                s.rows_out = len(df)
+            messages.append(f"Loaded {f}")
+        except Exception as e:
+            messages.append(f"Erro ao carregar {f}: {e}")
+            profiling.flush(chrome=False)
+            return None, messages
 
-    # Process each sheet individually to avoid column conflicts
-    for sheet_name, df in all_raw_data.items():
         try:
-            # Basic cleaning: remove completely empty rows and columns
-            df_cleaned = df.dropna(how='all').dropna(axis=1, how='all')
-            
-            # Try to find a reasonable header row (first row with at least 3 non-null values)
-            header_row = 0
-            for i in range(min(5, len(df_cleaned))):
-                if df_cleaned.iloc[i].dropna().shape[0] >= 3:
-                    header_row = i
-                    break
-            
-            # Set header and clean
-            if header_row > 0:
-                df_cleaned.columns = df_cleaned.iloc[header_row]
-                df_cleaned = df_cleaned[header_row+1:].reset_index(drop=True)
-            
-            # Ensure column names are unique
-            cols = pd.Series(df_cleaned.columns)
-            for dup in cols[cols.duplicated()].unique():
-                # For duplicate columns, append a counter to make them unique
-                count = 1
-                for i, col_name in enumerate(cols):
-                    if col_name == dup:
-                        cols[i] = f"{dup}_{count}"
-                        count += 1
-            df_cleaned.columns = cols
-            
-            # Clean numeric columns (convert currency strings to numbers)
-            for col in df_cleaned.columns:
-                # Check if the column exists and is of object type (likely strings)
-                if isinstance(df_cleaned[col], pd.Series) and df_cleaned[col].dtype == 'object':
-                    # Try to convert currency-like strings to numbers
-                    temp_series = df_cleaned[col].astype(str).str.replace('R$', '').str.replace('%', '').str.replace(',', '.').str.strip()
-                    numeric_series = pd.to_numeric(temp_series, errors='coerce')
-                    # If a significant portion of values are numeric after conversion, update the column
-                    if numeric_series.notna().sum() / len(numeric_series) > 0.3:
-                        df_cleaned[col] = numeric_series
-            
+            with span('clean_sheet', planilha=f) as s:
+                s.rows_in = len(df)
+                df_cleaned, coercion_report = clean_sheet(df)
+                s.rows_out = len(df_cleaned)
+
             # Save cleaned data
-            output_path = os.path.join(output_dir, f'{sheet_name}_cleaned.csv')
-            df_cleaned.to_csv(output_path, index=False)
-            print(f"Cleaned data saved to {output_path}")
-            
+            with span('to_csv', planilha=f, output=output_path) as s:
+                s.rows_in = len(df_cleaned)
+                df_cleaned.to_csv(output_path, index=False)
+            messages.append(f"Cleaned data saved to {output_path}")
+
         except Exception as e:
-            print(f"Error processing {sheet_name}: {e}")
+            messages.append(f"Error processing {sheet_name}: {e}")
             # Save raw data as fallback if cleaning fails
-            output_path = os.path.join(output_dir, f'{sheet_name}_raw.csv')
+            output_name = f'{sheet_name}_raw.csv'
+            output_path = os.path.join(output_dir, output_name)
+            df_cleaned = df
+            coercion_report = {}
             df.to_csv(output_path, index=False)
-            print(f"Raw data saved to {output_path}")
+            messages.append(f"Raw data saved to {output_path}")
+        stats = file_stats(df_cleaned)
+        del df, df_cleaned
 
-    # Generate a summary of all cleaned files
-    summary_data = []
-    for f in os.listdir(output_dir):
-        if f.endswith(".csv"):
+        # Typed columnar copy for the readers; if it fails the CSV is still the
+        # cleaned output and the readers fall back to it
+        if columnar and output_name.endswith('_cleaned.csv'):
+            store_path = columnar_path(output_dir, output_name)
             try:
-                df = pd.read_csv(os.path.join(output_dir, f))
-                summary_data.append({
-                    'File': f,
-                    'Rows': df.shape[0],
-                    'Columns': df.shape[1],
-                    'Column_Names': ", ".join(df.columns.tolist()[:10])  # First 10 columns
-                })
+                with span('write_columnar', planilha=f, output=store_path):
+                    write_columnar(output_path)
             except Exception as e:
-                print(f"Error reading {f} for summary: {e}")
-    
-    summary_df = pd.DataFrame(summary_data)
+                columnar = False
+                messages.append(f"  Cópia colunar não gravada ({e}); os leitores usarão o CSV")
+                if os.path.exists(store_path):
+                    os.remove(store_path)
+
+    coerced = sum(r['coerced'] for r in coercion_report.values())
+    if coerced:
+        messages.append(f"  {coerced} células não numéricas viraram NaN em {len(coercion_report)} colunas convertidas")
+    messages.append(f"  Pico de memória (RSS): {peak_rss_mb():.1f} MB")
+
+    entry = file_fingerprint(source_path)
+    entry['cleaner_version'] = CLEANER_VERSION
+    entry['output'] = output_name
+    entry['columnar'] = columnar and output_name.endswith('_cleaned.csv')
+    entry.update(stats)
+    # Role -> column index, from the header exactly as the readers will see it
+    entry['schema'] = build_schema(pd.read_csv(output_path, nrows=0).columns)
+    # Weekly bombom sheets: block-aware parse of the raw layout into facts
+    if bombom_sheet(f):
+        with span('parcial.facts', planilha=f, path=source_path):
+            facts_path, facts_rows = write_facts_partial(source_path, output_dir)
+        entry['facts'] = os.path.relpath(facts_path, output_dir)
+        messages.append(f"  {facts_rows} fatos semanais de bombom em {facts_path}")
+    # Entrada/Saída sheets: transactions for the merged conta da casa ledger
+    if ledger_sheet(f):
+        with span('parcial.ledger', planilha=f, path=source_path):
+            ledger_path, ledger_rows = write_ledger_partial(source_path, output_dir)
+        entry['ledger'] = os.path.relpath(ledger_path, output_dir)
+        messages.append(f"  {ledger_rows} lançamentos da conta da casa em {ledger_path}")
+    # Dívida/Rifas sheets: per-person debt and payment events
+    if debt_sheet(f):
+        with span('parcial.debts', planilha=f, path=source_path):
+            debts_path, debts_rows = write_debts_partial(source_path, output_dir)
+        entry['debts'] = os.path.relpath(debts_path, output_dir)
+        messages.append(f"  {debts_rows} eventos de dívida em {debts_path}")
+    # Cachorro-quente sheets: sales from the combo/dogão price grid
+    if sales_sheet(f):
+        with span('parcial.vendas', planilha=f, path=source_path):
+            sales_path, sales_rows = write_sales_partial(source_path, output_dir)
+        entry['vendas'] = os.path.relpath(sales_path, output_dir)
+        messages.append(f"  {sales_rows} vendas de cachorro-quente em {sales_path}")
+    # Orçamentos (obra, cachorro-quente): budget lines with every supplier quote
+    if budget_sheet(f):
+        with span('parcial.orcamento', planilha=f, path=source_path):
+            budget_path, budget_rows, budget_warning = write_budget_partial(source_path, output_dir)
+        entry['orcamento'] = os.path.relpath(budget_path, output_dir)
+        messages.append(f"  {budget_rows} cotações de orçamento em {budget_path}")
+        if budget_warning:
+            messages.append(f"  Aviso: {budget_warning}")
+    # Pool workers exit without running atexit: their spans are written here
+    profiling.flush(chrome=False)
+    return entry, messages
+
+
+def derived_paths(key, manifest, output_dir):
+    return sorted(os.path.join(output_dir, entry[key]) for entry in manifest.values() if key in entry)
+
+
+def needs_rebuild(key, filename, old_manifest, new_manifest, results, output_dir):
+    """A merged table is rebuilt when a source sheet was re-cleaned, added or removed"""
+    if not os.path.exists(os.path.join(output_dir, filename)):
+        return True
+    if any(key in entry for entry, _ in results if entry is not None):
+        return True
+    return derived_paths(key, old_manifest, output_dir) != derived_paths(key, new_manifest, output_dir)
+
+
+def clean_and_save_individual_sheets(base_path="/home/ubuntu/upload", output_dir="/home/ubuntu/cleaned_data", force=False, workers=1, chunksize=None):
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {} if force else load_manifest(output_dir)
+    new_manifest = {}
+
+    # Only clean sheets that changed since the last run
+    pending = []
+    for f in sorted(os.listdir(base_path)):
+        if f.endswith(".csv"):
+            entry = manifest.get(f)
+            if is_up_to_date(entry, os.path.join(base_path, f), output_dir):
+                new_manifest[f] = entry
+                print(f"Unchanged {f}, skipping")
+            else:
+                pending.append(f)
+
+    # Process each sheet individually to avoid column conflicts. Sheets are
+    # independent, so with workers > 1 they are cleaned in a process pool;
+    # results come back in file order, keeping the output deterministic.
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(clean_file, pending, repeat(base_path), repeat(output_dir), repeat(chunksize)))
+    else:
+        results = [clean_file(f, base_path, output_dir, chunksize) for f in pending]
+
+    for f, (entry, messages) in zip(pending, results):
+        for message in messages:
+            print(message)
+        if entry is not None:
+            new_manifest[f] = entry
+
+    save_manifest(output_dir, new_manifest)
+
+    # Tables merged from several sheets (bombom facts, conta da casa ledger, debts,
+    # cachorro-quente sales, budget lines),
+    # rebuilt only when one of their source sheets changed
+    cleaned_now = {entry['output'] for entry, _ in results if entry is not None}
+    if needs_rebuild('facts', FACTS_FILE, manifest, new_manifest, results, output_dir):
+        with span('combinar.facts'):
+            fact_table = combine_facts(output_dir, derived_paths('facts', new_manifest, output_dir))
+        cleaned_now.add(FACTS_FILE)
+        print(f"Bombom fact table saved to {FACTS_FILE} ({len(fact_table)} rows)")
+    if needs_rebuild('ledger', LEDGER_FILE, manifest, new_manifest, results, output_dir):
+        with span('combinar.ledger'):
+            ledger, removed = combine_ledger(output_dir, derived_paths('ledger', new_manifest, output_dir))
+        cleaned_now.add(LEDGER_FILE)
+        print(f"Ledger saved to {LEDGER_FILE} ({len(ledger)} transactions, {removed} duplicates dropped)")
+    if needs_rebuild('debts', DEBTS_FILE, manifest, new_manifest, results, output_dir):
+        with span('combinar.debts'):
+            debt_events = combine_debts(output_dir, derived_paths('debts', new_manifest, output_dir))
+        cleaned_now.add(DEBTS_FILE)
+        print(f"Debts saved to {DEBTS_FILE} ({len(debt_events)} events)")
+    if needs_rebuild('vendas', SALES_FILE, manifest, new_manifest, results, output_dir):
+        with span('combinar.vendas'):
+            sales, events = combine_sales(output_dir, derived_paths('vendas', new_manifest, output_dir))
+        cleaned_now.update((SALES_FILE, EVENTS_FILE))
+        print(f"Cachorro-quente sales saved to {SALES_FILE} ({len(sales)} rows, {len(events)} events)")
+    if needs_rebuild('orcamento', BUDGET_FILE, manifest, new_manifest, results, output_dir):
+        with span('combinar.orcamento'):
+            budget_lines = combine_budget(output_dir, derived_paths('orcamento', new_manifest, output_dir))
+        cleaned_now.add(BUDGET_FILE)
+        print(f"Budget lines saved to {BUDGET_FILE} ({len(budget_lines)} quotes)")
+
+    index = {
+        sheet_key(entry['output']): entry['schema']
+        for entry in new_manifest.values() if entry['output'].endswith('_cleaned.csv')
+    }
+    index[FACTS_NAME] = build_schema(FACT_COLUMNS)
+    index[LEDGER_NAME] = build_schema(LEDGER_COLUMNS)
+    index[DEBTS_NAME] = build_schema(DEBT_COLUMNS)
+    index[SALES_NAME] = build_schema(SALES_COLUMNS)
+    index[EVENTS_NAME] = build_schema(EVENT_COLUMNS)
+    index[BUDGET_NAME] = build_schema(BUDGET_COLUMNS)
+    save_index(output_dir, index)
+
+    # Day/month rollup for the charts; only sheets cleaned in this run are re-read
+    with span('rollup'):
+        rebuilt = update_rollup(output_dir, cleaned_now)
+    print(f"Rollup cube updated ({len(rebuilt)} source sheets re-aggregated)")
+
+    # SQLite analytical store; only tables whose source files changed are reloaded
+    with span('sqlite'):
+        reloaded = update_database(output_dir)
+    print(f"Analytical database {DB_FILE} updated ({', '.join(reloaded) or 'no tables changed'})")
+
+    # Generate a summary of all cleaned files from the cached per-file stats
+    summary_data = []
+    for f, entry in sorted(new_manifest.items(), key=lambda item: item[1]['output']):
+        summary_data.append({
+            'File': entry['output'],
+            'Rows': entry['rows'],
+            'Columns': entry['columns'],
+            'Column_Names': ", ".join(entry['column_names'])
+        })
+
+    summary_df = pd.DataFrame(summary_data, columns=['File', 'Rows', 'Columns', 'Column_Names'])
     summary_df.to_csv(os.path.join(output_dir, 'data_summary.csv'), index=False)
     print("Data summary saved to cleaned_data/data_summary.csv")
 
 if __name__ == '__main__':
-    clean_and_save_individual_sheets()
+    parser = argparse.ArgumentParser(description="Limpeza e estruturação das planilhas exportadas")
+    parser.add_argument('--input', default="/home/ubuntu/upload", help="diretório com os CSVs brutos")
+    parser.add_argument('--output', default="/home/ubuntu/cleaned_data", help="diretório dos CSVs limpos")
+    parser.add_argument('--workers', type=int, default=1, help="número de processos para limpar as planilhas em paralelo")
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help="limpar em blocos de N linhas, com memória limitada (para exportações muito grandes)")
+    parser.add_argument('--force', action='store_true', help="ignorar o manifesto e limpar todas as planilhas")
+    parser.add_argument('--profile', nargs='?', const=profiling.TRACE_DIR, metavar='DIR',
+                        help=f"gravar o trace das etapas (JSONL e Chrome) em DIR (padrão: {profiling.TRACE_DIR})")
+    args = parser.parse_args()
+    if args.profile:
+        profiling.enable(args.profile)
+    with span('limpeza', entrada=args.input):
+        clean_and_save_individual_sheets(args.input, args.output, force=args.force, workers=args.workers, chunksize=args.chunksize)
 
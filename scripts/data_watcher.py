@@ -0,0 +1,96 @@
+import os
+import time
+import threading
+
+from cleaned_store import STORE_DIR, cleaned_version
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except ImportError:  # watchdog is optional; without it the directory is polled
+    HAS_WATCHDOG = False
+
+
+class DataWatcher:
+    """Acompanha as planilhas limpas e avisa quais mudaram.
+
+    Usa inotify (via watchdog) quando disponível e, de qualquer forma, confere
+    o mtime/tamanho dos arquivos a cada `interval` segundos. A cada mudança
+    `generation` é incrementado e `changed` guarda as chaves alteradas.
+    """
+
+    def __init__(self, cleaned_dir, files, interval=2.0, settle=0.5):
+        self.cleaned_dir = cleaned_dir
+        self.files = dict(files)
+        self.interval = interval
+        self.settle = settle
+        self.generation = 0
+        self.changed = []
+        self.changed_at = None
+        self.versions = self.snapshot()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._observer = None
+
+    def snapshot(self):
+        return {key: cleaned_version(name, self.cleaned_dir) for key, name in self.files.items()}
+
+    def check(self):
+        """Comparar com a última versão vista; retorna as chaves alteradas"""
+        current = self.snapshot()
+        if current == self.versions:
+            return []
+        # A limpeza grava os arquivos aos poucos: espera a versão estabilizar
+        while True:
+            time.sleep(self.settle)
+            settled = self.snapshot()
+            if settled == current:
+                break
+            current = settled
+        with self._lock:
+            changed = [key for key in current if current[key] != self.versions.get(key)]
+            self.versions = current
+            if changed:
+                self.generation += 1
+                self.changed = changed
+                self.changed_at = time.time()
+        return changed
+
+    def _run(self):
+        while not self._stop.is_set():
+            # Com inotify o evento acorda a thread na hora; o timeout é só uma rede de segurança
+            self._wakeup.wait(self.interval * (10 if self._observer else 1))
+            self._wakeup.clear()
+            if not self._stop.is_set():
+                self.check()
+
+    def start(self):
+        if self._thread is not None:
+            return self
+        if HAS_WATCHDOG:
+            watcher = self
+
+            class _Handler(FileSystemEventHandler):
+                def on_any_event(self, event):
+                    watcher._wakeup.set()
+
+            self._observer = Observer()
+            for path in (self.cleaned_dir, os.path.join(self.cleaned_dir, STORE_DIR)):
+                if os.path.isdir(path):
+                    self._observer.schedule(_Handler(), path, recursive=False)
+            self._observer.start()
+        self._thread = threading.Thread(target=self._run, name='data-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join()
+        if self._thread is not None:
+            self._thread.join()
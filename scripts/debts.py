@@ -0,0 +1,393 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import write_columnar_frame, columnar_path, load_cleaned
+from schema_index import fold
+
+# Dívidas por pessoa: cada dívida (categoria da planilha Dívida ou valor a
+# repassar de uma rifa) e cada pagamento vira um evento, com o saldo devedor
+# acumulado da pessoa. Os quadros de totais ("Dívida Total", "Restante",
+# "Valor dívida"...) não entram: são somas dos eventos. O saldo da Rifas é
+# encerrado no razão: quem deve é quem consta nas planilhas Dívida.
+DEBT_COLUMNS = ['data', 'data_estimada', 'pessoa', 'arquivo', 'categoria', 'tipo', 'valor', 'saldo']
+DEBTS_NAME = 'dividas_pessoas'
+DEBTS_FILE = f'{DEBTS_NAME}_cleaned.csv'
+DEBTS_DIR = 'dividas'
+
+SHEET_PATTERN = re.compile(r'^Copyofcontadacasa-(D[ií]vida(\d{4})|Rifas)(?:_cleaned)?\.csv$')
+DATE_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})(?:/(\d{4}))?$')
+NUMBER_PATTERN = re.compile(r'-?(R\$\s*)?-?[\d.,]+')
+# Títulos dos quadros (já sem acento e em minúsculas)
+TITLES = {'dividas': 'divida', 'dividas ex-moradoras': 'divida', 'pagamento': 'pagamento'}
+TOTAL_LABELS = {'divida total', 'pagamento total', 'restante', 'total'}
+# Quadros de resumo e de destinação do dinheiro: fim dos lançamentos
+END_LABELS = ('direcionamento', 'valor divida')
+IGNORED_HEADERS = {'valores'}
+# Efeito de cada tipo de evento no saldo devedor
+SINAL = {'divida': 1.0, 'transferencia': -1.0, 'pagamento': -1.0}
+
+
+def debt_sheet(filename):
+    """'Copyofcontadacasa-Dívida2025.csv' -> ('Dívida2025', 2025); Rifas -> ('Rifas', None)"""
+    match = SHEET_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    return match.group(1), int(match.group(2)) if match.group(2) else None
+
+
+def _is_number(text):
+    return bool(NUMBER_PATTERN.fullmatch(text))
+
+
+def _parse_date(text, ano):
+    """'30/09' -> data; sem ano, fica o ano que deixa a data mais perto do início do ano da planilha"""
+    match = DATE_PATTERN.match(text)
+    if not match:
+        return None
+    dia, mes, year = match.groups()
+    year = int(year) if year else ano - 1 if int(mes) > 6 else ano
+    try:
+        return pd.Timestamp(year, int(mes), int(dia))
+    except ValueError:
+        return None
+
+
+def _values(texts):
+    return parse_brl_array(np.array(texts, dtype=object))[0]
+
+
+def parse_debt_sheet(path, ano):
+    """Dívidas e pagamentos de uma planilha Dívida (CSV bruto), lida uma única vez.
+
+    A planilha tem quadros lado a lado ("Dívidas", "Dívidas ex-moradoras") e,
+    abaixo, "Pagamento". Cada título abre uma região de colunas; a linha
+    seguinte traz os nomes e a coluna à esquerda do primeiro nome guarda o
+    rótulo de cada linha: categoria (Caixinha, Conta da casa...) ou data do
+    pagamento. Um título na coluna de rótulos ("Pagamento" no quadro das
+    ex-moradoras) só muda o tipo dos lançamentos seguintes. Lançamentos sem
+    data recebem a data do início do ano da planilha, ou a do primeiro
+    pagamento datado, se for anterior (`data_estimada`).
+    """
+    regions, records = [], []
+
+    def region_at(col):
+        return next((r for r in regions if r['start'] <= col < r['end']), None)
+
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            cells = [cell.strip() for cell in row]
+            folded = [fold(cell) for cell in cells]
+            first = next((i for i, cell in enumerate(cells) if cell), None)
+            if first is None:
+                continue
+            if folded[first].startswith(END_LABELS):
+                regions = []
+                continue
+
+            touched = []
+            titles = [i for i, cell in enumerate(folded) if cell in TITLES]
+            for n, col in enumerate(titles):
+                region = region_at(col)
+                if region is None:
+                    end = titles[n + 1] - 1 if n + 1 < len(titles) else len(cells)
+                    following = [r['start'] for r in regions if r['start'] > col]
+                    region = {'start': col - 1, 'end': min([end] + following), 'label': None, 'names': {}}
+                    regions.append(region)
+                elif col != region['label']:
+                    region['label'], region['names'] = None, {}
+                region['mode'] = TITLES[folded[col]]
+                touched.append(region)
+
+            for region in regions:
+                if region in touched:
+                    continue
+                span = range(region['start'], min(region['end'], len(cells)))
+                filled = [i for i in span if cells[i]]
+                if not filled:
+                    continue
+                label = region['label']
+                header = label is None or not cells[label] or folded[label] == 'data'
+                names = {i: cells[i] for i in filled if (label is None or i > label)
+                         and not _is_number(cells[i]) and folded[i] not in IGNORED_HEADERS
+                         and _parse_date(cells[i], ano) is None}
+                if header and names:
+                    if label is None:
+                        label = filled[0] if folded[filled[0]] == 'data' else filled[0] - 1
+                        names = {i: name for i, name in names.items() if i > label}
+                    region['label'], region['names'] = label, names
+                    continue
+                if label is None or not cells[label] or folded[label] in TOTAL_LABELS | {'data'}:
+                    continue
+                data = _parse_date(cells[label], ano)
+                categoria = '' if data is not None else cells[label]
+                cols = [i for i in region['names'] if i < len(cells) and cells[i]]
+                for col, valor in zip(cols, _values([cells[i] for i in cols])):
+                    if not np.isnan(valor) and valor != 0:
+                        records.append((data, region['names'][col], categoria, region['mode'], valor))
+
+    events = pd.DataFrame.from_records(records, columns=['data', 'pessoa', 'categoria', 'tipo', 'valor'])
+    events['data'] = pd.to_datetime(events['data'])
+    events['data_estimada'] = events['data'].isna()
+    primeira = events['data'].min()
+    referencia = pd.Timestamp(ano, 1, 1)
+    events['data'] = events['data'].fillna(min(referencia, primeira) if pd.notna(primeira) else referencia)
+    return events
+
+
+def parse_rifas_sheet(path):
+    """Valor a repassar (dívida) e valor repassado (pagamento) de cada vendedor de cada rifa.
+
+    Cada rifa começa numa linha "RIFA ..." seguida do cabeçalho (Nome,
+    Quantidade vendida, Valor a repassar, Valor repassado, Dívida); a coluna
+    "Dívida" e o quadro de dívidas à direita são totais e não são lidos. As
+    rifas não têm data: os eventos ficam sem data (valem para qualquer data).
+    """
+    records, rifa, cols = [], None, None
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            cells = [cell.strip() for cell in row]
+            folded = [fold(cell) for cell in cells]
+            title = next((cell for cell in cells if fold(cell).startswith('rifa ')), None)
+            if title:
+                rifa, cols = ' '.join(title.split()), None
+                continue
+            if rifa is None:
+                continue
+            if 'nome' in folded:
+                cols = {key: folded.index(key) for key in ('nome', 'valor a repassar', 'valor repassado')
+                        if key in folded}
+                continue
+            if not cols or len(cols) < 3:
+                continue
+
+            def cell(key):
+                return cells[cols[key]] if cols[key] < len(cells) else ''
+
+            nome = cell('nome')
+            if not nome:
+                rifa, cols = None, None
+                continue
+            a_repassar, repassado = _values([cell('valor a repassar') or None, cell('valor repassado') or None])
+            for tipo, valor in (('divida', a_repassar), ('pagamento', repassado)):
+                if not np.isnan(valor) and valor != 0:
+                    records.append((pd.NaT, nome, rifa, tipo, valor))
+
+    events = pd.DataFrame.from_records(records, columns=['data', 'pessoa', 'categoria', 'tipo', 'valor'])
+    events['data'] = pd.to_datetime(events['data'])
+    events['data_estimada'] = True
+    return events
+
+
+def debts_partial_path(output_dir, filename):
+    return os.path.join(output_dir, DEBTS_DIR, f"{os.path.basename(filename)[:-len('.csv')]}.csv")
+
+
+def write_debts_partial(source_path, output_dir):
+    """Gravar os eventos de dívida de uma planilha Dívida ou Rifas (chamado pela limpeza)"""
+    arquivo, ano = debt_sheet(source_path)
+    events = parse_debt_sheet(source_path, ano) if ano else parse_rifas_sheet(source_path)
+    events.insert(2, 'arquivo', arquivo)
+    path = debts_partial_path(output_dir, source_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    events.to_csv(path, index=False)
+    return path, len(events)
+
+
+def _transfers(events):
+    """Eventos que encerram o saldo da planilha Dívida anterior.
+
+    Cada planilha Dívida recomeça a conta: o que sobrou da anterior já vem
+    somado nas dívidas da nova ("Dívidas ex-moradoras", "Dívida 2025"). Na
+    data do primeiro evento da nova planilha, o saldo de cada pessoa na
+    anterior é zerado com um evento 'transferencia', para que a mesma dívida
+    não seja contada duas vezes.
+    """
+    ano = events['arquivo'].str.extract(r'^D[ií]vida(\d{4})$')[0]
+    anos = sorted(ano.dropna().unique())
+    rows = []
+    for anterior, nova in zip(anos, anos[1:]):
+        inicio = events.loc[ano == nova, 'data'].min()
+        previous = events[(ano == anterior) & (events['data'] <= inicio)]
+        if previous.empty:
+            # Nada na planilha anterior até o início da nova: não há saldo a transferir
+            continue
+        saldos = (previous['valor'] * previous['tipo'].map(SINAL)).groupby(previous['pessoa']).sum().round(2)
+        arquivo, destino = previous['arquivo'].iloc[0], events.loc[ano == nova, 'arquivo'].iloc[0]
+        rows += [(inicio, True, pessoa, arquivo, f'transferido para {destino}', 'transferencia', saldo)
+                 for pessoa, saldo in saldos.items() if saldo != 0]
+    return pd.DataFrame(rows, columns=DEBT_COLUMNS[:-1])
+
+
+def _rifa_transfers(events):
+    """Eventos que encerram o saldo de cada vendedor na planilha Rifas.
+
+    A conta de quem deve é a das planilhas Dívida: o que ficou sem repassar
+    de uma rifa entra nelas como "Outros" (os 393,00 de Replay na Dívida2024)
+    e, fora delas, não consta no TOTAL de ninguém. O saldo de cada pessoa na
+    Rifas é zerado com um evento 'transferencia' sem data, indicando a planilha
+    Dívida cujo "Outros" tem o mesmo valor, quando houver.
+    """
+    rifas = events[events['arquivo'] == 'Rifas']
+    if rifas.empty:
+        return pd.DataFrame(columns=DEBT_COLUMNS[:-1])
+    saldos = (rifas['valor'] * rifas['tipo'].map(SINAL)).groupby(rifas['pessoa']).sum().round(2)
+    outros = events[events['arquivo'].str.match(r'^D[ií]vida\d{4}$') & (events['tipo'] == 'divida')
+                    & (events['categoria'].map(fold) == 'outros')]
+    rows = []
+    for pessoa, saldo in saldos.items():
+        if saldo == 0:
+            continue
+        destino = outros[(outros['pessoa'] == pessoa) & ((outros['valor'] - saldo).abs() < 0.005)]
+        categoria = (f"transferido para {destino['arquivo'].iloc[0]}" if len(destino)
+                     else 'fora das planilhas Dívida')
+        rows.append((pd.NaT, True, pessoa, 'Rifas', categoria, 'transferencia', saldo))
+    return pd.DataFrame(rows, columns=DEBT_COLUMNS[:-1])
+
+
+def sheet_balances(events):
+    """Saldo devedor de cada planilha (dívidas menos pagamentos e transferências)"""
+    return (events['valor'] * events['tipo'].map(SINAL)).groupby(events['arquivo']).sum()
+
+
+def merge_debts(tables):
+    """Juntar os eventos num único razão de dívidas, com saldo devedor acumulado por pessoa.
+
+    A mesma pessoa aparece com grafias diferentes entre as planilhas
+    ('Conká'/'Conka'): os nomes são agrupados sem acento e sem maiúsculas e
+    ficam com a grafia mais usada. Eventos sem data vêm primeiro (com as
+    transferências da Rifas por último); no mesmo dia, transferências, depois
+    dívidas, depois pagamentos.
+    """
+    frames = [table[DEBT_COLUMNS[:-1]] for table in tables if len(table)]
+    if not frames:
+        return pd.DataFrame(columns=DEBT_COLUMNS)
+    events = pd.concat(frames, ignore_index=True)
+    key = events['pessoa'].map(fold)
+    grafia = events.groupby([key, events['pessoa']]).size().sort_values(ascending=False, kind='stable')
+    nomes = {k: nome for k, nome in reversed(list(grafia.index))}
+    events['pessoa'] = key.map(nomes)
+    transfers = [table for table in (_transfers(events), _rifa_transfers(events)) if len(table)]
+    if transfers:
+        events = pd.concat([events] + transfers, ignore_index=True)
+    datas = events['data'].to_numpy(dtype='datetime64[ns]')
+    ordem_tipo = events['tipo'].map({'transferencia': 0, 'divida': 1, 'pagamento': 2}).to_numpy()
+    ordem_tipo = np.where(np.isnat(datas) & (ordem_tipo == 0), 3, ordem_tipo)
+    events = events.iloc[np.lexsort((ordem_tipo, datas, ~np.isnat(datas)))].reset_index(drop=True)
+    sinal = events['tipo'].map(SINAL).to_numpy()
+    events['saldo'] = pd.Series(events['valor'].to_numpy() * sinal).groupby(events['pessoa']).cumsum()
+    return events
+
+
+def combine_debts(output_dir, partials):
+    """Juntar os eventos de cada planilha em dividas_pessoas_cleaned.csv (e na cópia Arrow)"""
+    tables = [pd.read_csv(path, parse_dates=['data']) for path in sorted(partials) if os.path.exists(path)]
+    events = merge_debts(tables)
+    events.to_csv(os.path.join(output_dir, DEBTS_FILE), index=False)
+    write_columnar_frame(events, columnar_path(output_dir, DEBTS_FILE))
+    return events
+
+
+# Eventos sem data contam para qualquer data consultada
+SEM_DATA = np.datetime64('1900-01-01', 'ns')
+
+
+class DebtBook:
+    """Saldo devedor por pessoa em qualquer data.
+
+    Por pessoa ficam as datas dos eventos (ordenadas) e as somas acumuladas de
+    dívidas e pagamentos; "quem deve quanto na data X" é uma busca binária por
+    pessoa. `record()` acrescenta um evento (ex.: um pagamento que acabou de
+    chegar) atualizando só os arrays da pessoa.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.recorded = []
+        self.people = {}
+        datas = pd.to_datetime(table['data']).to_numpy(dtype='datetime64[ns]')
+        datas = np.where(np.isnat(datas), SEM_DATA, datas)
+        valores = table['valor'].to_numpy(dtype=float)
+        tipos = table['tipo'].to_numpy()
+        # Transferências reduzem a dívida (ela passa para a planilha seguinte)
+        dividas = np.where(tipos == 'pagamento', 0.0, np.where(tipos == 'divida', valores, -valores))
+        pagos = np.where(tipos == 'pagamento', valores, 0.0)
+        for pessoa, rows in table.groupby('pessoa', sort=True).indices.items():
+            rows = rows[np.argsort(datas[rows], kind='stable')]
+            self.people[pessoa] = (
+                datas[rows],
+                np.concatenate([[0.0], np.cumsum(dividas[rows])]),
+                np.concatenate([[0.0], np.cumsum(pagos[rows])]),
+            )
+
+    def record(self, pessoa, valor, data=None, tipo='pagamento', categoria=''):
+        """Registrar uma dívida ou um pagamento e atualizar o saldo da pessoa"""
+        when = SEM_DATA if data is None else np.datetime64(pd.Timestamp(data), 'ns')
+        datas, dividas, pagos = self.people.get(pessoa, (np.array([], 'datetime64[ns]'), np.zeros(1), np.zeros(1)))
+        pos = int(np.searchsorted(datas, when, side='right'))
+        add_divida, add_pago = (valor, 0.0) if tipo == 'divida' else (0.0, valor)
+        self.people[pessoa] = (
+            np.insert(datas, pos, when),
+            np.concatenate([dividas[:pos + 1], dividas[pos:] + add_divida]),
+            np.concatenate([pagos[:pos + 1], pagos[pos:] + add_pago]),
+        )
+        self.recorded.append({'data': pd.Timestamp(data) if data is not None else pd.NaT, 'pessoa': pessoa,
+                              'categoria': categoria, 'tipo': tipo, 'valor': valor})
+
+    def balance(self, pessoa, date=None):
+        """Saldo devedor da pessoa ao fim do dia `date` (sem data: saldo atual)"""
+        if pessoa not in self.people:
+            return 0.0
+        datas, dividas, pagos = self.people[pessoa]
+        pos = len(datas) if date is None else int(np.searchsorted(datas, np.datetime64(pd.Timestamp(date), 'ns'),
+                                                                   side='right'))
+        return float(dividas[pos] - pagos[pos])
+
+    def as_of(self, date=None):
+        """Dívida, pagamentos e saldo de cada pessoa na data (do maior saldo para o menor)"""
+        when = None if date is None else np.datetime64(pd.Timestamp(date), 'ns')
+        rows = []
+        for pessoa, (datas, dividas, pagos) in self.people.items():
+            pos = len(datas) if when is None else int(np.searchsorted(datas, when, side='right'))
+            if pos:
+                rows.append((pessoa, dividas[pos], pagos[pos], dividas[pos] - pagos[pos]))
+        result = pd.DataFrame(rows, columns=['pessoa', 'divida', 'pago', 'saldo'])
+        return result.sort_values('saldo', ascending=False, kind='stable').reset_index(drop=True)
+
+    def outstanding(self, date=None):
+        """{pessoa: saldo devedor} de quem ainda deve na data"""
+        saldos = self.as_of(date)
+        saldos = saldos[saldos['saldo'].round(2) > 0]
+        return dict(zip(saldos['pessoa'], saldos['saldo'].astype(float)))
+
+
+_cache = {}
+
+
+def load_debts(cleaned_dir):
+    """Dívidas gravadas pela limpeza, como DebtBook (um por versão do arquivo)"""
+    mtime = os.path.getmtime(os.path.join(cleaned_dir, DEBTS_FILE))
+    cached = _cache.get(cleaned_dir)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, DebtBook(load_cleaned(DEBTS_FILE, cleaned_dir)))
+        _cache[cleaned_dir] = cached
+    return cached[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Quem deve quanto (planilhas Dívida e Rifas)")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--em', help="data (AAAA-MM-DD) da consulta; sem ela, saldo atual")
+    parser.add_argument('--pessoa', help="saldo de uma pessoa só")
+    args = parser.parse_args()
+    book = load_debts(args.cleaned)
+    if args.pessoa:
+        print(f"{args.pessoa}: R$ {book.balance(args.pessoa, args.em):,.2f}")
+    else:
+        saldos = book.as_of(args.em)
+        print(saldos.to_string(index=False, float_format=lambda v: f"{v:,.2f}"))
+        print(f"TOTAL DEVIDO: R$ {saldos['saldo'].sum():,.2f}")
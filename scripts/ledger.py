@@ -0,0 +1,235 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import write_columnar_frame, columnar_path, load_cleaned
+from payment_methods import canonical_methods
+
+# Razão da conta da casa: os lançamentos de todas as planilhas Entrada_saída
+# (2023, 2023e2024, 2024, 2025...) numa única tabela ordenada por data, sem os
+# lançamentos repetidos entre exportações que se sobrepõem, com o saldo
+# acumulado já calculado. Gravada pela limpeza como mais uma planilha limpa.
+LEDGER_COLUMNS = ['data', 'conta', 'arquivo', 'tipo', 'forma_pagamento', 'historico',
+                  'descricao', 'valor', 'valor_assinado', 'saldo']
+LEDGER_NAME = 'conta_casa_razao'
+LEDGER_FILE = f'{LEDGER_NAME}_cleaned.csv'
+LEDGER_DIR = 'razao'
+
+SHEET_PATTERN = re.compile(r'^Copyofcontadacasa-Entrada_sa[ií]da(.+?)\.?(?:_cleaned)?\.csv$')
+DATE_PATTERN = re.compile(r'^(\d{1,2})/(\d{1,2})/(\d{4})$')
+SUFFIX_PATTERN = re.compile(r'\s[CD]$')
+BLOCK_TITLES = {'ENTRADA': 'entrada', 'SAÍDA': 'saida', 'SAIDA': 'saida'}
+
+
+def ledger_sheet(filename):
+    """'Copyofcontadacasa-Entrada_saída2024-CONTANOVA(dg).csv' -> '2024-CONTANOVA(dg)'"""
+    match = SHEET_PATTERN.match(os.path.basename(filename))
+    return match.group(1) if match else None
+
+
+def _is_number(text):
+    return bool(re.fullmatch(r'-?(R\$\s*)?[\d.,]+(\s[CD])?%?', text))
+
+
+def parse_ledger_sheet(path):
+    """Lançamentos de uma planilha Entrada_saída (CSV bruto), lida uma única vez.
+
+    A linha de títulos tem ENTRADA e SAÍDA (e, em algumas, quadros auxiliares
+    à direita); cada bloco vai do seu título até o título seguinte. Em cada
+    bloco a data fica na coluna do título e o histórico na seguinte; a coluna
+    do valor (com 'C'/'D' ou 'R$') e a da descrição variam entre as planilhas
+    e são escolhidas pelo conteúdo das linhas datadas.
+    """
+    blocks, rows = None, []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            cells = [cell.strip() for cell in row]
+            if blocks is None:
+                titles = [i for i, cell in enumerate(cells) if cell]
+                if any(cells[i].upper() in BLOCK_TITLES for i in titles):
+                    blocks = [(BLOCK_TITLES[cells[i].upper()], i, (titles[n + 1:] or [len(cells)])[0])
+                              for n, i in enumerate(titles) if cells[i].upper() in BLOCK_TITLES]
+                continue
+            rows.append(cells)
+
+    records = []
+    for tipo, start, end in blocks or []:
+        dated = [cells[start:end] + [''] * (end - len(cells)) for cells in rows
+                 if start < len(cells) and DATE_PATTERN.match(cells[start])]
+        if not dated:
+            continue
+
+        def score(col):
+            values = [cells[col] for cells in dated if cells[col]]
+            return (sum(bool(SUFFIX_PATTERN.search(v)) for v in values), sum(v.startswith('R$') for v in values))
+
+        valor_col = max((2, 3), key=score) if end - start > 3 else 2
+        text_counts = [sum(bool(cells[col]) and not _is_number(cells[col]) for cells in dated)
+                       for col in range(valor_col + 1, end - start)]
+        desc_col = valor_col + 1 + int(np.argmax(text_counts)) if any(text_counts) else None
+        for cells in dated:
+            dia, mes, ano = DATE_PATTERN.match(cells[0]).groups()
+            historico = ' '.join(cells[1].split('\n')[0].split())
+            valor = cells[valor_col]
+            suffix = SUFFIX_PATTERN.search(valor)
+            kind = {'C': 'entrada', 'D': 'saida'}[suffix.group(0).strip()] if suffix else tipo
+            if historico.lower().startswith('saldo anterior'):
+                kind = 'saldo_anterior'
+            records.append((f'{ano}-{int(mes):02d}-{int(dia):02d}', kind, historico,
+                            ' '.join(cells[1].split()), cells[desc_col] if desc_col else '',
+                            SUFFIX_PATTERN.sub('', valor)))
+
+    table = pd.DataFrame.from_records(
+        records, columns=['data', 'tipo', 'forma_pagamento', 'historico', 'descricao', 'valor'])
+    table['data'] = pd.to_datetime(table['data'], errors='coerce')
+    # 'Pix - Enviado ...' -> 'PIX'; históricos que não são pagamento ('Impostos', 'Saldo Anterior') ficam vazios
+    table['forma_pagamento'] = canonical_methods(table['forma_pagamento'].str.split(' - ').str[0].to_numpy(dtype=object))
+    table['valor'] = np.abs(parse_brl_array(table['valor'].replace('', None).to_numpy(dtype=object))[0])
+    return table[table['data'].notna() & table['valor'].notna()].reset_index(drop=True)
+
+
+def ledger_partial_path(output_dir, filename):
+    return os.path.join(output_dir, LEDGER_DIR, f"{os.path.basename(filename)[:-len('.csv')]}.csv")
+
+
+def write_ledger_partial(source_path, output_dir):
+    """Gravar os lançamentos de uma planilha Entrada_saída (chamado pela limpeza)"""
+    table = parse_ledger_sheet(source_path)
+    table.insert(1, 'conta', 'nova' if 'CONTANOVA' in os.path.basename(source_path).upper() else 'antiga')
+    table.insert(2, 'arquivo', ledger_sheet(source_path))
+    path = ledger_partial_path(output_dir, source_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table.to_csv(path, index=False)
+    return path, len(table)
+
+
+def merge_ledgers(tables):
+    """Juntar as planilhas num razão único, ordenado por data, com saldo de cada conta.
+
+    Exportações que se sobrepõem repetem lançamentos. Um lançamento é
+    identificado por data, tipo, valor e histórico; quando o mesmo lançamento
+    aparece k vezes numa planilha e j vezes em outra, ficam max(k, j) cópias
+    (lançamentos iguais dentro da mesma planilha são legítimos). Retorna
+    (razão, número de duplicatas removidas).
+    """
+    columns = LEDGER_COLUMNS[:-2]
+    frames = [table[columns] for table in tables if len(table)]
+    if not frames:
+        return pd.DataFrame(columns=LEDGER_COLUMNS), 0
+    merged = pd.concat(frames, ignore_index=True)
+    key = [merged['data'], merged['tipo'], merged['valor'].round(2), merged['historico'].str.upper()]
+    merged['_ocorrencia'] = merged.groupby(key + [merged['arquivo']], sort=False, dropna=False).cumcount()
+    duplicated = pd.concat(key + [merged['_ocorrencia']], axis=1).duplicated().to_numpy()
+    ledger = merged[~duplicated].drop(columns='_ocorrencia')
+    # Entradas antes das saídas no mesmo dia; a ordem das planilhas desempata
+    ordem_tipo = ledger['tipo'].map({'saldo_anterior': 0, 'entrada': 1, 'saida': 2})
+    ledger = ledger.iloc[np.lexsort((ordem_tipo.to_numpy(), ledger['data'].to_numpy()))].reset_index(drop=True)
+    # "Saldo Anterior" não movimenta a conta (valor_assinado zero), mas é o
+    # saldo informado pelo banco: o saldo da conta recomeça dele
+    sign = ledger['tipo'].map({'entrada': 1.0, 'saida': -1.0, 'saldo_anterior': 0.0}).to_numpy()
+    ledger['valor_assinado'] = ledger['valor'].to_numpy() * sign
+    ancora = (ledger['tipo'] == 'saldo_anterior').to_numpy()
+    trecho = pd.Series(ancora).groupby(ledger['conta']).cumsum()
+    movimento = pd.Series(np.where(ancora, ledger['valor'].to_numpy(), ledger['valor_assinado'].to_numpy()))
+    ledger['saldo'] = movimento.groupby([ledger['conta'], trecho]).cumsum().to_numpy()
+    return ledger, int(duplicated.sum())
+
+
+def combine_ledger(output_dir, partials):
+    """Juntar os lançamentos de cada planilha em conta_casa_razao_cleaned.csv (e na cópia Arrow)"""
+    tables = [pd.read_csv(path, parse_dates=['data']) for path in sorted(partials) if os.path.exists(path)]
+    ledger, removed = merge_ledgers(tables)
+    ledger.to_csv(os.path.join(output_dir, LEDGER_FILE), index=False)
+    write_columnar_frame(ledger, columnar_path(output_dir, LEDGER_FILE))
+    return ledger, removed
+
+
+class Ledger:
+    """Consultas sobre o razão já ordenado e com o saldo de cada conta.
+
+    As datas e as somas acumuladas de entradas e saídas ficam em arrays, e
+    as linhas de cada conta ('antiga', 'nova') num índice próprio; saldo
+    numa data, totais de um período e as linhas de um mês são buscas
+    binárias (O(log n)), sem varrer a tabela.
+    """
+
+    def __init__(self, table):
+        self.table = table
+        self.dates = pd.to_datetime(table['data']).to_numpy(dtype='datetime64[ns]')
+        self.saldo = table['saldo'].to_numpy(dtype=float)
+        signed = table['valor_assinado'].to_numpy(dtype=float)
+        self.inflow = np.concatenate([[0.0], np.cumsum(np.where(signed > 0, signed, 0.0))])
+        self.outflow = np.concatenate([[0.0], np.cumsum(np.where(signed < 0, -signed, 0.0))])
+        # Conta -> posições das suas linhas (em ordem de data)
+        self.accounts = {conta: rows for conta, rows in table.groupby('conta', sort=True).indices.items()}
+        # Índice mensal: 'AAAA-MM' -> (primeira linha, última linha + 1)
+        months = self.dates.astype('datetime64[M]')
+        starts = np.flatnonzero(np.r_[True, months[1:] != months[:-1]]) if len(months) else np.array([], int)
+        ends = np.r_[starts[1:], len(months)]
+        self.month_index = {str(months[s])[:7]: (int(s), int(e)) for s, e in zip(starts, ends)}
+
+    def __len__(self):
+        return len(self.table)
+
+    def _position(self, date, side='right'):
+        return int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(date), 'ns'), side=side))
+
+    def balance_at(self, date, conta=None):
+        """Saldo da conta ao fim do dia `date` (inclusive); sem conta, a soma das contas"""
+        when = np.datetime64(pd.Timestamp(date), 'ns')
+        saldo = 0.0
+        for rows in ([self.accounts.get(conta, [])] if conta is not None else self.accounts.values()):
+            pos = int(np.searchsorted(self.dates[rows], when, side='right'))
+            saldo += float(self.saldo[rows[pos - 1]]) if pos else 0.0
+        return saldo
+
+    def period_totals(self, start, end):
+        """Entradas, saídas e saldo do período [start, end] (datas inclusive)"""
+        i, j = self._position(start, 'left'), self._position(end)
+        entradas = float(self.inflow[j] - self.inflow[i])
+        saidas = float(self.outflow[j] - self.outflow[i])
+        return {'entradas': entradas, 'saidas': saidas, 'saldo_periodo': entradas - saidas,
+                'saldo_final': self.balance_at(end), 'lancamentos': j - i}
+
+    def period(self, start, end):
+        """Lançamentos do período [start, end]"""
+        return self.table.iloc[self._position(start, 'left'):self._position(end)]
+
+    def month(self, mes):
+        """Lançamentos de um mês ('AAAA-MM')"""
+        start, end = self.month_index.get(mes, (0, 0))
+        return self.table.iloc[start:end]
+
+
+_cache = {}
+
+
+def load_ledger(cleaned_dir):
+    """Razão gravado pela limpeza, como Ledger (um por versão do arquivo)"""
+    mtime = os.path.getmtime(os.path.join(cleaned_dir, LEDGER_FILE))
+    cached = _cache.get(cleaned_dir)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, Ledger(load_cleaned(LEDGER_FILE, cleaned_dir)))
+        _cache[cleaned_dir] = cached
+    return cached[1]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Consultar o razão da conta da casa")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--saldo-em', help="data (AAAA-MM-DD) para o saldo acumulado")
+    parser.add_argument('--conta', help="conta do saldo ('antiga' ou 'nova'); sem ela, a soma das contas")
+    parser.add_argument('--de', help="início do período (AAAA-MM-DD)")
+    parser.add_argument('--ate', help="fim do período (AAAA-MM-DD)")
+    args = parser.parse_args()
+    ledger = load_ledger(args.cleaned)
+    print(f"{len(ledger)} lançamentos, {len(ledger.month_index)} meses")
+    if args.saldo_em:
+        print(f"Saldo em {args.saldo_em}: R$ {ledger.balance_at(args.saldo_em, args.conta):,.2f}")
+    if args.de and args.ate:
+        for key, value in ledger.period_totals(args.de, args.ate).items():
+            print(f"{key}: {value:,.2f}" if isinstance(value, float) else f"{key}: {value}")
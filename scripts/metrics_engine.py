@@ -0,0 +1,415 @@
+import pandas as pd
+
+from cleaned_store import load_cleaned
+from schema_index import column_for, columns_for
+from payment_methods import sheet_payments, payment_summary, method_totals
+from budget import project_budget
+from debts import sheet_balances
+from profiling import span
+
+# Planilhas limpas usadas pelos indicadores
+DATASETS = {
+    'portaria': "Copyofcachorroquente-Vendaportaria_cleaned.csv",
+    'campus': "Copyofcachorroquente-vendacampus_cleaned.csv",
+    'orcamento_cq': "Copyofcachorroquente-orçamento2025_cleaned.csv",
+    'conta_casa': "Copyofcontadacasa-Entrada_saída2025-CONTANOVA(lofi)_cleaned.csv",
+    'obra_arrecadacoes': "CopyofOBRABANHEIROSETEMBRO25-Arrecadações_cleaned.csv",
+    'obra_orcamentos': "CopyofOBRABANHEIROSETEMBRO25-Orçamentos_cleaned.csv",
+    # Tabela de fatos semanal gerada pela limpeza a partir das planilhas mensais
+    'bombom': "bombom_fatos_cleaned.csv",
+    # Totais por evento e vendas de cachorro-quente (gerados pela limpeza)
+    'cachorro_quente': "cachorro_quente_eventos_cleaned.csv",
+    'cachorro_quente_vendas': "cachorro_quente_vendas_cleaned.csv",
+    # Eventos de dívida e pagamento por pessoa (planilhas Dívida e Rifas)
+    'dividas': "dividas_pessoas_cleaned.csv",
+    # Linhas orçadas, uma por cotação (Orçamentos da obra, orçamentos do cachorro-quente)
+    'orcamento': "orcamento_linhas_cleaned.csv",
+}
+MESES_BOMBOM = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio']
+
+
+def bombom_filename(mes):
+    return f"CopyofBombomechup-chup2025-{mes}_cleaned.csv"
+
+
+# Papéis de coluna com valores em reais, convertidos uma única vez na carga
+NUMERIC_ROLES = ('valor', 'entrada', 'saida', 'divida', 'valor_obtido',
+                 'valor_sugerido', 'lucro_liquido', 'valor_total')
+
+
+def numeric(df, col):
+    series = df[col]
+    if pd.api.types.is_numeric_dtype(series):
+        return series
+    return pd.to_numeric(series, errors='coerce')
+
+
+def typed_frame(df):
+    """Cópia (rasa) da planilha com as colunas de valores já numéricas.
+
+    A planilha recebida não é alterada; as colunas que não precisam de
+    conversão continuam compartilhando memória com ela.
+    """
+    columns = {col for role in NUMERIC_ROLES for col in columns_for(df, role)}
+    typed = df.copy(deep=False)
+    for col in columns:
+        if not pd.api.types.is_numeric_dtype(typed[col]):
+            typed[col] = pd.to_numeric(typed[col], errors='coerce')
+    typed.attrs = dict(df.attrs)
+    return typed
+
+
+def dataset_files():
+    """Todas as planilhas usadas pelos indicadores"""
+    return dict(DATASETS)
+
+
+def load_datasets(cleaned_dir):
+    """Carregar cada planilha uma única vez.
+
+    Retorna (datasets, errors): planilhas ausentes ou ilegíveis ficam de fora
+    de `datasets` e a exceção correspondente vai para `errors`.
+    """
+    datasets, errors = {}, {}
+    for key, filename in dataset_files().items():
+        try:
+            datasets[key] = load_cleaned(filename, cleaned_dir)
+        except Exception as e:
+            errors[key] = e
+    return datasets, errors
+
+
+def _method_dict(payments):
+    totals = method_totals(payment_summary([payments]))['valor_total']
+    return {str(forma): float(valor) for forma, valor in totals.items()}
+
+
+def _evento(datasets, evento):
+    """Linha de totais de um evento de cachorro-quente (vazia se não houver vendas)"""
+    eventos = datasets['cachorro_quente']
+    return eventos[eventos['evento'] == evento]
+
+
+def _portaria(datasets):
+    evento = _evento(datasets, 'portaria')
+    vendas = datasets['cachorro_quente_vendas']
+    vendas = vendas[vendas['evento'] == 'portaria']
+    # Mesmo valor das vendas que compõe a receita do evento, por forma de pagamento
+    payments = pd.DataFrame({'fonte': 'portaria', 'forma_pagamento': vendas['forma_pagamento'],
+                             'valor': vendas['valor']})
+    values = {'cachorro_quente_portaria': float(evento['receita'].sum()),
+              'vendas_cachorro_count': int(evento['vendas'].sum()),
+              'pagamento_portaria': _method_dict(payments)}
+    provenance = {'cachorro_quente_portaria': {'datasets': ['cachorro_quente'], 'columns': ['receita']},
+                  'vendas_cachorro_count': {'datasets': ['cachorro_quente'], 'columns': ['vendas']}}
+    return values, provenance
+
+
+def _campus(datasets):
+    evento = _evento(datasets, 'campus')
+    return ({'cachorro_quente_campus': float(evento['receita'].sum())},
+            {'cachorro_quente_campus': {'datasets': ['cachorro_quente'], 'columns': ['receita']}})
+
+
+def _outros_eventos(datasets):
+    """Eventos além da portaria e do campus (ex.: 11_11), somados e um a um"""
+    eventos = datasets['cachorro_quente']
+    outros = eventos[~eventos['evento'].isin(['portaria', 'campus'])]
+    return ({'cachorro_quente_outros_eventos': float(outros['receita'].sum()),
+             'receita_outros_eventos': {str(evento): float(receita)
+                                        for evento, receita in zip(outros['evento'], outros['receita'])}},
+            {'cachorro_quente_outros_eventos': {'datasets': ['cachorro_quente'], 'columns': ['receita']}})
+
+
+def _orcamento_cq(datasets):
+    df = datasets['orcamento_cq']
+    values, provenance = {}, {}
+    for metric, role in (('cachorro_quente_orcamento_sugerido', 'valor_sugerido'),
+                         ('cachorro_quente_orcamento_lucro', 'lucro_liquido')):
+        col = column_for(df, role)
+        values[metric] = float(numeric(df, col).sum()) if col else 0.0
+        if col:
+            provenance[metric] = {'datasets': ['orcamento_cq'], 'columns': [col]}
+    return values, provenance
+
+
+def _conta_casa(datasets):
+    df = datasets['conta_casa']
+    values, provenance = {}, {}
+    for metric, role in (('conta_casa_entradas', 'entrada'), ('conta_casa_saidas', 'saida')):
+        col = column_for(df, role)
+        values[metric] = float(numeric(df, col).sum()) if col else 0.0
+        if col:
+            provenance[metric] = {'datasets': ['conta_casa'], 'columns': [col]}
+    return values, provenance
+
+
+def _dividas(datasets):
+    # Saldo devedor de cada planilha Dívida: dívidas menos pagamentos e menos o
+    # que foi transferido para a planilha do ano seguinte (a Rifas fica zerada)
+    saldos = sheet_balances(datasets['dividas'])
+    values, provenance = {}, {}
+    for ano in ('2024', '2025'):
+        values[f'dividas_{ano}'] = float(saldos.get(f'Dívida{ano}', 0.0))
+        provenance[f'dividas_{ano}'] = {'datasets': ['dividas'], 'columns': ['arquivo', 'tipo', 'valor']}
+    return values, provenance
+
+
+def _obra_arrecadacoes(datasets):
+    df = datasets['obra_arrecadacoes']
+    values = {'obra_banheiro_arrecadado': 0.0, 'pagamento_obra': {}}
+    provenance = {}
+    valor_col = column_for(df, 'valor')
+    if valor_col:
+        valores = numeric(df, valor_col)
+        values['obra_banheiro_arrecadado'] = float(valores.sum())
+        provenance['obra_banheiro_arrecadado'] = {'datasets': ['obra_arrecadacoes'], 'columns': [valor_col]}
+        values['pagamento_obra'] = _method_dict(sheet_payments(df, 'obra'))
+    return values, provenance
+
+
+def _obra_orcamentos(datasets):
+    # Cada item pela cotação mais barata (mesmo total da previsão da campanha, pledges.py)
+    total = project_budget(datasets['orcamento'], 'obra_banheiro') or 0.0
+    return ({'obra_banheiro_orcado': total},
+            {'obra_banheiro_orcado': {'datasets': ['orcamento'],
+                                      'columns': ['projeto', 'linha', 'valor_total']}})
+
+
+def _bombom(datasets):
+    facts = datasets.get('bombom')
+    if facts is None:
+        return {'monthly_bombom': {}}, {}
+    # "Valor obtido" do fechamento de caixa de cada semana
+    obtido = facts[(facts['bloco'] == 'fechamento') & (facts['item'].str.lower() == 'valor obtido')]
+    totals = obtido.groupby('mes')['valor'].sum()
+    monthly_bombom = {mes: float(totals.get(mes, 0.0)) for mes in MESES_BOMBOM}
+    return ({'monthly_bombom': monthly_bombom},
+            {'monthly_bombom': {'datasets': ['bombom'], 'columns': ['bloco', 'item', 'valor']}})
+
+
+# Seções dos indicadores: planilhas usadas, valores padrão (quando alguma
+# planilha falta) e a função que calcula. Cada seção lê só as suas planilhas,
+# o que permite calcular (e guardar em cache) uma seção sem carregar as demais.
+SECTIONS = {
+    'portaria': (('cachorro_quente_vendas', 'cachorro_quente'), _portaria,
+                 {'cachorro_quente_portaria': 0.0, 'vendas_cachorro_count': 0, 'pagamento_portaria': {}}),
+    'campus': (('cachorro_quente',), _campus, {'cachorro_quente_campus': 0.0}),
+    'outros_eventos': (('cachorro_quente',), _outros_eventos,
+                       {'cachorro_quente_outros_eventos': 0.0, 'receita_outros_eventos': {}}),
+    'orcamento_cq': (('orcamento_cq',), _orcamento_cq,
+                     {'cachorro_quente_orcamento_sugerido': 0.0, 'cachorro_quente_orcamento_lucro': 0.0}),
+    'conta_casa': (('conta_casa',), _conta_casa, {'conta_casa_entradas': 0.0, 'conta_casa_saidas': 0.0}),
+    'dividas': (('dividas',), _dividas, {'dividas_2024': 0.0, 'dividas_2025': 0.0}),
+    'obra_arrecadacoes': (('obra_arrecadacoes',), _obra_arrecadacoes,
+                          {'obra_banheiro_arrecadado': 0.0, 'pagamento_obra': {}}),
+    'obra_orcamentos': (('orcamento',), _obra_orcamentos, {'obra_banheiro_orcado': 0.0}),
+    'bombom': (('bombom',), _bombom, {'monthly_bombom': {}}),
+}
+
+
+def compute_section(name, datasets, errors=None):
+    """Calcular uma seção a partir das suas planilhas.
+
+    Retorna (valores, proveniência, erros); se faltar alguma planilha
+    obrigatória, os valores são os padrões da seção e o erro fica registrado.
+    """
+    dataset_keys, func, defaults = SECTIONS[name]
+    errors = errors or {}
+    if name != 'bombom':  # a tabela de bombom é opcional
+        for key in dataset_keys:
+            if key not in datasets:
+                return dict(defaults), {}, {name: errors.get(key, f"planilha '{key}' não carregada")}
+    with span(f'metricas.{name}') as s:
+        s.rows_in = sum(len(datasets[key]) for key in dataset_keys if key in datasets)
+        values, provenance = func(datasets)
+    return values, provenance, {}
+
+
+def combine_sections(sections):
+    """Juntar as seções calculadas e derivar os totais e indicadores.
+
+    `sections` é {nome da seção: (valores, proveniência, erros)}. As chaves
+    saem na mesma ordem do financial_summary.txt.
+    """
+    parts, provenance, errors = {}, {}, {}
+    for values, section_provenance, section_errors in sections.values():
+        parts.update(values)
+        provenance.update(section_provenance)
+        errors.update(section_errors)
+
+    summary = {key: parts[key] for key in (
+        'cachorro_quente_portaria', 'vendas_cachorro_count', 'cachorro_quente_campus',
+        'cachorro_quente_outros_eventos', 'cachorro_quente_orcamento_sugerido', 'cachorro_quente_orcamento_lucro')}
+    summary['total_cachorro_quente'] = (summary['cachorro_quente_portaria'] + summary['cachorro_quente_campus'] +
+                                        summary['cachorro_quente_outros_eventos'])
+
+    summary['conta_casa_entradas'] = parts['conta_casa_entradas']
+    summary['conta_casa_saidas'] = parts['conta_casa_saidas']
+    summary['conta_casa_saldo'] = summary['conta_casa_entradas'] - summary['conta_casa_saidas']
+
+    summary['dividas_2024'] = parts['dividas_2024']
+    summary['dividas_2025'] = parts['dividas_2025']
+    summary['total_dividas'] = summary['dividas_2024'] + summary['dividas_2025']
+
+    summary['obra_banheiro_arrecadado'] = parts['obra_banheiro_arrecadado']
+    summary['obra_banheiro_orcado'] = parts['obra_banheiro_orcado']
+    summary['obra_banheiro_deficit'] = summary['obra_banheiro_arrecadado'] - summary['obra_banheiro_orcado']
+
+    # Resumo geral e indicadores
+    summary['total_receitas'] = (
+        summary['total_cachorro_quente'] +
+        summary['conta_casa_entradas'] +
+        summary['obra_banheiro_arrecadado']
+    )
+    summary['total_despesas'] = summary['conta_casa_saidas'] + summary['obra_banheiro_orcado']
+    summary['saldo_geral'] = summary['total_receitas'] - summary['total_despesas'] - summary['total_dividas']
+
+    if summary['total_receitas'] > 0:
+        summary['margem_liquida'] = summary['saldo_geral'] / summary['total_receitas'] * 100
+        summary['participacao_cachorro_quente'] = summary['total_cachorro_quente'] / summary['total_receitas'] * 100
+        summary['participacao_obra'] = summary['obra_banheiro_arrecadado'] / summary['total_receitas'] * 100
+
+    for metric, inputs in DERIVED_METRICS.items():
+        if metric in summary:
+            provenance[metric] = {'derived_from': list(inputs)}
+
+    summary['pagamento_portaria'] = parts['pagamento_portaria']
+    summary['receita_outros_eventos'] = parts['receita_outros_eventos']
+    summary['pagamento_obra'] = parts['pagamento_obra']
+    summary['monthly_bombom'] = parts['monthly_bombom']
+    summary['errors'] = errors
+    summary['provenance'] = provenance
+    return summary
+
+
+def compute_metrics(cleaned_dir=None, datasets=None):
+    """Calcular todos os indicadores financeiros numa única passada.
+
+    Recebe o diretório das planilhas limpas ou um dicionário já carregado por
+    load_datasets(). Retorna um dicionário com os totais (valores float, mesmas
+    chaves do financial_summary.txt) e, em chaves separadas, os detalhamentos:
+    'pagamento_portaria', 'receita_outros_eventos', 'pagamento_obra', 'monthly_bombom', 'errors' e
+    'provenance' (planilhas e colunas de origem de cada indicador).
+    """
+    if datasets is None:
+        datasets, errors = load_datasets(cleaned_dir)
+    else:
+        errors = {}
+    return combine_sections({name: compute_section(name, datasets, errors) for name in SECTIONS})
+
+
+# Indicadores calculados a partir de outros (para a proveniência do resumo)
+DERIVED_METRICS = {
+    'total_cachorro_quente': ('cachorro_quente_portaria', 'cachorro_quente_campus', 'cachorro_quente_outros_eventos'),
+    'conta_casa_saldo': ('conta_casa_entradas', 'conta_casa_saidas'),
+    'total_dividas': ('dividas_2024', 'dividas_2025'),
+    'obra_banheiro_deficit': ('obra_banheiro_arrecadado', 'obra_banheiro_orcado'),
+    'total_receitas': ('total_cachorro_quente', 'conta_casa_entradas', 'obra_banheiro_arrecadado'),
+    'total_despesas': ('conta_casa_saidas', 'obra_banheiro_orcado'),
+    'saldo_geral': ('total_receitas', 'total_despesas', 'total_dividas'),
+    'margem_liquida': ('saldo_geral', 'total_receitas'),
+    'participacao_cachorro_quente': ('total_cachorro_quente', 'total_receitas'),
+    'participacao_obra': ('obra_banheiro_arrecadado', 'total_receitas'),
+}
+
+PERCENT_METRICS = ('margem_liquida', 'participacao_cachorro_quente', 'participacao_obra')
+
+
+def scalar_metrics(metrics):
+    """Só os totais em reais (sem detalhamentos, contagens e percentuais)"""
+    return {
+        key: value for key, value in metrics.items()
+        if isinstance(value, float) and key not in PERCENT_METRICS
+    }
+
+
+def print_financial_report(metrics):
+    """Imprimir o relatório da análise financeira a partir dos indicadores"""
+    errors = metrics.get('errors', {})
+
+    print("=== ANÁLISE FINANCEIRA E CONTROLE DE CAIXA ===\n")
+
+    print("1. ANÁLISE CACHORRO QUENTE")
+    print("-" * 40)
+    if 'portaria' in errors:
+        print(f"Erro ao analisar vendas portaria: {errors['portaria']}")
+    else:
+        print(f"Total Vendas Portaria: R$ {metrics['cachorro_quente_portaria']:.2f}")
+        if metrics['pagamento_portaria']:
+            print("Vendas por Forma de Pagamento (Portaria):")
+            for forma, valor in metrics['pagamento_portaria'].items():
+                print(f"  {forma}: R$ {valor:.2f}")
+    if 'campus' in errors:
+        print(f"Erro ao analisar vendas campus: {errors['campus']}")
+    else:
+        print(f"Total Vendas Campus: R$ {metrics['cachorro_quente_campus']:.2f}")
+    if 'outros_eventos' in errors:
+        print(f"Erro ao analisar outros eventos: {errors['outros_eventos']}")
+    else:
+        for evento, receita in metrics['receita_outros_eventos'].items():
+            print(f"Total Vendas Evento {evento}: R$ {receita:.2f}")
+    if 'orcamento_cq' in errors:
+        print(f"Erro ao analisar orçamento cachorro quente: {errors['orcamento_cq']}")
+    else:
+        print(f"Total Valor Sugerido (Orçamento): R$ {metrics['cachorro_quente_orcamento_sugerido']:.2f}")
+        print(f"Total Lucro Líquido Estimado (Orçamento): R$ {metrics['cachorro_quente_orcamento_lucro']:.2f}")
+    print(f"TOTAL CACHORRO QUENTE: R$ {metrics['total_cachorro_quente']:.2f}")
+
+    print("\n" + "="*50 + "\n")
+    print("2. ANÁLISE CONTA DA CASA")
+    print("-" * 40)
+    if 'conta_casa' in errors:
+        print(f"Erro ao analisar conta da casa: {errors['conta_casa']}")
+    else:
+        print(f"Total Entradas 2025: R$ {metrics['conta_casa_entradas']:.2f}")
+        print(f"Total Saídas 2025: R$ {metrics['conta_casa_saidas']:.2f}")
+        print(f"Saldo Líquido 2025: R$ {metrics['conta_casa_saldo']:.2f}")
+    if 'dividas' in errors:
+        print(f"Erro ao analisar dívidas: {errors['dividas']}")
+    else:
+        print(f"Dívidas 2024: R$ {metrics['dividas_2024']:.2f}")
+        print(f"Dívidas 2025: R$ {metrics['dividas_2025']:.2f}")
+        print(f"TOTAL DÍVIDAS: R$ {metrics['total_dividas']:.2f}")
+
+    print("\n" + "="*50 + "\n")
+    print("3. ANÁLISE OBRA BANHEIRO")
+    print("-" * 40)
+    if 'obra_arrecadacoes' in errors:
+        print(f"Erro ao analisar arrecadações obra: {errors['obra_arrecadacoes']}")
+    else:
+        print(f"Total Arrecadado Obra Banheiro: R$ {metrics['obra_banheiro_arrecadado']:.2f}")
+        if metrics['pagamento_obra']:
+            print("Arrecadações por Método de Pagamento:")
+            for metodo, valor in metrics['pagamento_obra'].items():
+                print(f"  {metodo}: R$ {valor:.2f}")
+    if 'obra_orcamentos' in errors:
+        print(f"Erro ao analisar orçamentos obra: {errors['obra_orcamentos']}")
+    else:
+        print(f"Total Orçado Obra Banheiro: R$ {metrics['obra_banheiro_orcado']:.2f}")
+        print(f"Déficit/Superávit Obra: R$ {metrics['obra_banheiro_deficit']:.2f}")
+
+    print("\n" + "="*50 + "\n")
+    print("4. RESUMO FINANCEIRO GERAL")
+    print("-" * 40)
+    print(f"TOTAL RECEITAS: R$ {metrics['total_receitas']:.2f}")
+    print(f"TOTAL DESPESAS: R$ {metrics['total_despesas']:.2f}")
+    print(f"TOTAL DÍVIDAS: R$ {metrics['total_dividas']:.2f}")
+    print(f"SALDO GERAL: R$ {metrics['saldo_geral']:.2f}")
+
+    print("\n" + "="*50 + "\n")
+    print("5. INDICADORES DE PERFORMANCE")
+    print("-" * 40)
+    if 'margem_liquida' in metrics:
+        print(f"Margem Líquida: {metrics['margem_liquida']:.2f}%")
+        print(f"Participação Cachorro Quente nas Receitas: {metrics['participacao_cachorro_quente']:.2f}%")
+        print(f"Participação Obra Banheiro nas Receitas: {metrics['participacao_obra']:.2f}%")
+
+
+def write_summary_txt(metrics, path='/home/ubuntu/financial_summary.txt'):
+    with open(path, 'w') as f:
+        f.write("RESUMO FINANCEIRO\n")
+        f.write("="*50 + "\n\n")
+        for key, value in scalar_metrics(metrics).items():
+            f.write(f"{key}: R$ {value:.2f}\n")
+    print(f"\nResumo salvo em: {path}")
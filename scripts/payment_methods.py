@@ -0,0 +1,130 @@
+import functools
+import numpy as np
+import pandas as pd
+
+from schema_index import build_schema, column_for, fold
+
+# Formas de pagamento canônicas, na ordem das categorias
+METHODS = ['PIX', 'Dinheiro', 'Boleto', 'Cartão', 'Transferência']
+
+# Grafias encontradas nas planilhas (já sem acento, minúsculas) -> forma canônica
+ALIASES = {
+    'pix': 'PIX', 'chave pix': 'PIX', 'transferencia pix': 'PIX',
+    'dinheiro': 'Dinheiro', 'especie': 'Dinheiro', 'em especie': 'Dinheiro',
+    'boleto': 'Boleto', 'boleto bancario': 'Boleto',
+    'cartao': 'Cartão', 'credito': 'Cartão', 'debito': 'Cartão', 'cartao de credito': 'Cartão',
+    'cartao de debito': 'Cartão', 'compra com cartao': 'Cartão',
+    'transferencia': 'Transferência', 'ted': 'Transferência', 'doc': 'Transferência',
+    'deposito': 'Transferência',
+    # Históricos do extrato bancário (razão da conta da casa)
+    'pix-envio devolvido': 'PIX', 'ted transf.eletr.disponiv': 'Transferência', 'tedinternet': 'Transferência',
+    'transferencia recebida': 'Transferência',
+}
+
+# Papéis (schema_index) das colunas de forma de pagamento
+PAYMENT_ROLES = ('forma_pagamento', 'metodo_pagamento')
+
+
+@functools.lru_cache(maxsize=None)
+def canonical_method(text):
+    """Forma canônica de um valor da planilha ('pix ' -> 'PIX'); None se vazio.
+
+    Valores fora do dicionário não são formas de pagamento ('dívida',
+    'Impostos', 'Saldo Anterior'...) e também viram None.
+    """
+    if text is None or (isinstance(text, float) and np.isnan(text)):
+        return None
+    key = ' '.join(fold(text).split())
+    if key in ('', 'nan', 'none'):
+        return None
+    return ALIASES.get(key)
+
+
+def _factorized(values):
+    """(códigos por linha, forma canônica de cada valor distinto); -1 = vazio"""
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+    return codes, [canonical_method(value) for value in uniques]
+
+
+def canonical_methods(values):
+    """Formas canônicas de uma coluna inteira (array de objetos).
+
+    O dicionário é consultado uma vez por valor distinto (factorize), não por
+    linha.
+    """
+    codes, mapped = _factorized(values)
+    return np.array(mapped + [None], dtype=object)[codes]
+
+
+def normalize_methods(values):
+    """Coluna de formas de pagamento como categórica, com as formas canônicas primeiro"""
+    if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype) and \
+            list(values.cat.categories[:len(METHODS)]) == METHODS:
+        return values
+    codes, mapped = _factorized(values)
+    categories = METHODS + sorted({value for value in mapped if value is not None} - set(METHODS))
+    position = {category: i for i, category in enumerate(categories)}
+    lookup = np.array([position.get(value, -1) for value in mapped] + [-1], dtype=np.int64)
+    categorical = pd.Categorical.from_codes(lookup[codes], categories=categories)
+    if isinstance(values, pd.Series):
+        return pd.Series(categorical, index=values.index, name=values.name)
+    return categorical
+
+
+def payment_columns(columns):
+    """Colunas de forma/método de pagamento de uma planilha (pelo índice de esquema)"""
+    roles = build_schema(columns)['roles']
+    return [col for role in PAYMENT_ROLES for col in roles.get(role, [])]
+
+
+def normalize_payment_columns(df, categorical=True):
+    """Planilha com as colunas de forma de pagamento já canônicas.
+
+    Aplicado uma vez, na limpeza: o CSV limpo grava a forma canônica e a cópia
+    Arrow a guarda como categórica. Com categorical=False as colunas ficam texto
+    (esquema fixo da limpeza em blocos).
+    """
+    columns = [col for col in payment_columns(df.columns) if col in df.columns]
+    if not columns:
+        return df
+    df = df.copy()
+    for col in columns:
+        df[col] = normalize_methods(df[col]) if categorical else canonical_methods(df[col])
+    return df
+
+
+def sheet_payments(df, fonte):
+    """(fonte, forma_pagamento, valor) de uma planilha limpa, pelas colunas de
+    valor e de forma/método de pagamento; vazio se faltar alguma delas"""
+    valor_col = column_for(df, 'valor')
+    forma_col = next((column_for(df, role) for role in PAYMENT_ROLES if column_for(df, role)), None)
+    if not (valor_col and forma_col):
+        return pd.DataFrame({'fonte': [], 'forma_pagamento': [], 'valor': []})
+    valores = df[valor_col]
+    if not pd.api.types.is_numeric_dtype(valores):
+        valores = pd.to_numeric(valores, errors='coerce')
+    return pd.DataFrame({'fonte': fonte, 'forma_pagamento': df[forma_col], 'valor': valores})
+
+
+def payment_summary(parts):
+    """Totais e contagens por fonte e forma de pagamento, num único groupby.
+
+    `parts` são tabelas com as colunas fonte, forma_pagamento e valor (as
+    tabelas de lançamentos de transactions servem direto). Linhas sem forma
+    de pagamento ficam de fora. Retorna um DataFrame indexado por
+    (fonte, forma_pagamento) com valor_total e quantidade.
+    """
+    frame = pd.concat([part[['fonte', 'forma_pagamento', 'valor']] for part in parts], ignore_index=True)
+    frame = frame[frame['valor'].notna()]
+    formas = normalize_methods(frame['forma_pagamento'].astype(object))
+    return (frame['valor'].astype(float)
+            .groupby([frame['fonte'], formas], observed=True, sort=True)
+            .agg(valor_total='sum', quantidade='count'))
+
+
+def method_totals(summary, fonte=None):
+    """Totais por forma de pagamento de uma fonte (ou somando todas)"""
+    if fonte is not None:
+        fontes = summary.index.get_level_values('fonte')
+        return summary[fontes == fonte].droplevel('fonte')
+    return summary.groupby(level='forma_pagamento', observed=True).sum()
@@ -0,0 +1,253 @@
+import os
+import time
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import load_cleaned
+from metrics_engine import DATASETS
+from budget import project_budget
+from schema_index import column_for, fold
+from transactions import MESES, ANO_PLANILHAS
+
+# Campanha da obra do banheiro: cada ex-aluna promete um valor mensal a partir
+# de um mês inicial; a planilha de Arrecadações traz, à direita, o quanto cada
+# uma pagou em cada mês da campanha.
+OUTPUT_DIR = '/home/ubuntu/obra'
+# Meses além do fim do cronograma em que a previsão ainda procura a conclusão
+HORIZONTE_MESES = 120
+
+
+def _fold_values(values):
+    """fold() de cada valor (array), calculado uma vez por valor distinto"""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+    folded = np.array([fold(value) for value in uniques] + [''], dtype=object)
+    return folded[codes]
+
+
+def _numbers(df, col):
+    if col is None:
+        return np.full(len(df), np.nan)
+    return pd.to_numeric(df[col], errors='coerce').to_numpy(dtype=float)
+
+
+def _month_columns(df):
+    """Colunas de pagamento por mês ('Maio', 'Julho ', 'setembro') -> número do mês"""
+    return {col: MESES[fold(col)] for col in df.columns if fold(col) in MESES}
+
+
+def pledges(df, ano=ANO_PLANILHAS):
+    """Compromissos da planilha de Arrecadações: pessoa, valor mensal, parcelas e mês/dia inicial.
+
+    O número de parcelas é Valor total / Valor; sem Valor total, vão do mês
+    inicial até o último mês da campanha. Sem mês inicial, a campanha começa
+    no primeiro mês das colunas de pagamento; sem dia, a parcela vence no fim
+    do mês.
+    """
+    meses = sorted(_month_columns(df).values()) or [1, 12]
+    mes_col = column_for(df, 'mes_inicial')
+    valores = _numbers(df, column_for(df, 'valor'))
+    nomes = np.array([str(nome).strip() if isinstance(nome, str) else '' for nome in df.iloc[:, 0]], dtype=object)
+    mask = (valores > 0) & (nomes != '')
+    inicio = np.full(int(mask.sum()), meses[0])
+    if mes_col:
+        inicio = pd.Series(_fold_values(df[mes_col].to_numpy(dtype=object)[mask])).map(MESES).fillna(meses[0])
+    inicio = np.asarray(inicio, dtype=int)
+    parcelas = np.round(_numbers(df, column_for(df, 'valor_total'))[mask] / valores[mask])
+    parcelas = np.where(parcelas > 0, parcelas, meses[-1] - inicio + 1).clip(min=1).astype(int)
+    return pd.DataFrame({
+        'pessoa': nomes[mask],
+        'valor': valores[mask],
+        'parcelas': parcelas,
+        'mes_inicial': inicio,
+        'dia': _numbers(df, column_for(df, 'dia'))[mask],
+        'ano': ano,
+    })
+
+
+def payments(df, ano=ANO_PLANILHAS):
+    """Pagamentos por pessoa, ano e mês (tabela longa), das colunas de meses da planilha.
+
+    O nome vem da coluna "Ex-alunas" do quadro de pagamentos; quando está em
+    branco, vale o nome da mesma linha no quadro de informações. As colunas
+    seguem a ordem da campanha, que começa em `ano`: um mês menor que o da
+    coluna anterior ('Novembro', 'Dezembro', 'Janeiro') já é do ano seguinte.
+    """
+    month_cols = _month_columns(df)
+    if not month_cols:
+        return pd.DataFrame({'pessoa': np.array([], dtype=object), 'ano': np.array([], dtype=int),
+                             'mes': np.array([], dtype=int), 'valor_pago': np.array([], dtype=float)})
+    numeros = np.array(list(month_cols.values()))
+    anos = ano + np.concatenate([[0], np.cumsum(np.diff(numeros) < 0)])
+    first = df.columns.get_loc(next(iter(month_cols)))
+    nomes = df.iloc[:, 0].to_numpy(dtype=object)
+    if first > 0 and fold(df.columns[first - 1]).startswith('ex-alunas'):
+        pagadoras = df.iloc[:, first - 1].to_numpy(dtype=object)
+        nomes = np.where(pd.isna(pagadoras), nomes, pagadoras)
+    block = np.column_stack([
+        df[col].to_numpy(dtype=float) if pd.api.types.is_numeric_dtype(df[col])
+        else parse_brl_array(df[col].to_numpy(dtype=object))[0] for col in month_cols])
+    linhas, colunas = np.nonzero(~np.isnan(block) & (block != 0))
+    return pd.DataFrame({
+        'pessoa': np.array([str(nome).strip() for nome in nomes[linhas]], dtype=object),
+        'ano': anos[colunas],
+        'mes': numeros[colunas],
+        'valor_pago': block[linhas, colunas],
+    })
+
+
+def installments(compromissos, pagos, hoje):
+    """Parcelas previstas de cada compromisso, juntadas aos pagamentos do mês.
+
+    A expansão é vetorizada (np.repeat dos compromissos pelo número de
+    parcelas) e a junção com os pagamentos usa uma chave inteira (pessoa, mês
+    absoluto, com o ano), com o nome sem acento e sem maiúsculas, ordenada e buscada com
+    searchsorted. Situação: 'paga', 'parcial', 'em atraso' (vencida sem
+    pagamento completo) ou 'a vencer'.
+    """
+    n = compromissos['parcelas'].to_numpy()
+    rows = np.repeat(np.arange(len(compromissos)), n)
+    offset = np.arange(len(rows)) - np.repeat(np.cumsum(n) - n, n)
+    mes_abs = ((compromissos['ano'].to_numpy() - 1970) * 12 + compromissos['mes_inicial'].to_numpy() - 1)[rows] + offset
+    primeiro = mes_abs.astype('datetime64[M]').astype('datetime64[D]')
+    fim_do_mes = (mes_abs + 1).astype('datetime64[M]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    dias = np.nan_to_num(compromissos['dia'].to_numpy()[rows], nan=31).astype(int)
+    vencimento = np.minimum(primeiro + (dias - 1).astype('timedelta64[D]'), fim_do_mes)
+    meses = mes_abs % 12 + 1
+
+    # Chave inteira pessoa * n + mês absoluto (meses desde 1970, com o ano);
+    # pagamentos repetidos no mesmo mês são somados
+    pessoas = compromissos['pessoa'].to_numpy(dtype=object)
+    codes = pd.factorize(np.concatenate([_fold_values(pessoas), _fold_values(pagos['pessoa'])]))[0]
+    mes_pago = (pagos['ano'].to_numpy(dtype=int) - 1970) * 12 + pagos['mes'].to_numpy(dtype=int) - 1
+    n_meses = int(max(mes_abs.max(initial=0), mes_pago.max(initial=0))) + 1
+    chave = codes[:len(pessoas)][rows].astype(np.int64) * n_meses + mes_abs
+    chaves_pagas, inverse = np.unique(codes[len(pessoas):].astype(np.int64) * n_meses + mes_pago,
+                                      return_inverse=True)
+    totais = np.bincount(inverse, weights=pagos['valor_pago'].to_numpy(dtype=float), minlength=len(chaves_pagas))
+    pos = np.searchsorted(chaves_pagas, chave).clip(max=max(len(chaves_pagas) - 1, 0))
+    achou = (chaves_pagas[pos] == chave) if len(chaves_pagas) else np.zeros(len(chave), dtype=bool)
+    valor_pago = np.where(achou, totais[pos] if len(totais) else 0.0, 0.0)
+
+    valor_previsto = compromissos['valor'].to_numpy()[rows]
+    vencida = vencimento < np.datetime64(pd.Timestamp(hoje), 'D')
+    situacao = np.select([valor_pago >= valor_previsto - 0.005, vencida, valor_pago > 0],
+                         ['paga', 'em atraso', 'parcial'], 'a vencer')
+    return pd.DataFrame({
+        'pessoa': pessoas[rows],
+        'parcela': offset + 1,
+        'mes': meses,
+        'vencimento': vencimento.astype('datetime64[ns]'),
+        'valor_previsto': valor_previsto,
+        'valor_pago': valor_pago,
+        'situacao': situacao,
+    })
+
+
+def campaign_status(parcelas, orcamento, hoje):
+    """Atrasos por pessoa e previsão de arrecadação da campanha contra o orçamento.
+
+    A projeção mensal soma o que já foi pago e as parcelas a vencer
+    ponderadas pela adimplência observada (pago / vencido até hoje); depois do
+    fim do cronograma, segue no ritmo médio mensal projetado. `conclusao` é o
+    mês em que o acumulado projetado alcança o orçamento.
+    """
+    vencimento = parcelas['vencimento'].to_numpy(dtype='datetime64[D]')
+    previsto = parcelas['valor_previsto'].to_numpy(dtype=float)
+    pago = parcelas['valor_pago'].to_numpy(dtype=float)
+    vencida = vencimento < np.datetime64(pd.Timestamp(hoje), 'D')
+    devido, arrecadado = float(previsto[vencida].sum()), float(pago.sum())
+    adimplencia = min(1.0, arrecadado / devido) if devido else 1.0
+
+    # Atraso por pessoa: parcelas vencidas menos o que foi pago nelas
+    codes, pessoas = pd.factorize(parcelas['pessoa'].to_numpy(dtype=object))
+    atraso = np.bincount(codes, weights=np.where(vencida, previsto - pago, 0.0), minlength=len(pessoas))
+    ordem = np.argsort(-atraso, kind='stable')
+    ordem = ordem[atraso[ordem] > 0.005]
+    atrasos = pd.DataFrame({'pessoa': np.asarray(pessoas, dtype=object)[ordem], 'atraso': atraso[ordem]})
+
+    competencias, mes = np.unique(vencimento.astype('datetime64[M]'), return_inverse=True)
+    projetado = pago + np.where(vencida, 0.0, previsto * adimplencia)
+    mensal = pd.DataFrame({
+        'previsto': np.bincount(mes, previsto, len(competencias)),
+        'pago': np.bincount(mes, pago, len(competencias)),
+        'projetado': np.bincount(mes, projetado, len(competencias)),
+    }, index=pd.Index(np.datetime_as_string(competencias), name='mes'))
+    mensal['projetado_acumulado'] = mensal['projetado'].cumsum()
+
+    previsto_total, projetado_total = float(previsto.sum()), float(projetado.sum())
+    conclusao = None
+    if orcamento and len(competencias):
+        hit = np.searchsorted(mensal['projetado_acumulado'].to_numpy(), orcamento - 0.005)
+        if hit < len(competencias):
+            conclusao = str(competencias[hit])
+        else:
+            ritmo = projetado_total / len(competencias)
+            meses = int(np.ceil((orcamento - projetado_total) / ritmo)) if ritmo > 0 else None
+            if meses is not None and meses <= HORIZONTE_MESES:
+                conclusao = str(competencias[-1] + meses)
+    return {
+        'orcamento': orcamento,
+        'previsto': previsto_total,
+        'arrecadado': arrecadado,
+        'vencido': devido,
+        'em_atraso': float(atraso.sum()),
+        'adimplencia': adimplencia,
+        'a_receber': float(previsto[~vencida].sum()),
+        'projetado': projetado_total,
+        'deficit_previsto': (orcamento - previsto_total) if orcamento else None,
+        'deficit_projetado': (orcamento - projetado_total) if orcamento else None,
+        'conclusao': conclusao,
+        'atrasos': atrasos,
+        'mensal': mensal,
+    }
+
+
+def obra_schedule(arrecadacoes, orcamentos=None, hoje=None, ano=ANO_PLANILHAS):
+    """Parcelas e situação da campanha a partir das planilhas limpas (DataFrames).
+
+    `orcamentos` são as linhas de orçamento (budget.py); o orçamento da obra é
+    o mesmo total orçado do motor de métricas.
+    """
+    hoje = pd.Timestamp.today().normalize() if hoje is None else pd.Timestamp(hoje)
+    parcelas = installments(pledges(arrecadacoes, ano), payments(arrecadacoes, ano), hoje)
+    orcamento = project_budget(orcamentos, 'obra_banheiro') if orcamentos is not None else None
+    return parcelas, campaign_status(parcelas, orcamento, hoje)
+
+
+def run_obra_schedule(cleaned_dir='/home/ubuntu/cleaned_data', output_dir=OUTPUT_DIR, hoje=None):
+    """Gravar obra_parcelas.csv e obra_previsao.csv e imprimir a situação da campanha"""
+    print("=== OBRA DO BANHEIRO: CRONOGRAMA DE CONTRIBUIÇÕES ===")
+    arrecadacoes = load_cleaned(DATASETS['obra_arrecadacoes'], cleaned_dir)
+    orcamentos = load_cleaned(DATASETS['orcamento'], cleaned_dir)
+    start = time.perf_counter()
+    parcelas, status = obra_schedule(arrecadacoes, orcamentos, hoje)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    os.makedirs(output_dir, exist_ok=True)
+    parcelas.to_csv(os.path.join(output_dir, 'obra_parcelas.csv'), index=False)
+    status['mensal'].to_csv(os.path.join(output_dir, 'obra_previsao.csv'))
+
+    print(f"{len(parcelas)} parcelas de {parcelas['pessoa'].nunique()} pessoas (calculado em {elapsed:.1f} ms)")
+    if status['orcamento']:
+        print(f"Orçamento da obra: R$ {status['orcamento']:,.2f}")
+    print(f"Previsto nos compromissos: R$ {status['previsto']:,.2f}")
+    print(f"Arrecadado: R$ {status['arrecadado']:,.2f} (adimplência {status['adimplencia']:.0%})")
+    print(f"Em atraso: R$ {status['em_atraso']:,.2f}")
+    for _, row in status['atrasos'].iterrows():
+        print(f"  {row['pessoa']}: R$ {row['atraso']:,.2f}")
+    if status['deficit_projetado'] is not None:
+        print(f"Déficit projetado: R$ {status['deficit_projetado']:,.2f}")
+        print(f"Déficit se todos os compromissos forem pagos: R$ {status['deficit_previsto']:,.2f}")
+        print(f"Conclusão projetada: {status['conclusao'] or f'orçamento não alcançado em {HORIZONTE_MESES} meses'}")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Cronograma de contribuições da obra do banheiro")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--em', help="data de referência (AAAA-MM-DD); padrão: hoje")
+    args = parser.parse_args()
+    run_obra_schedule(args.cleaned, args.output, args.em)
@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import time
+import atexit
+import functools
+import resource
+import threading
+from datetime import datetime
+
+# Instrumentação por etapas: `with span('read_csv', path=...) as s:` mede tempo
+# de parede e de CPU, linhas de entrada/saída, bytes lidos/gravados e o pico de
+# memória do processo. Desligada (padrão), span() devolve um contexto vazio
+# compartilhado e não mede nada. Liga com a variável de ambiente abaixo (valor:
+# diretório dos traces, ou 1 para o padrão; 0/false desliga) ou com --profile.
+ENV_VAR = 'FINANCEIRO_PROFILE'
+# Identificador da execução, herdado pelos processos filhos: cada processo grava
+# o próprio trace_<execução>_<pid>.jsonl e o trace do Chrome junta todos
+RUN_VAR = 'FINANCEIRO_PROFILE_RUN'
+TRACE_DIR = '/home/ubuntu/profiling'
+# Valores da variável de ambiente que deixam a instrumentação desligada ou
+# ligada no diretório padrão
+OFF_VALUES = ('', '0', 'false', 'nao', 'não')
+DEFAULT_VALUES = ('1', 'true', 'sim')
+
+
+class _NoSpan:
+    """Span desligado: aceita os mesmos atributos e não guarda nada"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KB on Linux and in bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class Span:
+    """Uma etapa medida; rows_in/rows_out e bytes_* podem ser preenchidos dentro do with"""
+
+    def __init__(self, tracer, name, attrs):
+        self.tracer, self.name, self.attrs = tracer, name, attrs
+        self.rows_in = self.rows_out = self.bytes_read = self.bytes_written = None
+        path = attrs.get('path')
+        if path and os.path.isfile(path):
+            self.bytes_read = os.path.getsize(path)
+
+    def __enter__(self):
+        stack = self.tracer.stack()
+        self.parent = stack[-1].id if stack else None
+        self.id = self.tracer.next_id()
+        stack.append(self)
+        self.start_ts = time.time()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        self.tracer.stack().pop()
+        output = self.attrs.get('output')
+        if output and self.bytes_written is None and os.path.isfile(output):
+            self.bytes_written = os.path.getsize(output)
+        record = {
+            'id': self.id, 'pai': self.parent, 'nome': self.name,
+            'inicio': self.start_ts, 'parede_s': round(wall, 6), 'cpu_s': round(cpu, 6),
+            'linhas_entrada': self.rows_in, 'linhas_saida': self.rows_out,
+            'bytes_lidos': self.bytes_read, 'bytes_gravados': self.bytes_written,
+            'pico_rss_mb': round(_peak_rss_mb(), 1),
+            'pid': os.getpid(), 'thread': threading.get_ident(),
+            'atributos': {key: str(value) for key, value in self.attrs.items()},
+        }
+        if exc_type is not None:
+            record['erro'] = f"{exc_type.__name__}: {exc}"
+        self.tracer.record(record)
+        return False
+
+
+class Tracer:
+    def __init__(self, trace_dir):
+        self.trace_dir = trace_dir
+        self.records = []
+        self._ids = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.run_id = os.environ.setdefault(RUN_VAR, datetime.now().strftime('%Y%m%d_%H%M%S'))
+
+    def reset(self):
+        """Processo filho criado por fork: começa sem os spans (abertos ou pendentes) do pai"""
+        self.records, self._ids = [], 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def next_id(self):
+        with self._lock:
+            self._ids += 1
+            return self._ids
+
+    def record(self, record):
+        with self._lock:
+            self.records.append(record)
+
+    def flush(self, chrome=True):
+        """Acrescentar os spans novos ao trace JSONL deste processo e (com
+        chrome=True) regravar o trace do Chrome da execução inteira"""
+        with self._lock:
+            records, self.records = self.records, []
+        if not records and not chrome:
+            return None
+        os.makedirs(self.trace_dir, exist_ok=True)
+        jsonl_path = os.path.join(self.trace_dir, f'trace_{self.run_id}_{os.getpid()}.jsonl')
+        with open(jsonl_path, 'a', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        if chrome:
+            write_chrome_trace(run_trace(self.trace_dir, self.run_id),
+                               os.path.join(self.trace_dir, f'trace_{self.run_id}.json'))
+        return jsonl_path
+
+
+_tracer = None
+
+
+def enable(trace_dir=None):
+    """Ligar a instrumentação neste processo (e nos processos filhos, pela variável de ambiente)"""
+    global _tracer
+    trace_dir = trace_dir or TRACE_DIR
+    os.environ[ENV_VAR] = trace_dir
+    if _tracer is None:
+        _tracer = Tracer(trace_dir)
+        atexit.register(flush)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_tracer.reset)
+    return _tracer
+
+
+def enabled():
+    return _tracer is not None
+
+
+def span(name, **attrs):
+    """Contexto que mede a etapa `name`; `path`/`output` nos atributos contam os bytes lidos/gravados"""
+    if _tracer is None:
+        return _NO_SPAN
+    return Span(_tracer, name, attrs)
+
+
+def traced(name=None):
+    """Decorador: a função inteira vira um span (com o nome dela, se não informado)"""
+    def decorate(func):
+        label = name or f"{func.__module__}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _tracer is None:
+                return func(*args, **kwargs)
+            with Span(_tracer, label, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def flush(chrome=True):
+    """Gravar os spans pendentes. Workers de um pool (que não rodam o atexit)
+    chamam flush(chrome=False) ao fim de cada tarefa."""
+    return _tracer.flush(chrome) if _tracer is not None else None
+
+
+def _trace_files(trace_dir):
+    """{execução: [traces JSONL dos processos]}"""
+    runs = {}
+    for name in os.listdir(trace_dir) if os.path.isdir(trace_dir) else []:
+        if name.startswith('trace_') and name.endswith('.jsonl'):
+            run_id = name[len('trace_'):-len('.jsonl')].rsplit('_', 1)[0]
+            runs.setdefault(run_id, []).append(os.path.join(trace_dir, name))
+    return runs
+
+
+def run_trace(trace_dir, run_id):
+    """Spans de uma execução, de todos os processos, em ordem de início"""
+    records = []
+    for path in _trace_files(trace_dir).get(run_id, []):
+        with open(path, 'r', encoding='utf-8') as f:
+            records.extend(json.loads(line) for line in f if line.strip())
+    return sorted(records, key=lambda record: record['inicio'])
+
+
+def write_chrome_trace(records, path):
+    """Trace no formato do chrome://tracing / Perfetto (eventos completos, 'ph': 'X')"""
+    events = [{
+        'name': record['nome'], 'ph': 'X', 'cat': 'pipeline',
+        'ts': record['inicio'] * 1e6, 'dur': record['parede_s'] * 1e6,
+        'pid': record['pid'], 'tid': record['thread'],
+        'args': {key: record[key] for key in ('cpu_s', 'linhas_entrada', 'linhas_saida', 'bytes_lidos',
+                                              'bytes_gravados', 'pico_rss_mb') if record.get(key) is not None},
+    } for record in records]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+def configured_dir():
+    """Diretório dos traces indicado pela variável de ambiente (ou o padrão)"""
+    value = os.environ.get(ENV_VAR, '').strip()
+    return TRACE_DIR if value.lower() in OFF_VALUES + DEFAULT_VALUES else value
+
+
+def last_trace(trace_dir=None):
+    """Spans da última execução instrumentada; [] se não houver nenhuma"""
+    runs = _trace_files(trace_dir or configured_dir())
+    if not runs:
+        return []
+    latest = max(runs, key=lambda run_id: max(os.path.getmtime(path) for path in runs[run_id]))
+    return run_trace(trace_dir or configured_dir(), latest)
+
+
+# Processos iniciados com a variável de ambiente (workers, etapas do pipeline,
+# streamlit run) já começam instrumentados
+if os.environ.get(ENV_VAR, '').strip().lower() not in OFF_VALUES:
+    enable(configured_dir())
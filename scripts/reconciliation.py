@@ -0,0 +1,216 @@
+import os
+import re
+import argparse
+import numpy as np
+import pandas as pd
+
+from brl_currency import parse_brl_array
+from cleaned_store import load_cleaned
+from metrics_engine import DATASETS
+from transactions import obra_transactions
+from ledger import LEDGER_FILE
+
+EXTRATO_FILE = "Copyofcontadacasa-EXTRATO_cleaned.csv"
+OUTPUT_DIR = '/home/ubuntu/conciliacao'
+
+# Diferença máxima (dias) entre a data do extrato e a do lançamento
+JANELA_DIAS = 3
+# Movimento sem par com lançamento de mesmo valor até esta distância: data suspeita
+JANELA_SUSPEITA = 31
+# Origens anotadas como duvidosas na própria planilha
+DUVIDA_PATTERN = re.compile(r'\?|\bfake\b', re.IGNORECASE)
+WORD_PATTERN = re.compile(r'[a-z0-9]{3,}')
+
+
+def _words(text):
+    return frozenset(WORD_PATTERN.findall(str(text).lower())) if isinstance(text, str) else frozenset()
+
+
+def extrato_movements(df):
+    """Movimentos do EXTRATO (DATA, ORIGEM, VALOR, LOCAL) a partir da planilha limpa.
+
+    As colunas são localizadas pela célula 'DATA' (no cabeçalho ou numa das
+    primeiras linhas); ORIGEM, VALOR e LOCAL vêm logo à direita. Datas sem ano
+    ('01/04') herdam o ano da última data completa, virando o ano quando o mês
+    volta; linhas só com o ano ('2021') ficam sem data.
+    """
+    header = [str(col).strip().upper() for col in df.columns]
+    if 'DATA' in header:
+        col, body = header.index('DATA'), df
+    else:
+        for row in range(min(5, len(df))):
+            cells = [str(value).strip().upper() for value in df.iloc[row]]
+            if 'DATA' in cells:
+                col, body = cells.index('DATA'), df.iloc[row + 1:]
+                break
+        else:
+            raise ValueError("coluna DATA não encontrada no EXTRATO")
+
+    datas = body.iloc[:, col].astype(str).str.strip()
+    partes = datas.str.extract(r'^(\d{1,2})/(\d{1,2})(?:/(\d{4}))?$').astype(float)
+    dia, mes, ano = partes[0], partes[1], partes[2]
+    # Meses que voltam (dez -> jan) sem ano explícito viram o ano
+    virada = (mes < mes.ffill().shift()) & ano.isna()
+    ano = ano.ffill() + virada.astype(int).groupby(ano.notna().cumsum()).cumsum()
+    data = pd.to_datetime(pd.DataFrame({'year': ano, 'month': mes, 'day': dia}), errors='coerce')
+
+    valores = body.iloc[:, col + 2]
+    if not pd.api.types.is_numeric_dtype(valores):
+        valores = pd.Series(parse_brl_array(valores.astype(object).to_numpy())[0], index=body.index)
+    movements = pd.DataFrame({
+        'linha': np.arange(len(body)),
+        'data': data.to_numpy(),
+        'origem': body.iloc[:, col + 1].to_numpy(dtype=object),
+        'valor_assinado': valores.to_numpy(dtype=float),
+        'local': body.iloc[:, col + 3].to_numpy(dtype=object),
+    })
+    return movements[movements['valor_assinado'].notna()].reset_index(drop=True)
+
+
+def ledger_records(cleaned_dir):
+    """Lançamentos com que o extrato é conciliado: razão da conta da casa e arrecadações da obra"""
+    parts = []
+    if os.path.exists(os.path.join(cleaned_dir, LEDGER_FILE)):
+        ledger = load_cleaned(LEDGER_FILE, cleaned_dir)
+        ledger = ledger[ledger['tipo'] != 'saldo_anterior']
+        parts.append(pd.DataFrame({
+            'fonte': 'razao',
+            'referencia': ledger.index.to_numpy(),
+            'data': pd.to_datetime(ledger['data']).to_numpy(),
+            'origem': (ledger['descricao'].fillna('') + ' ' + ledger['historico'].fillna('')).to_numpy(dtype=object),
+            'valor_assinado': ledger['valor_assinado'].to_numpy(dtype=float),
+        }))
+    if os.path.exists(os.path.join(cleaned_dir, DATASETS['obra_arrecadacoes'])):
+        obra = obra_transactions(load_cleaned(DATASETS['obra_arrecadacoes'], cleaned_dir))
+        parts.append(pd.DataFrame({
+            'fonte': 'obra',
+            'referencia': obra.index.to_numpy(),
+            'data': obra['data'].to_numpy(),
+            'origem': obra['descricao'].to_numpy(dtype=object),
+            'valor_assinado': obra['valor'].to_numpy(dtype=float),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=['fonte', 'referencia', 'data', 'origem', 'valor_assinado'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def _keyed(frame):
+    """Ordenado por data, com a chave de junção: valor em centavos (com sinal)"""
+    frame = frame[frame['data'].notna()].sort_values('data', kind='stable')
+    return frame.assign(centavos=np.round(frame['valor_assinado'].to_numpy() * 100).astype(np.int64))
+
+
+def _nearest(left, right, tolerance):
+    """Para cada movimento, o lançamento de mesmo valor com a data mais próxima (merge ordenado)"""
+    if not len(left) or not len(right):
+        return left.assign(id_registro=pd.Series(np.nan, index=left.index))
+    matched = pd.merge_asof(left.reset_index(), right[['data', 'centavos', 'id_registro']],
+                            on='data', by='centavos', direction='nearest', tolerance=tolerance)
+    return matched.set_index('index')
+
+
+def _match(left, right, tolerance):
+    """Pareamento um-para-um por valor e data mais próxima dentro da janela.
+
+    Cada rodada é um merge_asof; quando dois movimentos disputam o mesmo
+    lançamento fica o de data mais próxima, e os demais tentam de novo na
+    rodada seguinte sem os lançamentos já usados.
+    """
+    pairs = []
+    while len(left) and len(right):
+        found = _nearest(left, right, tolerance).dropna(subset=['id_registro'])
+        if not len(found):
+            break
+        found = found.assign(
+            dias=(found['data'] - right.set_index('id_registro').loc[found['id_registro'], 'data'].to_numpy()).abs())
+        best = found.sort_values(['dias', 'data'], kind='stable').drop_duplicates('id_registro')
+        pairs.append(best[['id_registro']])
+        left = left.drop(index=best.index)
+        right = right[~right['id_registro'].isin(best['id_registro'])]
+    if not pairs:
+        return pd.Series(dtype=float)
+    return pd.concat(pairs)['id_registro']
+
+
+def reconcile(extrato, registros, janela_dias=JANELA_DIAS, janela_suspeita=JANELA_SUSPEITA):
+    """Conciliar o extrato com os lançamentos.
+
+    Junção por valor exato (em centavos, com sinal) e data mais próxima dentro
+    de `janela_dias`, com merges ordenados (merge_asof) em vez de laços
+    aninhados. A origem não decide o par, só o confirma (`origem_confere`:
+    palavras em comum). Retorna {'conciliados', 'nao_conciliados', 'suspeitos'}:
+
+    - conciliados: movimento do extrato pareado com um lançamento;
+    - suspeitos: origem anotada como duvidosa na planilha ('?', 'fake'), ou
+      movimento sem par mas com lançamento de mesmo valor a até
+      `janela_suspeita` dias (data provavelmente errada);
+    - nao_conciliados: movimentos do extrato sem lançamento correspondente e
+      lançamentos, no período coberto pelo extrato, sem movimento no extrato.
+    """
+    janela = pd.Timedelta(days=janela_dias)
+    registros = registros.assign(data=pd.to_datetime(registros['data']), id_registro=np.arange(len(registros)))
+    periodo = extrato['data'].dropna()
+    if len(periodo):
+        registros = registros[registros['data'].between(periodo.min() - janela, periodo.max() + janela)]
+    left, right = _keyed(extrato), _keyed(registros)
+
+    pares = _match(left, right, janela)
+    detalhes = registros.set_index('id_registro').add_suffix('_registro')
+
+    def with_registro(frame, ids):
+        info = detalhes.reindex(ids.to_numpy())
+        return pd.concat([frame.reset_index(drop=True), info.reset_index(drop=True)], axis=1)
+
+    conciliados = with_registro(extrato.loc[pares.index], pares)
+    conciliados['dias'] = (conciliados['data_registro'] - conciliados['data']).dt.days.abs()
+    conciliados['origem_confere'] = [bool(_words(a) & _words(b)) for a, b in
+                                     zip(conciliados['origem'], conciliados['origem_registro'])]
+
+    duvida = extrato['origem'].map(lambda text: isinstance(text, str) and bool(DUVIDA_PATTERN.search(text)))
+    sem_par = extrato[~extrato.index.isin(pares.index)]
+    restantes = right[~right['id_registro'].isin(pares)]
+    proximos = _nearest(_keyed(sem_par), restantes, pd.Timedelta(days=janela_suspeita))['id_registro']
+    proximos = proximos.dropna()
+
+    duvidosos = duvida.loc[pares.index].to_numpy()
+    suspeitos = pd.concat([
+        conciliados[duvidosos].assign(motivo='origem duvidosa'),
+        with_registro(sem_par.loc[proximos.index], proximos).assign(motivo='mesmo valor fora da janela de datas'),
+        sem_par[duvida.loc[sem_par.index] & ~sem_par.index.isin(proximos.index)].assign(motivo='origem duvidosa'),
+    ], ignore_index=True)
+    conciliados = conciliados[~duvidosos]
+
+    usados = set(pares) | set(proximos)
+    nao_conciliados = pd.concat([
+        sem_par[~sem_par.index.isin(proximos.index) & ~duvida.loc[sem_par.index]]
+        .assign(motivo='sem lançamento correspondente'),
+        registros[~registros['id_registro'].isin(usados)].drop(columns='id_registro')
+        .add_suffix('_registro').assign(motivo='lançamento sem movimento no extrato'),
+    ], ignore_index=True)
+
+    return {'conciliados': conciliados.reset_index(drop=True), 'nao_conciliados': nao_conciliados,
+            'suspeitos': suspeitos}
+
+
+def run_reconciliation(cleaned_dir='/home/ubuntu/cleaned_data', output_dir=OUTPUT_DIR, janela_dias=JANELA_DIAS):
+    """Conciliar o EXTRATO e gravar conciliacao_<situação>.csv em output_dir"""
+    print("=== CONCILIAÇÃO DO EXTRATO ===")
+    extrato = extrato_movements(load_cleaned(EXTRATO_FILE, cleaned_dir))
+    registros = ledger_records(cleaned_dir)
+    result = reconcile(extrato, registros, janela_dias)
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"{len(extrato)} movimentos no extrato, {len(registros)} lançamentos (razão e obra)")
+    for status, frame in result.items():
+        path = os.path.join(output_dir, f'conciliacao_{status}.csv')
+        frame.to_csv(path, index=False)
+        print(f"{status}: {len(frame)} registros -> {path}")
+    return result
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Conciliar o EXTRATO com o razão da conta da casa e a obra")
+    parser.add_argument('--cleaned', default='/home/ubuntu/cleaned_data')
+    parser.add_argument('--output', default=OUTPUT_DIR)
+    parser.add_argument('--janela', type=int, default=JANELA_DIAS, help="diferença máxima de datas, em dias")
+    args = parser.parse_args()
+    run_reconciliation(args.cleaned, args.output, args.janela)
@@ -0,0 +1,140 @@
+import os
+import json
+import pandas as pd
+
+from cleaned_store import load_cleaned, sheet_key
+from metrics_engine import DATASETS
+from ledger import LEDGER_FILE
+from transactions import razao_transactions, portaria_transactions, obra_transactions, bombom_transactions
+
+# Bump whenever the extraction rules change so every partial is rebuilt
+ROLLUP_VERSION = 4
+ROLLUP_DIR = 'rollup'
+CUBE_FILE = 'rollup_cube.csv'
+SALDO_FILE = 'rollup_saldo_mensal.csv'
+
+CUBE_DIMENSIONS = ['dia', 'mes', 'fonte', 'forma_pagamento', 'tipo']
+
+
+def rollup_sources():
+    """Planilha limpa -> função que extrai os lançamentos datados dela"""
+    return {
+        LEDGER_FILE: razao_transactions,
+        DATASETS['portaria']: portaria_transactions,
+        DATASETS['obra_arrecadacoes']: obra_transactions,
+        DATASETS['bombom']: bombom_transactions,
+    }
+
+
+def aggregate(transactions):
+    """Agregar lançamentos por dia, mês, fonte, forma de pagamento e tipo"""
+    frame = transactions.assign(
+        dia=transactions['data'].dt.strftime('%Y-%m-%d'),
+        mes=transactions['data'].dt.strftime('%Y-%m'),
+    )
+    cube = (frame.groupby(CUBE_DIMENSIONS, dropna=False)['valor']
+            .agg(valor='sum', lancamentos='count').reset_index())
+    return cube
+
+
+def monthly_saldo(cube, fonte='conta_casa'):
+    """Saldo mês a mês da conta: entradas, saídas e saldo acumulado.
+
+    O saldo acumulado parte de zero e, num dia com "Saldo Anterior" no
+    extrato, recomeça do valor informado pelo banco (antes dos lançamentos
+    do dia); o saldo do mês é o do seu último dia.
+    """
+    conta = cube[(cube['fonte'] == fonte) & cube['dia'].notna()]
+    daily = (conta.pivot_table(index='dia', columns='tipo', values='valor', aggfunc='sum')
+             .reindex(columns=['saldo_anterior', 'entrada', 'saida']))
+    flows = daily[['entrada', 'saida']].fillna(0.0)
+    ancora = daily['saldo_anterior']
+    trecho = ancora.notna().cumsum()
+    acumulado = (ancora.fillna(0.0) + flows['entrada'] - flows['saida']).groupby(trecho).cumsum()
+    mes = daily.index.str[:7]
+    saldo = pd.DataFrame({
+        'mes': mes.unique(),
+        'entradas': flows['entrada'].groupby(mes).sum().to_numpy(),
+        'saidas': flows['saida'].groupby(mes).sum().to_numpy(),
+    })
+    saldo['saldo_mes'] = saldo['entradas'] - saldo['saidas']
+    saldo['saldo_acumulado'] = acumulado.groupby(mes).last().to_numpy()
+    return saldo
+
+
+def _state_path(output_dir):
+    return os.path.join(output_dir, ROLLUP_DIR, 'rollup_state.json')
+
+
+def update_rollup(output_dir, changed_outputs=(), force=False):
+    """Atualizar o cubo de agregados depois da limpeza.
+
+    Só as planilhas de origem regravadas nesta limpeza (`changed_outputs`) ou
+    sem agregado parcial são lidas de novo; o cubo final junta os parciais
+    (um arquivo pequeno por planilha em rollup/).
+    """
+    partial_dir = os.path.join(output_dir, ROLLUP_DIR)
+    os.makedirs(partial_dir, exist_ok=True)
+    try:
+        with open(_state_path(output_dir), 'r', encoding='utf-8') as f:
+            force = force or json.load(f).get('version') != ROLLUP_VERSION
+    except (FileNotFoundError, ValueError):
+        force = True
+
+    partials, rebuilt = [], []
+    for filename, extract in rollup_sources().items():
+        partial_path = os.path.join(partial_dir, f"{sheet_key(filename)}.csv")
+        if not os.path.exists(os.path.join(output_dir, filename)):
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            continue
+        if force or filename in changed_outputs or not os.path.exists(partial_path):
+            aggregate(extract(load_cleaned(filename, output_dir))).to_csv(partial_path, index=False)
+            rebuilt.append(filename)
+        partials.append(pd.read_csv(partial_path, dtype={'dia': str, 'mes': str}))
+
+    columns = CUBE_DIMENSIONS + ['valor', 'lancamentos']
+    cube = pd.concat(partials, ignore_index=True) if partials else pd.DataFrame(columns=columns)
+    cube = cube.sort_values(['fonte', 'dia', 'forma_pagamento', 'tipo'], na_position='last')
+    cube.to_csv(os.path.join(output_dir, CUBE_FILE), index=False)
+    monthly_saldo(cube).to_csv(os.path.join(output_dir, SALDO_FILE), index=False)
+    with open(_state_path(output_dir), 'w', encoding='utf-8') as f:
+        json.dump({'version': ROLLUP_VERSION}, f)
+    return rebuilt
+
+
+_cache = {}
+
+
+def _load(path):
+    # Uma leitura por versão do arquivo; os gráficos só fazem consultas no resultado
+    mtime = os.path.getmtime(path)
+    cached = _cache.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, pd.read_csv(path, dtype={'dia': str, 'mes': str}))
+        _cache[path] = cached
+    return cached[1]
+
+
+def load_cube(cleaned_dir):
+    return _load(os.path.join(cleaned_dir, CUBE_FILE))
+
+
+def load_saldo(cleaned_dir):
+    return _load(os.path.join(cleaned_dir, SALDO_FILE))
+
+
+def monthly_series(cleaned_dir, fonte=None, tipo='entrada'):
+    """Total por mês ('AAAA-MM' -> valor) a partir do cubo"""
+    cube = load_cube(cleaned_dir)
+    mask = cube['mes'].notna() & (cube['tipo'] == tipo)
+    if fonte is not None:
+        mask &= cube['fonte'] == fonte
+    return cube[mask].groupby('mes')['valor'].sum()
+
+
+def month_label(mes):
+    """'2025-03' -> 'Mar/25'"""
+    nomes = ['Jan', 'Fev', 'Mar', 'Abr', 'Mai', 'Jun', 'Jul', 'Ago', 'Set', 'Out', 'Nov', 'Dez']
+    ano, numero = mes.split('-')
+    return f"{nomes[int(numero) - 1]}/{ano[2:]}"
@@ -0,0 +1,260 @@
+import os
+import io
+import sys
+import glob
+import json
+import time
+import ast
+import argparse
+import importlib
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import profiling
+from profiling import span
+
+# The workers only save figures to disk
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = '/home/ubuntu'
+STATE_FILE = os.path.join(BASE_DIR, 'pipeline_state.json')
+CLEANED_DIR = os.path.join(BASE_DIR, 'cleaned_data')
+
+UPLOAD = os.path.join(BASE_DIR, 'upload', '*.csv')
+CLEANED = os.path.join(CLEANED_DIR, '*_cleaned.csv')
+SUMMARY = os.path.join(BASE_DIR, 'financial_summary.json')
+ROLLUP = [os.path.join(CLEANED_DIR, 'rollup_cube.csv'),
+          os.path.join(CLEANED_DIR, 'rollup_saldo_mensal.csv')]
+CONCILIACAO = [os.path.join(BASE_DIR, 'conciliacao', f'conciliacao_{status}.csv')
+               for status in ('conciliados', 'nao_conciliados', 'suspeitos')]
+
+
+def script(name):
+    return os.path.join(SCRIPTS_DIR, name)
+
+
+def script_deps(module, seen=None):
+    """O script do módulo e todos os scripts de scripts/ que ele importa,
+    direta ou indiretamente: editar qualquer um deles invalida a etapa"""
+    seen = set() if seen is None else seen
+    if module in seen or not os.path.exists(script(f'{module}.py')):
+        return []
+    seen.add(module)
+    with open(script(f'{module}.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                script_deps(alias.name, seen)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            script_deps(node.module, seen)
+    return [script(f'{name}.py') for name in sorted(seen)]
+
+
+# Etapas do pipeline: função a executar (módulo, função, argumentos), etapas das
+# quais depende, arquivos lidos (padrões glob, incluindo o próprio script) e
+# arquivos gerados; o script de cada etapa entra com todos os módulos que ele
+# importa (script_deps). Uma etapa é pulada quando as entradas não mudaram desde a
+# última execução bem-sucedida e as saídas ainda existem.
+STEPS = {
+    'limpeza': {
+        'call': ('data_cleaning_simple', 'clean_and_save_individual_sheets', ()),
+        'after': [],
+        'inputs': [UPLOAD, *script_deps('data_cleaning_simple')],
+        'outputs': [os.path.join(CLEANED_DIR, 'data_summary.csv'),
+                    os.path.join(CLEANED_DIR, 'financeiro.sqlite')] + ROLLUP,
+    },
+    'analise': {
+        'call': ('analyze_data', 'analyze_financial_data', ()),
+        'after': ['limpeza'],
+        'inputs': [CLEANED, *script_deps('analyze_data')],
+        'outputs': [SUMMARY, os.path.join(BASE_DIR, 'financial_summary.txt')],
+    },
+    'dashboard_png': {
+        'call': ('analyze_data', 'create_financial_dashboard', ()),
+        'after': ['analise'],
+        'inputs': [SUMMARY, *ROLLUP, *script_deps('analyze_data')],
+        'outputs': [os.path.join(BASE_DIR, 'financial_dashboard.png')],
+    },
+    'excel': {
+        'call': ('create_excel_dashboards', 'create_excel_dashboards', ()),
+        'after': ['analise'],
+        'inputs': [SUMMARY, CLEANED, *script_deps('create_excel_dashboards')],
+        'outputs': [os.path.join(BASE_DIR, 'financial_dashboard.xlsx')],
+    },
+    'dashboard_html': {
+        'call': ('create_advanced_dashboard', 'create_advanced_dashboard', (False,)),
+        'after': ['analise'],
+        'inputs': [SUMMARY, CLEANED, *ROLLUP, *script_deps('create_advanced_dashboard')],
+        'outputs': [os.path.join(BASE_DIR, 'dashboard_interativo.html')],
+    },
+    'tendencias_png': {
+        'call': ('create_advanced_dashboard', 'create_trend_analysis', (CLEANED_DIR, BASE_DIR)),
+        'after': ['limpeza'],
+        'inputs': [CLEANED, *ROLLUP, *script_deps('create_advanced_dashboard')],
+        'outputs': [os.path.join(BASE_DIR, 'trend_analysis.png')],
+    },
+    'conciliacao': {
+        'call': ('reconciliation', 'run_reconciliation', ()),
+        'after': ['limpeza'],
+        'inputs': [CLEANED, *script_deps('reconciliation')],
+        'outputs': CONCILIACAO,
+    },
+    'obra': {
+        'call': ('pledges', 'run_obra_schedule', ()),
+        'after': ['limpeza'],
+        'inputs': [CLEANED, *script_deps('pledges')],
+        'outputs': [os.path.join(BASE_DIR, 'obra', 'obra_parcelas.csv'),
+                    os.path.join(BASE_DIR, 'obra', 'obra_previsao.csv')],
+    },
+    'orcamento': {
+        'call': ('budget', 'run_budget', ()),
+        'after': ['limpeza'],
+        'inputs': [CLEANED, *script_deps('budget')],
+        'outputs': [os.path.join(BASE_DIR, 'orcamento', f'orcamento_{visao}.csv')
+                    for visao in ('linhas', 'projetos', 'mensal')],
+    },
+    'insights': {
+        'call': ('create_advanced_dashboard', 'create_insights_report', (BASE_DIR,)),
+        'after': ['analise'],
+        'inputs': [SUMMARY, *script_deps('create_advanced_dashboard')],
+        'outputs': [os.path.join(BASE_DIR, 'insights_report.txt')],
+    },
+}
+
+
+def inputs_fingerprint(patterns):
+    """(arquivo, tamanho, mtime) de tudo que casa com os padrões de entrada"""
+    files = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            stat = os.stat(path)
+            files.append([path, stat.st_size, stat.st_mtime])
+    return files
+
+
+def load_state(path=STATE_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(state, path=STATE_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def run_step(call):
+    """Executar uma etapa (no processo principal ou num worker).
+
+    A saída é capturada e devolvida para que o log de cada etapa apareça
+    inteiro, mesmo com etapas rodando em paralelo.
+    """
+    module_name, func_name, args = call
+    output = io.StringIO()
+    start = time.perf_counter()
+    ok = True
+    with contextlib.redirect_stdout(output):
+        try:
+            with span(f'etapa.{module_name}.{func_name}'):
+                getattr(importlib.import_module(module_name), func_name)(*args)
+        except Exception:
+            ok = False
+            traceback.print_exc(file=output)
+    # Os workers do pool não rodam o atexit: os spans da etapa são gravados aqui
+    profiling.flush(chrome=False)
+    return ok, time.perf_counter() - start, output.getvalue()
+
+
+def topological_order(steps):
+    order, done = [], set()
+    while len(order) < len(steps):
+        ready = [name for name, step in steps.items()
+                 if name not in done and all(dep in done for dep in step['after'])]
+        if not ready:
+            raise ValueError("Dependência circular entre as etapas do pipeline")
+        order.extend(ready)
+        done.update(ready)
+    return order
+
+
+def run_pipeline(steps=STEPS, workers=4, force=False, state_path=STATE_FILE):
+    """Executar as etapas em ordem de dependência, em paralelo quando possível"""
+    if SCRIPTS_DIR not in sys.path:
+        sys.path.insert(0, SCRIPTS_DIR)
+    order = topological_order(steps)
+    state = {} if force else load_state(state_path)
+    status = {}
+    running = {}
+    timings = {}
+    pipeline_start = time.perf_counter()
+
+    def finish(name, ok, elapsed, output, fingerprint):
+        if output:
+            print(output, end='' if output.endswith('\n') else '\n')
+        status[name] = 'ok' if ok else 'falhou'
+        timings[name] = elapsed
+        print(f"[{name}] {'concluída' if ok else 'FALHOU'} em {elapsed:.2f} s")
+        if ok:
+            state[name] = fingerprint
+        else:
+            state.pop(name, None)
+        save_state(state, state_path)
+
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        while len(status) < len(order):
+            for name in order:
+                step = steps[name]
+                if name in status or name in running:
+                    continue
+                deps = [status.get(dep) for dep in step['after']]
+                if any(dep is None for dep in deps):
+                    continue
+                if any(dep in ('falhou', 'cancelada') for dep in deps):
+                    status[name] = 'cancelada'
+                    print(f"[{name}] cancelada (dependência falhou)")
+                    continue
+                fingerprint = inputs_fingerprint(step['inputs'])
+                outputs_exist = all(os.path.exists(path) for path in step['outputs'])
+                if state.get(name) == fingerprint and outputs_exist:
+                    status[name] = 'sem alterações'
+                    timings[name] = 0.0
+                    print(f"[{name}] entradas sem alterações, pulando")
+                    continue
+                print(f"[{name}] iniciando")
+                running[name] = (executor.submit(run_step, step['call']), fingerprint)
+
+            if not running:
+                continue
+            done, _ = wait([future for future, _ in running.values()], return_when=FIRST_COMPLETED)
+            for name in [n for n, (future, _) in running.items() if future in done]:
+                future, fingerprint = running.pop(name)
+                finish(name, *future.result(), fingerprint)
+
+    print("\n=== TEMPO POR ETAPA ===")
+    for name in order:
+        elapsed = f"{timings[name]:.2f} s" if name in timings else '-'
+        print(f"{name:<16} {status[name]:<16} {elapsed:>10}")
+    print(f"{'total (parede)':<16} {'':<16} {time.perf_counter() - pipeline_start:>8.2f} s")
+    return status
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Executar o pipeline completo (limpeza, análise e dashboards)")
+    parser.add_argument('--workers', type=int, default=4, help="etapas independentes executadas ao mesmo tempo")
+    parser.add_argument('--force', action='store_true', help="executar todas as etapas, mesmo sem alterações")
+    parser.add_argument('--profile', nargs='?', const=profiling.TRACE_DIR, metavar='DIR',
+                        help=f"gravar o trace das etapas (JSONL e Chrome) em DIR (padrão: {profiling.TRACE_DIR})")
+    args = parser.parse_args()
+    if args.profile:
+        # Antes do pool: os workers herdam a variável de ambiente e o id da execução
+        profiling.enable(args.profile)
+    with span('pipeline', workers=args.workers):
+        status = run_pipeline(workers=args.workers, force=args.force)
+    sys.exit(0 if all(s in ('ok', 'sem alterações') for s in status.values()) else 1)
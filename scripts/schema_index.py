@@ -0,0 +1,99 @@
+import os
+import json
+import unicodedata
+
+INDEX_FILE = 'schema_index.json'
+
+# Papel semântico -> palavras-chave (já sem acento e em minúsculas) procuradas
+# nos nomes das colunas; com '=' na frente, o nome precisa ser igual
+ROLES = {
+    'valor': ('valor',),
+    'forma_pagamento': ('forma de pagamento',),
+    'metodo_pagamento': ('metodo de pagamento',),
+    'entrada': ('entrada',),
+    'saida': ('saida',),
+    'divida': ('r$', 'valor', 'divida'),
+    'valor_obtido': ('valor obtido',),
+    'valor_sugerido': ('valor sugerido',),
+    'lucro_liquido': ('lucro liquido',),
+    'valor_total': ('valor total',),
+    'sem_nome': ('unnamed',),
+    'mes_inicial': ('mes inicial',),
+    'dia': ('=dia',),
+}
+
+
+def _matches(name, keywords):
+    return any(name == k[1:] if k.startswith('=') else k in name for k in keywords)
+
+
+def fold(text):
+    """Nome normalizado: sem acentos, minúsculo e sem espaços nas pontas"""
+    decomposed = unicodedata.normalize('NFKD', str(text))
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower().strip()
+
+
+def build_schema(columns):
+    """Índice de uma planilha: colunas (na ordem) e, por papel, as que casam"""
+    columns = [str(col) for col in columns]
+    folded = [fold(col) for col in columns]
+    roles = {}
+    for role, keywords in ROLES.items():
+        matches = [col for col, name in zip(columns, folded) if _matches(name, keywords)]
+        if matches:
+            roles[role] = matches
+    return {'columns': columns, 'roles': roles, 'role_set': sorted(ROLES)}
+
+
+def save_index(output_dir, schemas):
+    """Gravar o índice de todas as planilhas ({chave da planilha: esquema})"""
+    index_path = os.path.join(output_dir, INDEX_FILE)
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(schemas, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_path, index_path)
+
+
+_cache = {}
+
+
+def load_index(cleaned_dir):
+    """Ler o índice persistido, uma vez por versão do arquivo"""
+    index_path = os.path.join(cleaned_dir, INDEX_FILE)
+    try:
+        mtime = os.path.getmtime(index_path)
+    except OSError:
+        return {}
+    cached = _cache.get(index_path)
+    if cached is None or cached[0] != mtime:
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                cached = (mtime, json.load(f))
+        except ValueError:
+            cached = (mtime, {})
+        _cache[index_path] = cached
+    return cached[1]
+
+
+def attach_schema(df, schema=None):
+    """Guardar o índice em df.attrs, reconstruindo se não bater com as colunas
+    (ou se foi gravado com outro conjunto de papéis)"""
+    columns = [str(col) for col in df.columns]
+    if schema is None or schema['columns'] != columns or schema.get('role_set') != sorted(ROLES):
+        schema = build_schema(columns)
+    df.attrs['roles'] = schema['roles']
+    return df
+
+
+def columns_for(df, role):
+    """Todas as colunas com o papel pedido (lista vazia se nenhuma)"""
+    if 'roles' not in df.attrs:
+        attach_schema(df)
+    # attrs acompanham seleções de colunas; ignorar as que não existem mais
+    return [col for col in df.attrs['roles'].get(role, []) if col in df.columns]
+
+
+def column_for(df, role):
+    """Primeira coluna com o papel pedido, ou None"""
+    matches = columns_for(df, role)
+    return matches[0] if matches else None
@@ -0,0 +1,113 @@
+import os
+import json
+from datetime import datetime
+
+from metrics_engine import DATASETS, PERCENT_METRICS
+
+# Bump whenever the layout of the summary file changes
+SUMMARY_VERSION = 1
+SUMMARY_FILE = '/home/ubuntu/financial_summary.json'
+
+
+def _input_fingerprint(cleaned_dir):
+    """mtime/tamanho de cada planilha limpa que entra nos indicadores"""
+    inputs = {}
+    for key, filename in DATASETS.items():
+        path = os.path.join(cleaned_dir, filename)
+        try:
+            stat = os.stat(path)
+            inputs[key] = {'file': filename, 'mtime': stat.st_mtime, 'size': stat.st_size}
+        except OSError:
+            inputs[key] = {'file': filename, 'mtime': None, 'size': None}
+    return inputs
+
+
+def _unit(key):
+    if key in PERCENT_METRICS:
+        return '%'
+    if key.endswith('_count'):
+        return 'count'
+    return 'BRL'
+
+
+def write_summary(metrics, cleaned_dir, path=SUMMARY_FILE):
+    """Gravar o resumo tipado (JSON) com a proveniência de cada indicador"""
+    provenance = metrics.get('provenance', {})
+    document = {
+        'version': SUMMARY_VERSION,
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'cleaned_dir': os.path.abspath(cleaned_dir),
+        'inputs': _input_fingerprint(cleaned_dir),
+        'errors': {key: str(error) for key, error in metrics.get('errors', {}).items()},
+        'metrics': {
+            key: {'value': value, 'unit': _unit(key), 'provenance': provenance.get(key, {})}
+            for key, value in metrics.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        },
+    }
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+    print(f"Resumo tipado salvo em: {path}")
+    return path
+
+
+_cache = {}
+
+
+def load_summary(path=SUMMARY_FILE):
+    """Ler o resumo gravado pela análise, uma vez por processo e versão do arquivo.
+
+    Retorna None se o arquivo não existe ou é de outra versão do formato.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    cached = _cache.get(path)
+    if cached is None or cached[0] != mtime:
+        with open(path, 'r', encoding='utf-8') as f:
+            document = json.load(f)
+        if document.get('version') != SUMMARY_VERSION:
+            document = None
+        cached = (mtime, document)
+        _cache[path] = cached
+    return cached[1]
+
+
+def summary_values(document):
+    """Só os valores: {indicador: valor}"""
+    if document is None:
+        return {}
+    return {key: metric['value'] for key, metric in document['metrics'].items()}
+
+
+def stale_inputs(document):
+    """Planilhas limpas alteradas desde que o resumo foi gerado.
+
+    Compara apenas mtime/tamanho gravados no resumo com os arquivos atuais,
+    sem refazer a análise. Lista vazia significa resumo em dia.
+    """
+    if document is None:
+        return list(DATASETS)
+    current = _input_fingerprint(document['cleaned_dir'])
+    recorded = document.get('inputs', {})
+    return [
+        key for key, fingerprint in current.items()
+        if recorded.get(key, {}).get('mtime') != fingerprint['mtime']
+        or recorded.get(key, {}).get('size') != fingerprint['size']
+    ]
+
+
+def load_summary_values(path=SUMMARY_FILE):
+    """Valores do resumo para os geradores de dashboards, avisando se estiver desatualizado"""
+    document = load_summary(path)
+    if document is None:
+        print(f"Arquivo {os.path.basename(path)} não encontrado. Execute analyze_data.py primeiro.")
+        return {}
+    changed = stale_inputs(document)
+    if changed:
+        print(f"Aviso: resumo financeiro desatualizado (planilhas alteradas: {', '.join(changed)}). "
+              "Execute analyze_data.py novamente.")
+    return summary_values(document)
@@ -0,0 +1,174 @@
+import os
+import re
+import csv
+import argparse
+import numpy as np
+
+from schema_index import fold
+from bombom_weekly import SEMANA_PATTERN, bombom_sheet
+
+# Gerador de exportações sintéticas no formato exato das planilhas reais, para
+# benchmarks com volume maior. Cada planilha de modelo é copiada célula a
+# célula; os trechos de linhas de dados (vendas, lançamentos, pagamentos, itens)
+# são repetidos `scale` vezes com valores e dias sorteados, e os cabeçalhos de
+# várias linhas, blocos de venda, linhas de total e colunas vazias de
+# enchimento ficam como no modelo. Nas planilhas mensais de bombom são os
+# blocos SEMANA inteiros que se repetem, com as semanas renumeradas.
+TEMPLATE_DIR = '/home/ubuntu/upload'
+OUTPUT_DIR = '/home/ubuntu/synthetic'
+SCALES = (10, 100, 1000)
+
+# Valores como aparecem nas planilhas: 'R$ 1.234,56', '-R$ 0,72', '35,00 C', '2'
+AMOUNT = re.compile(r'^(-?)(R\$\s*)?(-?)(\d{1,3}(?:\.\d{3})+|\d+)(?:,(\d+))?(\s*[CD])?$')
+DATE = re.compile(r'^(\d{1,2})/(\d{1,2})(/\d{4})?$')
+# Linhas de estrutura (títulos, cabeçalhos, totais, saldos): nunca repetidas
+STRUCTURE = ('semana', 'data', 'trio', 'item', 'lista de compra', 'total', 'subtotal', 'valor obtido',
+             'lucro', 'fechamento', 'venda', 'ingredientes', 'saldo anterior', 'entrada', 'saida')
+# Cópias distintas de cada trecho; as demais repetem uma delas ao acaso
+VARIANTS = 8
+
+
+def template_name(filename):
+    """Nome da planilha com acentos corrigidos ('Mar├ºo' -> 'Março', como em data/raw)"""
+    try:
+        return filename.encode('cp850').decode('utf-8')
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return filename
+
+
+def _is_structure(row):
+    return any(fold(cell).startswith(STRUCTURE) for cell in row if cell)
+
+
+def _is_data(row):
+    return any(AMOUNT.match(cell.strip()) or DATE.match(cell.strip()) for cell in row if cell) \
+        and not _is_structure(row)
+
+
+def _format_amount(match, value):
+    sign, currency, inner_sign, number, decimals, suffix = match.groups()
+    if decimals is None:
+        text = str(int(round(value)))
+    else:
+        text = f"{value:,.{len(decimals)}f}"
+        thousands = '.' if '.' in number or currency else ''
+        text = text.replace(',', '\0').replace('.', ',').replace('\0', thousands)
+    return f"{sign}{currency or ''}{inner_sign}{text}{suffix or ''}"
+
+
+def _jitter(cell, rng, messy):
+    text = cell.strip()
+    match = AMOUNT.match(text)
+    if match:
+        number = float(match.group(4).replace('.', '') + '.' + (match.group(5) or '0'))
+        value = number * rng.uniform(0.5, 1.5) if number else float(rng.integers(0, 3))
+        out = _format_amount(match, value)
+        # Sujeira comum das exportações: espaços sobrando em volta do valor
+        return f" {out} " if rng.random() < messy else out
+    match = DATE.match(text)
+    if match:
+        return f"{int(rng.integers(1, 29)):02d}/{match.group(2)}{match.group(3) or ''}"
+    return cell
+
+
+def _variant(rows, rng, messy):
+    return [[_jitter(cell, rng, messy) for cell in row] for row in rows]
+
+
+def _is_header(row):
+    cells = [cell.strip() for cell in row if cell.strip()]
+    return len(cells) >= 2 and not any(AMOUNT.match(cell) or DATE.match(cell) for cell in cells)
+
+
+def scale_sheet(rows, scale, rng, messy=0.02):
+    """Linhas da planilha com cada trecho de linhas de dados repetido `scale` vezes.
+
+    Um trecho logo acima de uma linha de cabeçalho (ex.: a grade de preços
+    'R$ 10,00' | 'R$ 7,00' acima de "Combo | Dogão") é parte do cabeçalho e
+    não é repetido.
+    """
+    out, run = [], []
+
+    def flush(next_row):
+        if run and not (next_row is not None and _is_header(next_row)):
+            variants = [run] + [_variant(run, rng, messy) for _ in range(min(scale, VARIANTS) - 1)]
+            for k in rng.integers(0, len(variants), size=scale - 1):
+                out.extend(variants[k])
+        out.extend(run)
+        run.clear()
+
+    for row in rows:
+        if _is_data(row):
+            run.append(row)
+        else:
+            flush(row)
+            out.append(row)
+    flush(None)
+    return out
+
+
+def _first_cell(row):
+    return next((cell.strip() for cell in row if cell.strip()), '')
+
+
+def scale_weekly_sheet(rows, scale, rng, messy=0.02):
+    """Planilha mensal de bombom com os blocos SEMANA repetidos `scale` vezes.
+
+    Cada bloco vai da linha "SEMANA n" até a próxima semana (ou o FECHAMENTO
+    MENSAL, que fica uma vez no fim); as cópias têm valores sorteados e são
+    numeradas em sequência (SEMANA 1..n*scale), como semanas distintas para o
+    parser de blocos.
+    """
+    starts = [i for i, row in enumerate(rows) if SEMANA_PATTERN.match(_first_cell(row))]
+    if not starts:
+        return scale_sheet(rows, scale, rng, messy)
+    end = next((i for i, row in enumerate(rows)
+                if i > starts[0] and _first_cell(row).upper().startswith('FECHAMENTO MENSAL')), len(rows))
+    blocks = [rows[a:b] for a, b in zip(starts, starts[1:] + [end])]
+    variants = [[block] + [_variant(block, rng, messy) for _ in range(min(scale, VARIANTS) - 1)]
+                for block in blocks]
+    out, semana = rows[:starts[0]], 0
+    for copy in range(scale):
+        for options in variants:
+            block = options[0] if copy == 0 else options[rng.integers(0, len(options))]
+            semana += 1
+            title = list(block[0])
+            position = next(j for j, cell in enumerate(title) if cell.strip())
+            title[position] = SEMANA_PATTERN.sub(f'SEMANA {semana}', title[position].strip())
+            out.append(title)
+            out.extend(block[1:])
+    return out + rows[end:]
+
+
+def generate(scale, template_dir=TEMPLATE_DIR, output_dir=OUTPUT_DIR, seed=42):
+    """Gravar uma cópia de cada planilha de modelo com `scale` vezes mais linhas de dados.
+
+    Retorna {planilha: linhas} das planilhas geradas em output_dir.
+    """
+    rng = np.random.default_rng(seed)
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+    for filename in sorted(os.listdir(template_dir)):
+        if not filename.endswith('.csv'):
+            continue
+        with open(os.path.join(template_dir, filename), newline='', encoding='utf-8') as f:
+            rows = list(csv.reader(f))
+        name = template_name(filename)
+        if scale > 1:
+            rows = scale_weekly_sheet(rows, scale, rng) if bombom_sheet(name) else scale_sheet(rows, scale, rng)
+        with open(os.path.join(output_dir, name), 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows(rows)
+        written[name] = len(rows)
+    return written
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Gerar planilhas sintéticas (10x, 100x, 1000x) a partir das reais")
+    parser.add_argument('--templates', default=TEMPLATE_DIR, help="planilhas de modelo (CSV exportado)")
+    parser.add_argument('--output', default=OUTPUT_DIR, help="um subdiretório por escala (x10, x100...)")
+    parser.add_argument('--scale', type=int, action='append', help=f"escala (padrão: {', '.join(map(str, SCALES))})")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    for scale in args.scale or SCALES:
+        written = generate(scale, args.templates, os.path.join(args.output, f'x{scale}'), args.seed)
+        print(f"x{scale}: {len(written)} planilhas, {sum(written.values()):,} linhas")
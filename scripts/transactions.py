@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+
+from schema_index import column_for
+from payment_methods import canonical_methods
+
+# Colunas da tabela de lançamentos, comum a todas as fontes
+TRANSACTION_COLUMNS = ['data', 'fonte', 'forma_pagamento', 'tipo', 'valor', 'descricao']
+
+MESES = {
+    'janeiro': 1, 'fevereiro': 2, 'marco': 3, 'março': 3, 'abril': 4, 'maio': 5, 'junho': 6,
+    'julho': 7, 'agosto': 8, 'setembro': 9, 'outubro': 10, 'novembro': 11, 'dezembro': 12,
+}
+
+# As planilhas da obra são de 2025 e não trazem o ano nas datas
+ANO_PLANILHAS = 2025
+
+
+def _transactions(n=0, **columns):
+    frame = pd.DataFrame({col: columns.get(col, [None] * n) for col in TRANSACTION_COLUMNS})
+    frame['data'] = pd.to_datetime(frame['data'])
+    frame['forma_pagamento'] = canonical_methods(frame['forma_pagamento'])
+    frame['valor'] = frame['valor'].astype(float)
+    return frame
+
+
+def _text(series):
+    return series.astype(object).where(series.notna(), None)
+
+
+def razao_transactions(ledger, fonte='conta_casa'):
+    """Lançamentos do razão da conta da casa (todas as planilhas Entrada_saída).
+
+    O razão já vem sem as duplicatas entre exportações; as linhas "Saldo
+    Anterior" ficam com o tipo 'saldo_anterior'.
+    """
+    n = len(ledger)
+    return _transactions(n, data=pd.to_datetime(ledger['data']).to_numpy(), fonte=[fonte] * n,
+                         forma_pagamento=list(_text(ledger['forma_pagamento'])), tipo=list(ledger['tipo']),
+                         valor=ledger['valor'].to_numpy(dtype=float),
+                         descricao=list(_text(ledger['historico'])))
+
+
+def portaria_transactions(df, fonte='portaria'):
+    """Vendas da portaria (sem data na planilha)"""
+    valor_col = column_for(df, 'valor')
+    if valor_col is None:
+        return _transactions()
+    valores = pd.to_numeric(df[valor_col], errors='coerce')
+    mask = valores.notna()
+    forma_col = column_for(df, 'forma_pagamento')
+    formas = _text(df.loc[mask, forma_col]) if forma_col else [None] * int(mask.sum())
+    n = int(mask.sum())
+    return _transactions(n, data=[pd.NaT] * n, fonte=[fonte] * n, forma_pagamento=list(formas),
+                         tipo=['entrada'] * n, valor=valores[mask].to_numpy())
+
+
+def obra_transactions(df, fonte='obra', ano=ANO_PLANILHAS):
+    """Contribuições da obra, datadas pelo mês inicial e dia (quando informados)"""
+    valor_col = column_for(df, 'valor')
+    if valor_col is None:
+        return _transactions()
+    valores = pd.to_numeric(df[valor_col], errors='coerce')
+    mask = valores.notna()
+    n = int(mask.sum())
+    mes_col, dia_col = column_for(df, 'mes_inicial'), column_for(df, 'dia')
+    metodo_col = column_for(df, 'metodo_pagamento')
+    meses = (df.loc[mask, mes_col].astype(str).str.strip().str.lower().map(MESES)
+             if mes_col else pd.Series(np.nan, index=valores[mask].index))
+    dias = pd.to_numeric(df.loc[mask, dia_col], errors='coerce').fillna(1) if dia_col else 1
+    datas = pd.to_datetime(pd.DataFrame({'year': ano, 'month': meses, 'day': dias}), errors='coerce')
+    nomes = _text(df.loc[mask].iloc[:, 0])
+    formas = _text(df.loc[mask, metodo_col]) if metodo_col else [None] * n
+    return _transactions(n, data=datas.to_numpy(), fonte=[fonte] * n, forma_pagamento=list(formas),
+                         tipo=['entrada'] * n, valor=valores[mask].to_numpy(), descricao=list(nomes))
+
+
+def bombom_transactions(facts, fonte='bombom'):
+    """Vendas (PIX/dinheiro) e compras semanais do bombom, datadas pelo início da semana.
+
+    Recebe a tabela de fatos gravada pela limpeza (bombom_weekly).
+    """
+    vendas = facts[(facts['bloco'] == 'venda') & facts['valor'].notna()]
+    compras = facts[(facts['bloco'] == 'compra') & facts['valor'].notna()]
+    parts = []
+    for rows, tipo, forma in ((vendas, 'entrada', vendas['item']), (compras, 'saida', None)):
+        n = len(rows)
+        parts.append(_transactions(
+            n,
+            data=pd.to_datetime(rows['data_inicio']).to_numpy(),
+            fonte=[fonte] * n,
+            forma_pagamento=list(forma) if forma is not None else [None] * n,
+            tipo=[tipo] * n,
+            valor=rows['valor'].to_numpy(dtype=float),
+            descricao=[f"{mes} semana {semana}: {item}"
+                       for mes, semana, item in zip(rows['mes'], rows['semana'], rows['item'])],
+        ))
+    return pd.concat(parts, ignore_index=True)
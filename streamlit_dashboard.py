@@ -5,10 +5,28 @@ import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import numpy as np
 import os
+import sys
 from datetime import datetime, timedelta
 import warnings
+
+# Os módulos compartilhados do pipeline ficam em scripts/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts'))
+from metrics_engine import SECTIONS, dataset_files, compute_section, combine_sections, typed_frame
+from cleaned_store import cleaned_version, load_cleaned
+from data_watcher import DataWatcher
+from rollup import month_label
+from analytics_db import named_query, db_version
+import profiling
+from profiling import span, last_trace
+
 warnings.filterwarnings('ignore')
 
+# Copy-on-Write: as cópias rasas das planilhas em cache compartilham a memória
+# delas até serem modificadas. Sempre ligado a partir do pandas 3; nas versões
+# anteriores é ligado só aqui, no processo do dashboard, e não nos scripts.
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
 # Configuração da página
 st.set_page_config(
     page_title="Dashboard Financeiro",
@@ -56,125 +74,114 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    """Carregar e processar todos os dados financeiros"""
-    data_path = "data/cleaned/"
-    
-    # Dicionário para armazenar todos os dados
-    datasets = {}
-    
-    # Lista de arquivos importantes
-    important_files = [
-        "Copyofcachorroquente-Vendaportaria_cleaned.csv",
-        "CopyofOBRABANHEIROSETEMBRO25-Arrecadações_cleaned.csv",
-        "Copyofcontadacasa-Entrada_saída2025-CONTANOVA(lofi)_cleaned.csv",
-        "Copyofcontadacasa-Geral_cleaned.csv"
-    ]
-    
-    # Dados mensais de bombom/chup-chup
-    monthly_files = [
-        "CopyofBombomechup-chup2025-Janeiro_cleaned.csv",
-        "CopyofBombomechup-chup2025-Fevereiro_cleaned.csv",
-        "CopyofBombomechup-chup2025-Março_cleaned.csv",
-        "CopyofBombomechup-chup2025-Abril_cleaned.csv",
-        "CopyofBombomechup-chup2025-Maio_cleaned.csv"
-    ]
-    
-    # Carregar dados principais
-    for file in important_files:
-        try:
-            if os.path.exists(os.path.join(data_path, file)):
-                df = pd.read_csv(os.path.join(data_path, file))
-                datasets[file.replace('_cleaned.csv', '')] = df
-        except Exception as e:
-            st.error(f"Erro ao carregar {file}: {e}")
-    
-    # Carregar dados mensais
-    monthly_data = {}
-    for file in monthly_files:
+DATA_PATH = "data/cleaned/"
+REFRESH_SECONDS = 2
+
+
+def dataset_versions(keys):
+    """Assinatura atual (mtime/tamanho) de cada planilha; só faz stat dos arquivos"""
+    files = dataset_files()
+    return tuple(cleaned_version(files[key], DATA_PATH) for key in keys)
+
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _typed_dataset(key, version):
+    # Guardado uma vez, já com as colunas de valores numéricas; cache_resource
+    # devolve o mesmo objeto em cada rerun, sem serializar/copiar o DataFrame
+    return typed_frame(load_cleaned(dataset_files()[key], DATA_PATH))
+
+
+def load_dataset(key, version):
+    """Carregar uma planilha limpa; a versão entra na chave do cache.
+
+    Devolve uma cópia rasa: com Copy-on-Write ela compartilha a memória do
+    DataFrame em cache, e qualquer alteração feita por quem chamou copia só a
+    coluna alterada, sem tocar no cache.
+    """
+    return _typed_dataset(key, version).copy(deep=False)
+
+
+@st.cache_data(show_spinner=False)
+def section_metrics(name, versions):
+    """Indicadores de uma seção, recalculados só quando as suas planilhas mudam"""
+    datasets, errors = {}, {}
+    for key, version in zip(SECTIONS[name][0], versions):
         try:
-            if os.path.exists(os.path.join(data_path, file)):
-                df = pd.read_csv(os.path.join(data_path, file))
-                month = file.split('-')[2].replace('_cleaned.csv', '')
-                monthly_data[month] = df
+            datasets[key] = load_dataset(key, version)
         except Exception as e:
-            st.error(f"Erro ao carregar {file}: {e}")
-    
-    datasets['monthly_data'] = monthly_data
-    
-    return datasets
+            errors[key] = e
+    return compute_section(name, datasets, errors)
+
 
-def process_financial_data(datasets):
+def get_section(name):
+    return section_metrics(name, dataset_versions(SECTIONS[name][0]))
+
+
+@st.cache_data(show_spinner=False)
+def combined_metrics(sections):
+    return combine_sections(sections)
+
+
+def process_financial_data():
     """Processar dados financeiros e calcular métricas"""
-    metrics = {}
-    
-    # Processar vendas de cachorro quente
-    if 'Copyofcachorroquente-Vendaportaria' in datasets:
-        df_cachorro = datasets['Copyofcachorroquente-Vendaportaria']
-        if 'Valor' in df_cachorro.columns:
-            df_cachorro['Valor'] = pd.to_numeric(df_cachorro['Valor'], errors='coerce')
-            metrics['total_cachorro_quente'] = df_cachorro['Valor'].sum()
-            metrics['vendas_cachorro_count'] = len(df_cachorro)
-        else:
-            metrics['total_cachorro_quente'] = 0
-            metrics['vendas_cachorro_count'] = 0
-    
-    # Processar arrecadações da obra do banheiro
-    if 'CopyofOBRABANHEIROSETEMBRO25-Arrecadações' in datasets:
-        df_obra = datasets['CopyofOBRABANHEIROSETEMBRO25-Arrecadações']
-        valor_cols = [col for col in df_obra.columns if 'valor' in col.lower()]
-        if valor_cols:
-            df_obra[valor_cols[0]] = pd.to_numeric(df_obra[valor_cols[0]], errors='coerce')
-            metrics['obra_banheiro_arrecadado'] = df_obra[valor_cols[0]].sum()
-        else:
-            metrics['obra_banheiro_arrecadado'] = 0
-    
-    # Processar dados da conta da casa
-    if 'Copyofcontadacasa-Entrada_saída2025-CONTANOVA(lofi)' in datasets:
-        df_conta = datasets['Copyofcontadacasa-Entrada_saída2025-CONTANOVA(lofi)']
-        # Procurar por colunas de entrada e saída
-        entrada_cols = [col for col in df_conta.columns if 'entrada' in col.lower()]
-        saida_cols = [col for col in df_conta.columns if 'saída' in col.lower() or 'saida' in col.lower()]
-        
-        total_entradas = 0
-        total_saidas = 0
-        
-        for col in entrada_cols:
-            df_conta[col] = pd.to_numeric(df_conta[col], errors='coerce')
-            total_entradas += df_conta[col].sum()
-        
-        for col in saida_cols:
-            df_conta[col] = pd.to_numeric(df_conta[col], errors='coerce')
-            total_saidas += df_conta[col].sum()
-        
-        metrics['conta_casa_entradas'] = total_entradas
-        metrics['conta_casa_saidas'] = total_saidas
-    
-    # Processar dados mensais
-    if 'monthly_data' in datasets:
-        monthly_totals = {}
-        for month, df in datasets['monthly_data'].items():
-            total = 0
-            for col in df.columns:
-                if 'valor' in col.lower() and 'obtido' in col.lower():
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-                    total += df[col].sum()
-            monthly_totals[month] = total
-        metrics['monthly_bombom'] = monthly_totals
-    
-    # Calcular totais
-    metrics['total_receitas'] = (
-        metrics.get('total_cachorro_quente', 0) + 
-        metrics.get('obra_banheiro_arrecadado', 0) + 
-        metrics.get('conta_casa_entradas', 0)
-    )
-    
-    metrics['total_despesas'] = metrics.get('conta_casa_saidas', 0)
-    metrics['saldo_geral'] = metrics['total_receitas'] - metrics['total_despesas']
-    
+    # Mesmos indicadores dos relatórios (analyze_data.py / financial_analysis.py).
+    # Cada seção fica em cache separado; uma interação com os widgets só faz
+    # stat dos arquivos e reaproveita tudo.
+    with span('dashboard.metricas'):
+        metrics = combined_metrics({name: get_section(name) for name in SECTIONS})
+    for key, error in metrics['errors'].items():
+        if isinstance(error, Exception) and not isinstance(error, FileNotFoundError):
+            st.error(f"Erro ao carregar {key}: {error}")
     return metrics
 
+
+@st.cache_data(show_spinner=False)
+def load_monthly_bombom(version):
+    """Totais mensais de bombom (consulta SQL no banco gravado na limpeza)"""
+    if version is None:
+        return None
+    mensal = named_query('entradas_mensais', DATA_PATH, fonte='bombom')
+    return {month_label(mes): float(valor) for mes, valor in zip(mensal['mes'], mensal['valor'])}
+
+
+@st.cache_resource(show_spinner=False)
+def get_watcher():
+    """Um observador do diretório de dados limpos, compartilhado por todas as sessões"""
+    return DataWatcher(DATA_PATH, dataset_files(), interval=REFRESH_SECONDS).start()
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def watch_for_changes():
+    # Só compara um contador a cada poucos segundos. Quando alguma planilha muda,
+    # a página é refeita: as chaves de cache das planilhas alteradas mudam e
+    # apenas elas (e as seções que dependem delas) são recarregadas.
+    watcher = get_watcher()
+    seen = st.session_state.setdefault('data_generation', watcher.generation)
+    if watcher.generation != seen:
+        st.session_state['data_generation'] = watcher.generation
+        st.toast(f"Dados atualizados: {', '.join(watcher.changed)}")
+        st.rerun()
+
+
+@st.cache_data(show_spinner=False)
+def load_payment_summary(version):
+    """Totais por forma de pagamento da portaria (consulta SQL no banco)"""
+    if version is None:
+        raise FileNotFoundError(DATA_PATH)
+    payment_summary = named_query('pagamentos', DATA_PATH, fonte='portaria')
+    if not len(payment_summary):
+        return None
+    payment_summary.columns = ['Forma de Pagamento', 'Valor Total', 'Quantidade']
+    return payment_summary
+
+
+@st.cache_data(show_spinner=False)
+def load_detail_tables(version):
+    """Vendas por evento e dívidas em aberto (consultas SQL no banco)"""
+    if version is None:
+        return None
+    return {name: named_query(name, DATA_PATH) for name in ('receita_eventos', 'dividas_em_aberto')}
+
 def create_overview_metrics(metrics):
     """Criar métricas de visão geral"""
     col1, col2, col3, col4 = st.columns(4)
@@ -247,19 +254,14 @@ def create_revenue_breakdown(metrics):
     st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
-def create_monthly_trend(metrics):
+def create_monthly_trend(monthly_data):
     """Criar gráfico de tendência mensal"""
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     st.subheader("📈 Tendência Mensal - Bombom e Chup-chup")
     
-    if 'monthly_bombom' in metrics:
-        monthly_data = metrics['monthly_bombom']
-        months = list(monthly_data.keys())
-        values = list(monthly_data.values())
-        
-        # Ordenar por mês
-        month_order = ['Janeiro', 'Fevereiro', 'Março', 'Abril', 'Maio']
-        sorted_data = [(month, monthly_data.get(month, 0)) for month in month_order if month in monthly_data]
+    if monthly_data is not None:
+        # O cubo já vem em ordem cronológica
+        sorted_data = list(monthly_data.items())
         
         if sorted_data:
             months, values = zip(*sorted_data)
@@ -335,26 +337,19 @@ def create_comparison_chart(metrics):
     st.plotly_chart(fig, use_container_width=True)
     st.markdown('</div>', unsafe_allow_html=True)
 
-def create_payment_methods_analysis(datasets):
+def create_payment_methods_analysis():
     """Analisar formas de pagamento"""
     st.markdown('<div class="chart-container">', unsafe_allow_html=True)
     st.subheader("💳 Análise de Formas de Pagamento")
     
-    if 'Copyofcachorroquente-Vendaportaria' in datasets:
-        df = datasets['Copyofcachorroquente-Vendaportaria']
-        
-        # Procurar coluna de forma de pagamento
-        payment_col = None
-        for col in df.columns:
-            if 'forma' in col.lower() and 'pagamento' in col.lower():
-                payment_col = col
-                break
-        
-        if payment_col and 'Valor' in df.columns:
-            df['Valor'] = pd.to_numeric(df['Valor'], errors='coerce')
-            payment_summary = df.groupby(payment_col)['Valor'].agg(['sum', 'count']).reset_index()
-            payment_summary.columns = ['Forma de Pagamento', 'Valor Total', 'Quantidade']
-            
+    try:
+        payment_summary = load_payment_summary(db_version(DATA_PATH))
+        vendas_disponiveis = True
+    except FileNotFoundError:
+        payment_summary, vendas_disponiveis = None, False
+    
+    if vendas_disponiveis:
+        if payment_summary is not None:
             # Gráfico de pizza para formas de pagamento
             fig = go.Figure(data=[go.Pie(
                 labels=payment_summary['Forma de Pagamento'],
@@ -375,8 +370,8 @@ def create_payment_methods_analysis(datasets):
             
             # Tabela detalhada
             st.subheader("📋 Detalhamento por Forma de Pagamento")
-            payment_summary['Valor Total'] = payment_summary['Valor Total'].apply(lambda x: f'R$ {x:.2f}')
-            st.dataframe(payment_summary, use_container_width=True)
+            table = payment_summary.assign(**{'Valor Total': payment_summary['Valor Total'].map(lambda x: f'R$ {x:.2f}')})
+            st.dataframe(table, use_container_width=True)
         else:
             st.info("Dados de forma de pagamento não encontrados")
     else:
@@ -425,6 +420,29 @@ def create_insights_section(metrics):
     
     st.markdown('</div>', unsafe_allow_html=True)
 
+def create_profiling_panel():
+    """Painel oculto (?perfil=1 na URL) com os spans da última execução instrumentada"""
+    records = last_trace()
+    st.markdown("---")
+    st.subheader("⏱️ Perfil da última execução")
+    if not records:
+        st.info(f"Nenhum trace encontrado em {profiling.configured_dir()}; "
+                f"rode o pipeline com --profile ou {profiling.ENV_VAR}=1")
+        return
+    spans = pd.DataFrame(records)[['nome', 'parede_s', 'cpu_s', 'linhas_entrada', 'linhas_saida',
+                                   'bytes_lidos', 'bytes_gravados', 'pico_rss_mb', 'pid']]
+    por_etapa = spans.groupby('nome').agg(chamadas=('nome', 'size'), parede_s=('parede_s', 'sum'),
+                                          cpu_s=('cpu_s', 'sum'), pico_rss_mb=('pico_rss_mb', 'max'))
+    por_etapa = por_etapa.sort_values('parede_s', ascending=False).reset_index()
+    fig = px.bar(por_etapa.head(20), x='parede_s', y='nome', orientation='h',
+                 title="Tempo de parede por etapa (s)")
+    fig.update_layout(yaxis={'categoryorder': 'total ascending'})
+    st.plotly_chart(fig, use_container_width=True)
+    st.dataframe(por_etapa, use_container_width=True)
+    with st.expander(f"Ver todos os {len(spans)} spans"):
+        st.dataframe(spans, use_container_width=True)
+
+
 def main():
     """Função principal do dashboard"""
     # Cabeçalho
@@ -440,7 +458,8 @@ def main():
         auto_refresh = st.checkbox("Atualização automática", value=False)
         
         if auto_refresh:
-            st.info("Dashboard será atualizado automaticamente")
+            st.info("Dashboard será atualizado automaticamente quando os dados limpos mudarem")
+            watch_for_changes()
         
         st.markdown("---")
         st.markdown("**📊 Sobre este Dashboard**")
@@ -452,8 +471,7 @@ def main():
     
     # Carregar dados
     with st.spinner("Carregando dados financeiros..."):
-        datasets = load_data()
-        metrics = process_financial_data(datasets)
+        metrics = process_financial_data()
     
     # Métricas principais
     create_overview_metrics(metrics)
@@ -466,8 +484,8 @@ def main():
         create_comparison_chart(metrics)
     
     with col2:
-        create_monthly_trend(metrics)
-        create_payment_methods_analysis(datasets)
+        create_monthly_trend(load_monthly_bombom(db_version(DATA_PATH)))
+        create_payment_methods_analysis()
     
     # Seção de insights
     create_insights_section(metrics)
@@ -488,7 +506,19 @@ def main():
             with col2:
                 st.metric("Entradas Conta Casa", f"R$ {metrics.get('conta_casa_entradas', 0):.2f}")
                 st.metric("Saídas Conta Casa", f"R$ {metrics.get('conta_casa_saidas', 0):.2f}")
-    
+
+        with st.expander("Ver vendas por evento e dívidas em aberto"):
+            tables = load_detail_tables(db_version(DATA_PATH))
+            if tables is None:
+                st.info("Banco de dados ainda não gerado pela limpeza")
+            else:
+                st.dataframe(tables['receita_eventos'], use_container_width=True)
+                st.dataframe(tables['dividas_em_aberto'], use_container_width=True)
+
+    if st.query_params.get('perfil'):
+        create_profiling_panel()
+    profiling.flush()
+
     # Rodapé
     st.markdown("---")
     st.markdown(